@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Excel导入期间接口并发测试脚本（永久脚本，只在临时目录中创建测试数据库，不读写正式数据库）
+
+在临时目录中用 uvicorn 启动应用（线程池、数据库连接池和 PRAGMA 与正式运行相同），
+先通过 /upload 导入一个工作簿作为初始数据，然后分两个阶段测量 /api/connections 的耗时：
+1. 空闲：若干客户端线程并发请求连接列表（首页、按局站筛选、按连接类型筛选轮流请求）；
+2. 导入期间：通过 /upload 提交第二个工作簿（后台导入任务），同样的客户端在导入进行期间并发请求，
+   统计导入期间开始的请求。
+如果列表请求排在导入之后串行执行，导入期间的请求耗时会接近导入本身的耗时；
+不再串行时两个阶段的耗时应在同一数量级。
+
+使用方法：
+    python benchmark_import_concurrency.py [--devices 20000] [--clients 8] [--idle-seconds 5]
+"""
+
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from urllib.parse import urlencode
+
+import pandas as pd
+
+# 应用使用相对路径（./database、./static、./templates），在临时目录中运行时需要能找到本目录下的模块
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_DIR)
+
+from config import ADMIN_PASSWORD
+
+STATIONS = ["局站A", "局站B", "局站C", "局站D"]
+DEVICE_TYPES = ["直流系统设备", "交、直流配电设备", "交流UPS主机", "高压配电设备"]
+
+# 客户端轮流请求的连接列表查询
+CONNECTION_QUERIES = [
+    {"page_size": 50},
+    {"page_size": 50, "station": "局站B"},
+    {"page_size": 50, "connection_type": "直流"},
+]
+
+
+def write_workbook(path: str, prefix: str, device_count: int):
+    """生成导入用工作簿：设备表中每个设备的上级设备为前面的设备，导入时生成对应的连接"""
+    rows = []
+    for i in range(device_count):
+        rows.append({
+            "局站": STATIONS[i % len(STATIONS)],
+            "资产编号": f"{prefix}{i:07d}",
+            "设备类型": DEVICE_TYPES[i % len(DEVICE_TYPES)],
+            "设备名称": f"{prefix}设备{i}",
+            "设备型号": "M1",
+            "设备生产厂家": "测试厂家",
+            "设备投产时间": "2019-05-01",
+            "上级设备": f"{prefix}{i // 10:07d}" if i else None,
+            "上级端口": f"F{i % 12}",
+            "本端端口": "Q1",
+            "线缆类型": "电缆",
+        })
+    pd.DataFrame(rows).to_excel(path, index=False)
+
+
+def _free_port() -> int:
+    """取一个空闲的本地端口"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def request(port: int, method: str, path: str, body: bytes = None, headers: dict = None):
+    """发送一个HTTP请求（不跟随重定向），返回 (状态码, 响应头, 响应体)"""
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    try:
+        conn.request(method, path, body=body, headers=headers or {})
+        response = conn.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        conn.close()
+
+
+def upload(port: int, path: str) -> int:
+    """通过 /upload 提交导入任务，返回任务ID"""
+    boundary = uuid.uuid4().hex
+    with open(path, "rb") as workbook:
+        content = workbook.read()
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"password\"\r\n\r\n{ADMIN_PASSWORD}\r\n"
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{os.path.basename(path)}\"\r\n"
+        f"Content-Type: application/vnd.openxmlformats-officedocument.spreadsheetml.sheet\r\n\r\n"
+    ).encode("utf-8") + content + f"\r\n--{boundary}--\r\n".encode("utf-8")
+    status, headers, _ = request(port, "POST", "/upload", body, {
+        "Content-Type": f"multipart/form-data; boundary={boundary}"
+    })
+    location = headers.get("location", "")
+    if status != 303 or "import_job=" not in location:
+        raise RuntimeError(f"提交导入任务失败: {status} {location}")
+    return int(location.split("import_job=")[1])
+
+
+def wait_for_job(port: int, job_id: int, interval: float = 0.1) -> dict:
+    """轮询导入任务直到结束，返回任务状态"""
+    while True:
+        _, _, body = request(port, "GET", f"/api/import-jobs/{job_id}")
+        job = json.loads(body)["job"]
+        if job["status"] not in ("pending", "running"):
+            return job
+        time.sleep(interval)
+
+
+def run_clients(port: int, clients: int, stop: threading.Event) -> tuple:
+    """
+    启动客户端线程并发请求连接列表，直到 stop 被设置
+    返回 (客户端线程, 结果列表)，结果为 [(开始时间, 耗时, 状态码)]，线程结束前会继续追加
+    """
+    results = []
+    lock = threading.Lock()
+
+    def client(number: int):
+        position = number
+        while not stop.is_set():
+            query = CONNECTION_QUERIES[position % len(CONNECTION_QUERIES)]
+            position += 1
+            started = time.perf_counter()
+            status, _, _ = request(port, "GET", "/api/connections?" + urlencode(query))
+            with lock:
+                results.append((started, time.perf_counter() - started, status))
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def summarize(results: list) -> dict:
+    """统计请求耗时（毫秒）"""
+    latencies = sorted(latency * 1000 for _, latency, _ in results)
+    return {
+        "requests": len(latencies),
+        "errors": sum(1 for _, _, status in results if status != 200),
+        "p50": statistics.median(latencies) if latencies else None,
+        "p95": latencies[int(len(latencies) * 0.95)] if latencies else None,
+        "max": latencies[-1] if latencies else None,
+    }
+
+
+def print_result(name: str, result: dict, duration: float):
+    """打印一个阶段的统计结果"""
+    print(f"\n📊 {name}（{duration:.2f} 秒）")
+    print(f"  请求: {result['requests']} 次，失败: {result['errors']} 次，"
+          f"吞吐量: {result['requests'] / duration:.1f} 次/秒")
+    if result["requests"]:
+        print(f"  耗时: p50 {result['p50']:.1f} ms，p95 {result['p95']:.1f} ms，最大 {result['max']:.1f} ms")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="Excel导入期间 /api/connections 并发测试")
+    parser.add_argument("--devices", type=int, default=20000, help="每个工作簿的设备数（初始数据和导入期间各一个）")
+    parser.add_argument("--clients", type=int, default=8, help="并发客户端数")
+    parser.add_argument("--idle-seconds", type=float, default=5, help="空闲阶段的测试时长（秒）")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧪 Excel导入期间接口并发测试")
+    print("=" * 60)
+
+    work_dir = tempfile.mkdtemp(prefix="import_concurrency_")
+    try:
+        os.makedirs(os.path.join(work_dir, "database"))
+        for directory in ("static", "templates"):
+            os.symlink(os.path.join(REPO_DIR, directory), os.path.join(work_dir, directory))
+        seed_path = os.path.join(work_dir, "seed.xlsx")
+        import_path = os.path.join(work_dir, "import.xlsx")
+        write_workbook(seed_path, "SEED", args.devices)
+        write_workbook(import_path, "LOAD", args.devices)
+        print(f"工作簿: 每个 {args.devices} 个设备，并发客户端: {args.clients}")
+
+        # 数据库路径是相对路径，切换到临时目录后再导入应用，应用的输出不打印到控制台
+        os.chdir(work_dir)
+        import uvicorn
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            from main import app
+            port = _free_port()
+            server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+            server_thread = threading.Thread(target=server.run)
+            server_thread.start()
+            while not server.started:
+                if not server_thread.is_alive():
+                    raise RuntimeError("应用启动失败")
+                time.sleep(0.05)
+
+            try:
+                seed_job = wait_for_job(port, upload(port, seed_path))
+
+                # 空闲阶段
+                stop = threading.Event()
+                started = time.perf_counter()
+                threads, idle_results = run_clients(port, args.clients, stop)
+                time.sleep(args.idle_seconds)
+                stop.set()
+                for thread in threads:
+                    thread.join()
+                idle_duration = time.perf_counter() - started
+
+                # 导入阶段：只统计导入任务提交后、结束前开始的请求
+                stop = threading.Event()
+                threads, import_results = run_clients(port, args.clients, stop)
+                import_started = time.perf_counter()
+                job = wait_for_job(port, upload(port, import_path))
+                import_finished = time.perf_counter()
+                stop.set()
+                for thread in threads:
+                    thread.join()
+            finally:
+                server.should_exit = True
+                server_thread.join()
+
+        during_import = [result for result in import_results if import_started <= result[0] < import_finished]
+        import_duration = import_finished - import_started
+        print(f"\n📥 初始数据导入: {seed_job['status']}，处理 {seed_job['rows_processed']} 行")
+        print(f"📥 测试导入: {job['status']}，处理 {job['rows_processed']} 行，耗时 {import_duration:.2f} 秒")
+        idle = summarize(idle_results)
+        during = summarize(during_import)
+        print_result("空闲时", idle, idle_duration)
+        print_result("导入期间", during, import_duration)
+        if idle["requests"] and during["requests"]:
+            print(f"\n导入期间 p95 / 空闲 p95 = {during['p95'] / idle['p95']:.1f} 倍，"
+                  f"导入期间最大耗时占导入耗时的 {during['max'] / 1000 / import_duration:.0%}")
+    finally:
+        os.chdir(REPO_DIR)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite 存储配置并发测试脚本（永久脚本，只在临时目录中创建测试数据库，不读写正式数据库）
+
+模拟Excel导入：一个写线程在同一个事务中分批插入设备（批次之间停顿，模拟解析Excel的耗时），
+同时若干读线程不断执行首页 / 列表接口会用到的查询，统计写事务期间读操作的完成次数和耗时。
+分别用 SQLite 默认配置（rollback journal）和 config.SQLITE_PRAGMAS（WAL 等）各运行一次并对比：
+默认配置下写事务提交时需要独占数据库，读操作会被阻塞；WAL 模式下读操作不受写事务影响。
+
+使用方法：
+    python benchmark_sqlite_profile.py [--devices 20000] [--batches 20] [--pause 0.1] [--readers 4] [--interval 0.005]
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+
+from sqlalchemy import insert, text
+
+from config import SQLITE_PRAGMAS
+from models import Base, Device, make_engine
+
+
+def prepare_database(path: str, device_count: int):
+    """创建测试数据库并写入初始设备数据"""
+    engine = make_engine(f"sqlite:///{path}", pragmas={})
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Device), [
+            {"asset_id": f"BENCH{i:07d}", "name": f"测试设备{i}", "station": f"局站{i % 50}", "device_type": "配电"}
+            for i in range(device_count)
+        ])
+    engine.dispose()
+
+
+def run_profile(path: str, pragmas: dict, args) -> dict:
+    """用指定的 PRAGMA 配置运行一次并发测试，返回统计结果"""
+    engine = make_engine(f"sqlite:///{path}", pragmas=pragmas)
+    with engine.connect() as conn:
+        journal_mode = conn.execute(text("PRAGMA journal_mode")).scalar()
+
+    writing = threading.Event()
+    writer_done = threading.Event()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def writer():
+        """模拟导入：一个长事务，分批插入，批次之间停顿"""
+        batch_size = args.devices // args.batches
+        with engine.begin() as conn:
+            writing.set()
+            for batch in range(args.batches):
+                conn.execute(insert(Device), [
+                    {"asset_id": f"IMPORT{batch:03d}{i:06d}", "name": f"导入设备{i}", "station": f"局站{i % 50}",
+                     "device_type": "配电"}
+                    for i in range(batch_size)
+                ])
+                time.sleep(args.pause)
+        writer_done.set()
+
+    def reader(number: int):
+        """写事务期间不断执行列表查询"""
+        writing.wait()
+        while not writer_done.is_set():
+            # 写事务期间开始的读操作都计入统计（包括被阻塞到写事务提交之后才完成的）
+            started = time.perf_counter()
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        text("SELECT count(*) FROM devices WHERE station = :station"), {"station": f"局站{number}"}
+                    ).scalar()
+                    conn.execute(text("SELECT id, name FROM devices ORDER BY id LIMIT 50")).all()
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            time.sleep(args.interval)
+
+    threads = [threading.Thread(target=writer)] + [
+        threading.Thread(target=reader, args=(number,)) for number in range(args.readers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT count(*) FROM devices")).scalar()
+    engine.dispose()
+
+    latencies.sort()
+    return {
+        "journal_mode": journal_mode,
+        "duration": duration,
+        "reads": len(latencies),
+        "p50": statistics.median(latencies) * 1000 if latencies else None,
+        "p95": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+        "max": latencies[-1] * 1000 if latencies else None,
+        "errors": len(errors),
+        "devices": total,
+    }
+
+
+def print_result(name: str, result: dict):
+    """打印一次测试的统计结果"""
+    print(f"\n📊 {name}（journal_mode={result['journal_mode']}）")
+    print(f"  写事务耗时: {result['duration']:.2f} 秒，结束后设备数: {result['devices']}")
+    print(f"  写事务期间开始的读操作: {result['reads']} 次，失败: {result['errors']} 次")
+    if result["reads"]:
+        print(f"  读操作耗时: p50 {result['p50']:.2f} ms，p95 {result['p95']:.2f} ms，最大 {result['max']:.2f} ms")
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="SQLite 存储配置并发测试（导入期间的读操作）")
+    parser.add_argument("--devices", type=int, default=20000, help="初始设备数，以及模拟导入写入的设备数")
+    parser.add_argument("--batches", type=int, default=20, help="模拟导入的批次数")
+    parser.add_argument("--pause", type=float, default=0.1, help="批次之间的停顿秒数（模拟解析Excel）")
+    parser.add_argument("--readers", type=int, default=4, help="读线程数")
+    parser.add_argument("--interval", type=float, default=0.005, help="每个读线程两次读操作之间的间隔秒数")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🧪 SQLite 存储配置并发测试")
+    print("=" * 60)
+    print(f"存储配置: {SQLITE_PRAGMAS}")
+
+    work_dir = tempfile.mkdtemp(prefix="sqlite_profile_")
+    try:
+        template = os.path.join(work_dir, "template.db")
+        prepare_database(template, args.devices)
+
+        profiles = [
+            # 默认配置只设置与 Python sqlite3 默认值相同的等待时间
+            ("SQLite 默认配置", {"busy_timeout": 5000}),
+            ("存储配置 SQLITE_PRAGMAS", SQLITE_PRAGMAS),
+        ]
+        for number, (name, pragmas) in enumerate(profiles):
+            path = os.path.join(work_dir, f"bench_{number}.db")
+            shutil.copy(template, path)
+            print_result(name, run_profile(path, pragmas, args))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
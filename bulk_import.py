@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多工作簿批量导入模块（永久模块，可作为命令行脚本使用，作用于本地数据库）
+
+用途：各局站分别提交自己的 设备表.xlsx，这里一次导入一个zip压缩包或一个目录中的全部工作簿。
+- 解析和校验（openpyxl 读取 + 设备表校验）是CPU密集的，在进程池中并行执行，不访问数据库；
+- 写入数据库由当前进程中的单个写入者按文件顺序依次完成，每个文件的导入结果与单独上传该文件一致；
+- 每个文件生成一份导入报告（跳过的行及原因、变更汇总），某个文件失败不影响其他文件。
+
+后台任务通过 /upload-bulk 提交（见 import_jobs），也可以直接在命令行执行：
+    python bulk_import.py 各局站设备表.zip
+    python bulk_import.py ./设备表目录 --workers 4
+注意：命令行导入直接写数据库，不会通知正在运行的服务刷新缓存，建议在服务停止时执行，或执行后重启服务。
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from config import IMPORT_PARSE_WORKERS
+from excel_import import (
+    read_workbook, import_parsed_workbook, summarize_import_result, print_import_report,
+    ImportValidationError,
+)
+from models import SessionLocal
+
+
+# 批量导入支持的工作簿扩展名
+WORKBOOK_EXTENSIONS = (".xlsx", ".xlsm")
+
+
+def _is_workbook_name(name: str) -> bool:
+    """是否为需要导入的工作簿文件（忽略Excel的临时锁文件 ~$xxx.xlsx 和 macOS 的资源文件）"""
+    base_name = os.path.basename(name)
+    return (
+        base_name.lower().endswith(WORKBOOK_EXTENSIONS)
+        and not base_name.startswith(("~$", "._"))
+        and "__MACOSX" not in name
+    )
+
+
+def _zip_member_name(info: zipfile.ZipInfo) -> str:
+    """
+    zip中的文件名：未标记UTF-8编码的文件名依次尝试按UTF-8（Linux/macOS创建的压缩包）
+    和GBK（Windows中文系统创建的压缩包）解码
+    """
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        raw_name = info.filename.encode("cp437")
+    except UnicodeEncodeError:
+        return info.filename
+    for encoding in ("utf-8", "gbk"):
+        try:
+            return raw_name.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+    return info.filename
+
+
+def extract_workbooks(zip_path: str, target_dir: str) -> list:
+    """
+    把zip中的工作簿解压到 target_dir，返回 [(zip中的文件名, 解压后的路径)]，按文件名排序
+    解压后的文件按序号命名，不使用zip中的路径
+    """
+    workbooks = []
+    with zipfile.ZipFile(zip_path) as archive:
+        members = [(_zip_member_name(info), info) for info in archive.infolist() if not info.is_dir()]
+        members = sorted((name, info) for name, info in members if _is_workbook_name(name))
+        for index, (name, info) in enumerate(members):
+            path = os.path.join(target_dir, f"{index:04d}{os.path.splitext(name)[1].lower()}")
+            with archive.open(info) as source, open(path, "wb") as target:
+                shutil.copyfileobj(source, target)
+            workbooks.append((name, path))
+    return workbooks
+
+
+def list_workbooks(directory: str) -> list:
+    """目录中的工作簿（不含子目录），返回 [(文件名, 路径)]，按文件名排序"""
+    return [
+        (name, os.path.join(directory, name))
+        for name in sorted(os.listdir(directory))
+        if _is_workbook_name(name) and os.path.isfile(os.path.join(directory, name))
+    ]
+
+
+def _parse_workbook(path: str) -> dict:
+    """在解析进程中执行：读取并校验工作簿，返回 read_workbook() 的结果和耗时"""
+    started = time.perf_counter()
+    try:
+        parsed = read_workbook(path)
+        error = None
+    except ImportValidationError as e:
+        parsed, error = None, str(e)
+    except Exception as e:
+        parsed, error = None, f"读取Excel文件时出错: {e}"
+    return {"parsed": parsed, "error": error, "parse_seconds": time.perf_counter() - started}
+
+
+def import_workbooks(workbooks: list, workers: int = None, progress=None) -> dict:
+    """
+    并行解析、依次写入多个工作簿
+    workbooks 为 [(文件名, 路径)]；workers 为解析进程数（默认 IMPORT_PARSE_WORKERS）
+    progress 为可选的进度回调 progress(文件名, 阶段, 本阶段已处理行数, 本阶段跳过行数)
+    返回 {"files": 每个文件的导入报告, "diff": 全部文件的变更汇总, "parse_seconds", "elapsed_seconds"}
+    """
+    started = time.perf_counter()
+    workers = max(1, min(workers or IMPORT_PARSE_WORKERS, len(workbooks) or 1))
+    reports = []
+    diff_total = {}
+
+    db = SessionLocal()
+    # spawn：解析进程不继承服务进程中的线程和数据库连接
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(_parse_workbook, path) for _, path in workbooks]
+        try:
+            # 单个写入者：按文件顺序写入，其余文件在进程池中继续解析
+            for (name, _), future in zip(workbooks, futures):
+                parsed = future.result()
+                report = {"file": name, "parse_seconds": round(parsed["parse_seconds"], 2)}
+                print(f"\n=== 批量导入: {name}（解析耗时 {report['parse_seconds']} 秒） ===")
+
+                if parsed["error"] is not None:
+                    print(f"错误: {parsed['error']}")
+                    report.update(status="failed", error=parsed["error"])
+                    reports.append(report)
+                    continue
+
+                file_progress = None
+                if progress is not None:
+                    def file_progress(stage, rows_processed, skipped_count, name=name):
+                        progress(name, stage, rows_processed, skipped_count)
+
+                write_started = time.perf_counter()
+                try:
+                    result = import_parsed_workbook(db, parsed["parsed"], progress=file_progress)
+                except Exception as e:
+                    db.rollback()
+                    error_message = f"处理Excel文件时出错: {e}"
+                    print(f"错误: {error_message}")
+                    report.update(status="failed", error=error_message)
+                    reports.append(report)
+                    continue
+
+                print_import_report(db, result)
+                report.update(status="succeeded", error=None, **summarize_import_result(result))
+                report["import_seconds"] = round(time.perf_counter() - write_started, 2)
+                for key, value in result["diff"].items():
+                    diff_total[key] = diff_total.get(key, 0) + value
+                reports.append(report)
+        finally:
+            db.close()
+
+    return {
+        "files": reports,
+        "diff": diff_total,
+        "parse_seconds": round(sum(report["parse_seconds"] for report in reports), 2),
+        "elapsed_seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+def import_source(source: str, workers: int = None, progress=None) -> dict:
+    """导入zip压缩包或目录中的全部工作簿，返回 import_workbooks() 的结果"""
+    if os.path.isdir(source):
+        return import_workbooks(list_workbooks(source), workers, progress)
+
+    with tempfile.TemporaryDirectory(prefix="bulk_import_") as extract_dir:
+        return import_workbooks(extract_workbooks(source, extract_dir), workers, progress)
+
+
+def print_bulk_report(result: dict):
+    """打印批量导入的汇总报告"""
+    print("\n" + "=" * 60)
+    print(f"📦 批量导入完成：{len(result['files'])} 个文件，总耗时 {result['elapsed_seconds']} 秒"
+          f"（解析累计 {result['parse_seconds']} 秒）")
+    for report in result["files"]:
+        if report["status"] == "succeeded":
+            skipped = len(report["skipped_rows"]) + len(report["sheet2_skipped_rows"])
+            print(f"  ✅ {report['file']}: 设备 {report['rows_processed']} 行，跳过 {skipped} 行")
+        else:
+            print(f"  ❌ {report['file']}: {report['error']}")
+    diff = result["diff"]
+    if diff:
+        print(f"变更汇总: 设备 新建 {diff['devices_created']} / 更新 {diff['devices_updated']} / 未变化 {diff['devices_unchanged']}，"
+              f"连接 新建 {diff['connections_created']} / 更新 {diff['connections_updated']} / 未变化 {diff['connections_unchanged']} / 删除 {diff['connections_deleted']}")
+    print("=" * 60)
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="批量导入多个局站的设备表（zip压缩包或目录）")
+    parser.add_argument("source", help="zip压缩包或包含 .xlsx 文件的目录")
+    parser.add_argument("--workers", type=int, default=None, help=f"解析进程数，默认 {IMPORT_PARSE_WORKERS}")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"❌ 文件或目录不存在: {args.source}")
+        return
+
+    # 与应用启动时一致：确保数据库表和字段是最新的
+    from models import create_db_and_tables
+    from schema_migrations import run_migrations
+    from search_index import upgrade_search_index
+    create_db_and_tables()
+    if not run_migrations():
+        print("❌ 数据库迁移失败，导入终止")
+        return
+    upgrade_search_index()
+
+    print_bulk_report(import_source(args.source, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -23,4 +23,41 @@ ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'admin123')
 
 # 端口配置
 # 优先使用环境变量中的端口，如果没有设置则使用默认端口8000
-PORT = int(os.environ.get('PORT', 8009))
\ No newline at end of file
+PORT = int(os.environ.get('PORT', 8009))
+
+# 数据库线程池配置
+# 所有访问数据库的同步路由都在线程池中执行，避免阻塞事件循环
+# 优先使用环境变量中的大小，如果没有设置则默认40个线程
+DB_THREADPOOL_SIZE = int(os.environ.get('DB_THREADPOOL_SIZE', 40))
+
+# Excel导入任务配置
+# 上传的Excel文件先保存到该目录，由后台导入任务读取，导入完成后删除
+IMPORT_UPLOAD_DIR = os.environ.get('IMPORT_UPLOAD_DIR', './database/import_uploads')
+
+# 批量导入多个工作簿时的解析进程数
+# 解析Excel是CPU密集的，默认与CPU核数相同
+IMPORT_PARSE_WORKERS = int(os.environ.get('IMPORT_PARSE_WORKERS', os.cpu_count() or 1))
+
+# SQLite 存储配置
+# 每个数据库连接建立时按以下顺序执行 PRAGMA（models.py 中的 connect 事件），均可用环境变量覆盖
+# - busy_timeout：遇到其他连接的写锁时等待的毫秒数，超时后才报 database is locked
+# - journal_mode=WAL：读操作不会被Excel导入等长时间的写事务阻塞（读到的是写事务提交前的数据）
+# - synchronous=NORMAL：WAL 模式下只在检查点时同步磁盘，断电可能丢失最近提交的事务，但不会损坏数据库
+# - cache_size：每个连接的页缓存上限，负数表示KB（默认16MB）
+# - mmap_size：用内存映射读取数据库文件的字节数，多个连接共享（默认256MB，0 表示不使用）
+# - temp_store=MEMORY：排序、临时索引等中间结果放在内存中
+SQLITE_PRAGMAS = {
+    "busy_timeout": int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 30000)),
+    "journal_mode": os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    "synchronous": os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    "cache_size": -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16384)),
+    "mmap_size": int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    "temp_store": os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
+}
+
+# 数据库连接池配置
+# 同步路由最多有 DB_THREADPOOL_SIZE 个线程同时访问数据库，另有后台导入、流式导出等使用独立会话，
+# 常驻连接 DB_POOL_SIZE 个，繁忙时再临时创建最多 DB_MAX_OVERFLOW 个，避免请求排队等待连接超时
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 20))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', DB_THREADPOOL_SIZE))
+DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+设备和连接数据导出模块（永久模块，无全局状态）
+
+用途一：/api/export 导出设备列表为Excel工作簿。
+- 设备按批（EXPORT_CHUNK_SIZE 行）从数据库流式读取，每行直接编码为工作表XML写入临时文件，
+  列宽在同一遍中累计，内存占用取决于批大小而不是设备总数；
+- 样式是共享的单元格格式（表头 / 正文 / 斑马纹正文各一个），不再为每个单元格创建样式对象；
+- 工作簿（xlsx 即 zip）在响应时边压缩边输出，生成的字节立即发送给客户端，不再整体保存到内存。
+
+xlsx 要求列宽（<cols>）写在行数据之前，因此行数据先写入临时文件（小文件在内存中，超过阈值自动转存磁盘），
+全部行读完、列宽确定后再开始输出工作簿。
+
+用途二：/api/export（format=csv|ndjson|parquet）和 /api/export/connections 导出设备表、连接表的原始数据，
+供下游工具使用：按表的全部字段输出，不加样式；用 yield_per 分批读取的行元组直接编码输出，
+不创建ORM对象，每批编码完立即发送。parquet 格式需要安装 pyarrow（可选依赖），每批写为一个行组。
+"""
+
+import csv
+import importlib.util
+import io
+import json
+import re
+import tempfile
+import zipfile
+from datetime import date, datetime
+from xml.sax.saxutils import escape
+
+from openpyxl.utils import get_column_letter
+from sqlalchemy import Date, DateTime, Float, Integer
+from sqlalchemy.orm import Session
+
+from models import SessionLocal, Device
+
+
+# 每批从数据库读取的设备数
+EXPORT_CHUNK_SIZE = 2000
+# 行数据临时文件保存在内存中的上限，超过后转存到磁盘
+EXPORT_SPOOL_SIZE = 4 * 1024 * 1024
+# 输出工作表时每次从临时文件读取的字节数
+EXPORT_STREAM_CHUNK = 64 * 1024
+# 列宽上限（字符数）
+MAX_COLUMN_WIDTH = 50
+
+# 导出列：(表头, 设备字段)
+EXPORT_COLUMNS = [
+    ("ID", "id"),
+    ("资产编号", "asset_id"),
+    ("设备名称", "name"),
+    ("局站", "station"),
+    ("设备类型", "device_type"),
+    ("设备型号", "model"),
+    ("所在位置", "location"),
+    ("额定容量", "power_rating"),
+    ("设备生产厂家", "vendor"),
+    ("投产日期", "commission_date"),
+    ("备注", "remark"),
+]
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# 导出格式
+FORMAT_XLSX = "xlsx"
+FORMAT_CSV = "csv"
+FORMAT_NDJSON = "ndjson"
+FORMAT_PARQUET = "parquet"
+
+# 原始数据导出格式 -> (Content-Type, 文件扩展名)
+RAW_FORMATS = {
+    FORMAT_CSV: ("text/csv; charset=utf-8", ".csv"),
+    FORMAT_NDJSON: ("application/x-ndjson", ".ndjson"),
+    FORMAT_PARQUET: ("application/vnd.apache.parquet", ".parquet"),
+}
+
+# 共享单元格格式在 styles.xml cellXfs 中的序号
+STYLE_HEADER = 1      # 表头：白色粗体、深蓝底色、居中、细边框
+STYLE_BODY = 2        # 正文：左对齐、细边框
+STYLE_BODY_ZEBRA = 3  # 斑马纹正文（偶数行）：浅灰底色
+
+# XML 1.0 不允许的控制字符
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+_ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2">'
+    '<font><sz val="11"/><name val="Calibri"/><family val="2"/></font>'
+    '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/><family val="2"/></font>'
+    '</fonts>'
+    '<fills count="4">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF366092"/><bgColor rgb="FF366092"/></patternFill></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FFF2F2F2"/><bgColor rgb="FFF2F2F2"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="2">'
+    '<border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="4">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="center" vertical="center"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="left" vertical="center"/></xf>'
+    '<xf numFmtId="0" fontId="0" fillId="3" borderId="1" xfId="0" applyFill="1" applyBorder="1" applyAlignment="1">'
+    '<alignment horizontal="left" vertical="center"/></xf>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+def _cell_xml(ref: str, value, style: int) -> str:
+    """单个单元格的XML；数字写为数值，其余写为内联字符串（不需要共享字符串表）"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c r="{ref}" s="{style}"><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row_xml(row_idx: int, values, letters, style: int) -> str:
+    """一行的XML，空值不写单元格"""
+    cells = "".join(
+        _cell_xml(f"{letter}{row_idx}", value, style)
+        for letter, value in zip(letters, values)
+        if value is not None and value != ""
+    )
+    return f'<row r="{row_idx}">{cells}</row>'
+
+
+class _StreamSink:
+    """
+    zip / parquet 的输出目标：收集写入的字节，由生成器取走后发送
+    不提供 seek，ZipFile 会按不可回写的流式模式写入（文件大小写在数据描述符中）
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class DeviceExcelExport:
+    """
+    一次设备列表导出
+    构造时流式读取查询结果并生成行数据，iter_bytes() 逐块输出xlsx文件内容
+    """
+
+    def __init__(self, query, sheet_title: str = "设备列表"):
+        self.sheet_title = sheet_title
+        self.headers = [header for header, _ in EXPORT_COLUMNS]
+        self.letters = [get_column_letter(col) for col in range(1, len(EXPORT_COLUMNS) + 1)]
+        # 每列最长内容的字符数，初始为表头
+        self.max_lengths = [len(header) for header in self.headers]
+        self.row_count = 0
+        self._rows_file = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+        try:
+            self._write_rows(query)
+        except Exception:
+            self._rows_file.close()
+            raise
+
+    def _write_rows(self, query):
+        """按批读取设备，把数据行写入临时文件，同时累计列宽"""
+        columns = [getattr(Device, field) for _, field in EXPORT_COLUMNS]
+        rows = query.with_entities(*columns).order_by(Device.id).yield_per(EXPORT_CHUNK_SIZE)
+        max_lengths = self.max_lengths
+        buffer = []
+        for row_idx, values in enumerate(rows, 2):
+            for col, value in enumerate(values):
+                if value is not None:
+                    length = len(str(value))
+                    if length > max_lengths[col]:
+                        max_lengths[col] = length
+            style = STYLE_BODY_ZEBRA if row_idx % 2 == 0 else STYLE_BODY
+            buffer.append(_row_xml(row_idx, values, self.letters, style))
+            if len(buffer) >= EXPORT_CHUNK_SIZE:
+                self._rows_file.write("".join(buffer).encode("utf-8"))
+                buffer = []
+            self.row_count += 1
+        if buffer:
+            self._rows_file.write("".join(buffer).encode("utf-8"))
+        self._rows_file.seek(0)
+
+    def _workbook_xml(self) -> str:
+        last_letter = self.letters[-1]
+        title = escape(self.sheet_title, {'"': "&quot;"})
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<bookViews><workbookView/></bookViews>'
+            f'<sheets><sheet name="{title}" sheetId="1" r:id="rId1"/></sheets>'
+            f'<definedNames><definedName name="_xlnm._FilterDatabase" localSheetId="0" hidden="1">'
+            f"'{title}'!$A$1:${last_letter}$1</definedName></definedNames>"
+            '</workbook>'
+        )
+
+    def _sheet_head_xml(self) -> str:
+        """工作表中行数据之前的部分：尺寸、冻结首行、列宽、表头行"""
+        cols = "".join(
+            f'<col min="{col}" max="{col}" width="{min(length + 2, MAX_COLUMN_WIDTH)}" customWidth="1"/>'
+            for col, length in enumerate(self.max_lengths, 1)
+        )
+        return (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<dimension ref="A1:{self.letters[-1]}{self.row_count + 1}"/>'
+            '<sheetViews><sheetView workbookViewId="0">'
+            '<pane ySplit="1" topLeftCell="A2" activePane="bottomLeft" state="frozen"/>'
+            '<selection pane="bottomLeft" activeCell="A2" sqref="A2"/>'
+            '</sheetView></sheetViews>'
+            '<sheetFormatPr defaultRowHeight="15"/>'
+            f'<cols>{cols}</cols>'
+            '<sheetData>'
+            + _row_xml(1, self.headers, self.letters, STYLE_HEADER)
+        )
+
+    def _sheet_tail_xml(self) -> str:
+        """工作表中行数据之后的部分：首行筛选器"""
+        return (
+            '</sheetData>'
+            f'<autoFilter ref="A1:{self.letters[-1]}1"/>'
+            '<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/>'
+            '</worksheet>'
+        )
+
+    def iter_bytes(self):
+        """逐块生成xlsx文件内容，结束（或中途停止）时关闭临时文件"""
+        sink = _StreamSink()
+        try:
+            with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                archive.writestr("[Content_Types].xml", _CONTENT_TYPES_XML)
+                archive.writestr("_rels/.rels", _ROOT_RELS_XML)
+                archive.writestr("xl/workbook.xml", self._workbook_xml())
+                archive.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS_XML)
+                archive.writestr("xl/styles.xml", _STYLES_XML)
+                yield sink.drain()
+
+                with archive.open("xl/worksheets/sheet1.xml", "w") as sheet:
+                    sheet.write(self._sheet_head_xml().encode("utf-8"))
+                    while True:
+                        chunk = self._rows_file.read(EXPORT_STREAM_CHUNK)
+                        if not chunk:
+                            break
+                        sheet.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                    sheet.write(self._sheet_tail_xml().encode("utf-8"))
+            yield sink.drain()
+        finally:
+            self._rows_file.close()
+
+
+def export_devices_xlsx(db: Session, query=None) -> DeviceExcelExport:
+    """
+    导出设备列表：query 为已应用筛选条件的设备查询（默认全部设备）
+    返回的 DeviceExcelExport 中 row_count 为导出的设备数，iter_bytes() 用于 StreamingResponse
+    """
+    if query is None:
+        query = db.query(Device)
+    return DeviceExcelExport(query)
+
+
+# --- 原始数据导出 ---
+
+class ExportFormatError(ValueError):
+    """不支持的导出格式（或缺少该格式需要的可选依赖）"""
+
+
+def check_export_format(export_format: str, allow_xlsx: bool = True):
+    """检查导出格式，不支持时抛出 ExportFormatError；在开始输出响应前调用"""
+    supported = ([FORMAT_XLSX] if allow_xlsx else []) + list(RAW_FORMATS)
+    if export_format not in supported:
+        raise ExportFormatError(f"不支持的导出格式: {export_format}，可选: {', '.join(supported)}")
+    if export_format == FORMAT_PARQUET and importlib.util.find_spec("pyarrow") is None:
+        raise ExportFormatError("导出 parquet 格式需要安装 pyarrow（pip install pyarrow）")
+
+
+def _json_default(value):
+    """NDJSON 中日期时间写为ISO格式字符串"""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def _iter_csv(keys, chunks):
+    """CSV：第一行为字段名，空值为空字符串"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _iter_ndjson(keys, chunks):
+    """NDJSON：每行一个JSON对象，空值为 null"""
+    for rows in chunks:
+        yield "".join(
+            json.dumps(dict(zip(keys, row)), ensure_ascii=False, default=_json_default) + "\n"
+            for row in rows
+        ).encode("utf-8")
+
+
+def _arrow_type(pa, column_type):
+    """数据库字段类型对应的 Arrow 类型，其余类型按字符串输出"""
+    if isinstance(column_type, Integer):
+        return pa.int64()
+    if isinstance(column_type, Float):
+        return pa.float64()
+    if isinstance(column_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(column_type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+def _iter_parquet(columns, chunks):
+    """Parquet：每批写为一个行组，写完即输出"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column.name, _arrow_type(pa, column.type)) for column in columns])
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for rows in chunks:
+            values = list(zip(*rows))
+            arrays = [pa.array(column_values, type=field.type) for column_values, field in zip(values, schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_raw_export(model, query, export_format: str):
+    """
+    逐块生成一张表的原始数据导出：query 为已应用筛选条件的查询（只使用其筛选条件）
+    导出在单独的数据库会话中执行，不依赖请求的会话在响应期间保持打开
+    """
+    columns = list(model.__table__.columns)
+    statement = query.with_entities(*columns).order_by(model.id).statement
+    keys = [column.name for column in columns]
+
+    db = SessionLocal()
+    try:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+        chunks = result.partitions()
+        if export_format == FORMAT_CSV:
+            yield from _iter_csv(keys, chunks)
+        elif export_format == FORMAT_NDJSON:
+            yield from _iter_ndjson(keys, chunks)
+        else:
+            yield from _iter_parquet(columns, chunks)
+    finally:
+        db.close()
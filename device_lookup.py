@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+设备查找表模块（永久模块，进程内全局缓存）
+
+用途：/api/devices/lookup 一次返回全部设备的 id / name / asset_id / station，
+供连接管理页面的设备下拉框使用，代替逐页请求 /api/devices。
+
+- 数据按列组织（{"id": [...], "name": [...], ...}），不重复每行的字段名，体积比逐行对象小得多；
+- 响应体在构建时就压缩为gzip并缓存，请求时直接返回缓存的字节；
+- 查找表在设备写入后失效（invalidate()），下次请求时重建；
+  ETag 是响应内容的哈希（强校验），浏览器带 If-None-Match 重新验证时，内容未变返回 304，不再下载。
+注意：缓存是进程级的，多进程部署时每个进程各自维护一份；内容相同时各进程的 ETag 相同。
+"""
+
+import gzip
+import hashlib
+import json
+from collections import namedtuple
+
+from sqlalchemy.orm import Session
+
+from generation_cache import GenerationCache
+from models import Device
+
+
+# 查找表包含的设备字段（按此顺序输出各列）
+LOOKUP_FIELDS = ["id", "name", "asset_id", "station"]
+
+# 缓存的查找表：未压缩和gzip压缩的响应体、ETag、设备数
+DeviceLookup = namedtuple("DeviceLookup", ["body", "gzip_body", "etag", "count"])
+
+
+def _build_lookup(db: Session) -> DeviceLookup:
+    """从数据库构建查找表：一次查询四列，按设备ID排序"""
+    columns = {field: [] for field in LOOKUP_FIELDS}
+    appenders = [columns[field].append for field in LOOKUP_FIELDS]
+    count = 0
+    for row in db.query(*[getattr(Device, field) for field in LOOKUP_FIELDS]).order_by(Device.id):
+        for append, value in zip(appenders, row):
+            append(value)
+        count += 1
+
+    body = json.dumps(
+        {"success": True, "count": count, "fields": LOOKUP_FIELDS, "data": columns},
+        ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    # mtime=0 保证相同内容压缩结果相同
+    return DeviceLookup(body, gzip.compress(body, compresslevel=6, mtime=0), etag, count)
+
+
+# --- 进程内缓存 ---
+
+_cache = GenerationCache(_build_lookup)
+
+
+def get_device_lookup(db: Session) -> DeviceLookup:
+    """获取设备查找表，缓存失效时自动重建"""
+    return _cache.get(db)
+
+
+def invalidate():
+    """使查找表失效（设备写入后调用）"""
+    _cache.invalidate()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+设备联想（输入提示）模块（永久模块，进程内全局缓存）
+
+用途：/api/devices/suggest?q= 按设备名称、资产编号、名称拼音首字母的前缀返回最匹配的前 k 个设备，
+供拓扑图、连接编辑等页面的设备输入框使用，代替把全部设备渲染到页面或一次性下载。
+
+- 索引是按字符串排序的键列表（与设备ID并列存放），前缀查找用二分定位到第一个不小于前缀的键，
+  向后扫描到不再以前缀开头为止，不随设备数量增长而变慢；
+- 每个设备的索引键：名称、资产编号、名称中各分段（按 - _ / 空格等分隔，如“UPS电源”）、
+  名称拼音首字母（需要安装 pypinyin，可选依赖；未安装时不提供拼音联想），全部转为小写；
+- 单个设备新增、修改、删除后增量更新索引（upsert_device / remove_device），
+  Excel导入等批量写入后整体失效（invalidate()），下次查询时重建。
+注意：缓存是进程级的，多进程部署时每个进程各自维护一份。
+"""
+
+import re
+from bisect import bisect_left
+
+from sqlalchemy.orm import Session
+
+from generation_cache import GenerationCache
+from models import Device
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 可选依赖：未安装时不提供拼音首字母联想
+    lazy_pinyin = None
+
+
+# 默认返回数量与上限
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+# 每次查询最多扫描的候选键数量（候选再按匹配程度排序取前 k 个）
+SCAN_LIMIT = 200
+
+# 名称分段的分隔符
+_SEGMENT_SEPARATORS = re.compile(r"[\s\-_/\\#()（）\[\]【】·,，.。:：;；]+")
+
+
+def _pinyin_initials(name: str) -> str:
+    """名称的拼音首字母（如“配电柜” -> “pdg”），非中文字符原样保留"""
+    return "".join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors="default"))
+
+
+def _device_keys(name: str, asset_id: str) -> set:
+    """设备的全部索引键（小写）"""
+    keys = set()
+    name = (name or "").strip().lower()
+    asset_id = (asset_id or "").strip().lower()
+    if name:
+        keys.add(name)
+        keys.update(segment for segment in _SEGMENT_SEPARATORS.split(name) if segment)
+        if lazy_pinyin is not None:
+            initials = _pinyin_initials(name)
+            if initials and initials != name:
+                keys.add(initials)
+    if asset_id:
+        keys.add(asset_id)
+    return keys
+
+
+class SuggestIndex:
+    """排序的前缀索引：_keys 与 _ids 为并列列表，按 (键, 设备ID) 排序"""
+
+    def __init__(self):
+        self._keys = []
+        self._ids = []
+        self._records = {}          # {设备ID: (名称, 资产编号, 局站)}
+        self._device_keys = {}      # {设备ID: 该设备的索引键}
+
+    def __len__(self):
+        return len(self._records)
+
+    @classmethod
+    def build(cls, rows) -> "SuggestIndex":
+        """从 (id, name, asset_id, station) 行批量构建（一次排序）"""
+        index = cls()
+        entries = []
+        for device_id, name, asset_id, station in rows:
+            keys = _device_keys(name, asset_id)
+            index._records[device_id] = (name, asset_id, station)
+            index._device_keys[device_id] = keys
+            entries.extend((key, device_id) for key in keys)
+        entries.sort()
+        index._keys = [key for key, _ in entries]
+        index._ids = [device_id for _, device_id in entries]
+        return index
+
+    def upsert(self, device_id: int, name: str, asset_id: str, station: str):
+        """新增或更新一个设备的索引键"""
+        self.remove(device_id)
+        keys = _device_keys(name, asset_id)
+        self._records[device_id] = (name, asset_id, station)
+        self._device_keys[device_id] = keys
+        for key in keys:
+            position = bisect_left(self._keys, key)
+            # 相同键按设备ID排序
+            while position < len(self._keys) and self._keys[position] == key and self._ids[position] < device_id:
+                position += 1
+            self._keys.insert(position, key)
+            self._ids.insert(position, device_id)
+
+    def remove(self, device_id: int):
+        """删除一个设备的索引键（设备不在索引中时不做处理）"""
+        self._records.pop(device_id, None)
+        for key in self._device_keys.pop(device_id, ()):
+            position = bisect_left(self._keys, key)
+            while position < len(self._keys) and self._keys[position] == key:
+                if self._ids[position] == device_id:
+                    del self._keys[position]
+                    del self._ids[position]
+                    break
+                position += 1
+
+    def suggest(self, query: str, limit: int) -> list:
+        """
+        前缀查找，返回前 limit 个设备
+        排序：键与输入完全相同优先，其次是名称或资产编号本身以输入开头的，再按名称长度、设备ID
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+
+        best = {}
+        position = bisect_left(self._keys, query)
+        end = min(position + SCAN_LIMIT, len(self._keys))
+        while position < end and self._keys[position].startswith(query):
+            device_id = self._ids[position]
+            name, asset_id, station = self._records[device_id]
+            rank = (
+                self._keys[position] != query,
+                not ((name or "").lower().startswith(query) or (asset_id or "").lower().startswith(query)),
+                len(name or ""),
+                device_id,
+            )
+            if device_id not in best or rank < best[device_id]:
+                best[device_id] = rank
+            position += 1
+
+        result = []
+        for device_id in sorted(best, key=best.get)[:limit]:
+            name, asset_id, station = self._records[device_id]
+            result.append({"id": device_id, "name": name, "asset_id": asset_id, "station": station})
+        return result
+
+
+# --- 进程内缓存 ---
+
+def _build_index(db: Session) -> SuggestIndex:
+    """从数据库构建联想索引"""
+    return SuggestIndex.build(db.query(Device.id, Device.name, Device.asset_id, Device.station))
+
+
+# 查询和增量更新都在 _cache.lock 内进行
+_cache = GenerationCache(_build_index)
+
+
+def suggest_devices(db: Session, query: str, limit: int = DEFAULT_LIMIT) -> list:
+    """按前缀联想设备，返回 [{"id", "name", "asset_id", "station"}, ...]"""
+    index = _cache.get(db)
+    with _cache.lock:
+        return index.suggest(query, limit)
+
+
+def upsert_device(device_id: int, name: str, asset_id: str, station: str):
+    """单个设备新增或修改后调用：增量更新索引"""
+    _cache.update(lambda index: index.upsert(device_id, name, asset_id, station))
+
+
+def remove_device(device_id: int):
+    """单个设备删除后调用：从索引中移除"""
+    _cache.update(lambda index: index.remove(device_id))
+
+
+def invalidate():
+    """批量写入（如Excel导入）后调用：整个索引失效，下次查询时重建"""
+    _cache.invalidate()
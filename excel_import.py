@@ -0,0 +1,1206 @@
+# -*- coding: utf-8 -*-
+"""
+Excel 批量导入模块（永久模块）
+
+用途：处理 /upload 上传的工作簿。
+- 工作簿以 openpyxl 只读流式模式打开一次，设备表（第一个工作表）和“连接”工作表
+  都按固定行数分批读取，内存占用与文件大小无关；上传的临时文件直接交给 openpyxl，
+  不再整体读入内存。
+- 设备表：一次查询预加载全部已有设备，校验和规范化以 DataFrame 列运算完成，
+  设备和连接按批次使用 bulk insert / bulk update 写入。
+- 变更检测：已有设备和连接按规范化后的字段指纹与导入的行比较，只写入实际变化的行，
+  涉及Excel设备但工作簿中已没有对应行的旧连接在导入最后删除。
+- 连接表（Sheet2）：一次查询预加载设备名称和已有连接，逐行解析A端、B端设备和端口信息，
+  不存在的设备和新连接按批次批量写入。
+"""
+
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+import lifecycle
+from device_types import validate_device_type, get_device_type_suggestions
+from models import Device, Connection
+
+
+# 每批写入的记录数，同时也是按设备ID批量删除连接时每批的ID数（低于SQLite参数个数上限）
+IMPORT_CHUNK_SIZE = 1000
+
+# 流式读取工作表时每批的行数
+READ_BATCH_SIZE = 5000
+
+# 设备表必须包含的列
+DEVICE_SHEET_REQUIRED_COLUMNS = ['资产编号', '设备名称']
+
+# 设备表中按文本读取的列，避免数字被当作数值处理
+# 重要：假设"上级设备"列现在包含的是父设备的资产编号
+DEVICE_SHEET_TEXT_COLUMNS = ['资产编号', '设备投产时间', '上级设备']
+
+# 视为空单元格的文本（与 pandas.read_excel 默认的空值文本一致）
+EXCEL_NA_VALUES = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+# 连接表工作表名称
+CONNECTION_SHEET_NAME = '连接'
+
+# Device 字段 -> 设备表列名（原样写入，不做校验）
+DEVICE_FIELD_COLUMNS = {
+    "model": "设备型号",
+    "location": "机房内空间位置",
+    "power_rating": "设备额定容量",
+    "vendor": "设备生产厂家",
+    "commission_date": "设备投产时间",
+    "remark": "备注",
+}
+# 注意：以下机房相关字段被忽略（根据用户要求）：
+# - 机房名称
+# - 资源系统机房名称
+# - 资源系统机房编码
+# - 机房等级
+
+# 设备类型为空时使用的默认值
+DEFAULT_DEVICE_TYPE = "待确认"
+
+# 连接类型映射 - 扩展映射表以包含更多可能的空值表示
+CONNECTION_TYPE_MAPPING = {
+    # 标准连接类型
+    '电缆': 'cable',
+    '铜排': 'busbar',
+    '母线': 'busway',
+    'cable': 'cable',
+    'busbar': 'busbar',
+    'busway': 'busway',
+    # 电气连接类型 - 根据实际Excel数据添加
+    '直流': 'DC',
+    '交流': 'AC',
+    'DC': 'DC',
+    'AC': 'AC',
+    'dc': 'DC',
+    'ac': 'AC',
+    # 空值的各种表示方式 - 统一映射为None表示空闲端口
+    '无': None,
+    '空': None,
+    '空闲': None,
+    '未连接': None,
+    'N/A': None,
+    'n/a': None,
+    'NA': None,
+    'na': None,
+    '无连接': None,
+    '待连接': None,
+    '预留': None,
+    'None': None,
+    'null': None,
+    'NULL': None,
+    '': None,  # 空字符串
+    ' ': None,  # 空格
+}
+
+# Connection 字段 -> 连接表列名（去除首尾空白后写入）
+CONNECTION_FIELD_COLUMNS = {
+    # A端信息
+    "source_fuse_number": "A端熔丝编号",
+    "source_fuse_spec": "A端熔丝规格",
+    "source_breaker_number": "A端空开编号",
+    "source_breaker_spec": "A端空开规格",
+    # B端信息
+    "target_fuse_number": "B端熔丝编号",
+    "target_fuse_spec": "B端熔丝规格",
+    "target_breaker_number": "B端空开编号",
+    "target_breaker_spec": "空开规格",
+    "target_device_location": "B端设备位置（非动力设备）",
+    # 额定电流信息
+    "a_rated_current": "A端额定电流",
+    "b_rated_current": "B端额定电流",
+    # 连接信息
+    "hierarchy_relation": "上下级",
+    "upstream_downstream": "上下游",
+    "cable_model": "电缆型号",
+    # 附加信息
+    "source_device_photo": "A端设备照片",
+    "target_device_photo": "B端设备照片",
+    "remark": "备注",
+}
+
+# 自动创建设备的备注，同时用于识别本次导入自动创建的设备
+AUTO_CREATED_REMARK = "通过Excel导入时自动创建，请完善设备信息"
+
+# 参与变更检测的设备字段：这些字段与数据库中的值完全一致时不更新设备
+DEVICE_FINGERPRINT_FIELDS = (
+    "name", "station", "device_type",
+    *DEVICE_FIELD_COLUMNS,
+    "commission_date_parsed", "commission_date_quality",
+)
+
+# 参与变更检测的连接字段（导入会写入的全部字段），前4个字段构成连接的键
+CONNECTION_FINGERPRINT_FIELDS = (
+    "source_device_id", "target_device_id", "source_port", "target_port",
+    "connection_type", "cable_type", "installation_date",
+    *CONNECTION_FIELD_COLUMNS,
+)
+
+
+def _chunks(items: list, size: int = IMPORT_CHUNK_SIZE):
+    """按固定大小切分列表"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _insert_devices(db: Session, devices: list):
+    """
+    批量插入设备，并把生成的设备ID写回到字典的 "id" 中
+    SQLite 上 return_defaults=True 会退化为逐行插入，这里改为整批 executemany 后按资产编号（唯一）回查ID
+    """
+    for chunk in _chunks(devices):
+        # render_nulls=True：空值也写入语句，使整批使用同一条 INSERT 语句
+        db.bulk_insert_mappings(Device, chunk, render_nulls=True)
+        device_ids = dict(
+            db.query(Device.asset_id, Device.id).filter(Device.asset_id.in_([device["asset_id"] for device in chunk]))
+        )
+        for device in chunk:
+            device["id"] = device_ids[device["asset_id"]]
+
+
+def _insert_connections(db: Session, connections: list):
+    """批量插入连接"""
+    for chunk in _chunks(connections):
+        # render_nulls=True：空值也写入语句，使整批使用同一条 INSERT 语句
+        db.bulk_insert_mappings(Connection, chunk, render_nulls=True)
+
+
+def _update_connections(db: Session, connections: list):
+    """批量更新连接（字典中包含连接ID）"""
+    now = datetime.utcnow()
+    for connection in connections:
+        connection["updated_at"] = now
+    for chunk in _chunks(connections):
+        db.bulk_update_mappings(Connection, chunk)
+
+
+def _delete_connections(db: Session, connection_ids: list) -> int:
+    """按ID批量删除连接，返回删除的连接数"""
+    deleted = 0
+    for chunk in _chunks(connection_ids):
+        deleted += db.query(Connection).filter(Connection.id.in_(chunk)).delete(synchronize_session=False)
+    return deleted
+
+
+# --- 变更检测 ---
+
+def _fingerprint(values) -> tuple:
+    """
+    行指纹：按数据库中读回的形式规范化后的字段元组，作为字典键做哈希比较
+    文本列中的数字、日期等值按写入SQLite后读回的字符串形式比较
+    """
+    return tuple(
+        None if value is None else str(int(value) if isinstance(value, bool) else value)
+        for value in values
+    )
+
+
+def _connection_fingerprint(connection: dict) -> tuple:
+    """连接字典的指纹，未设置的字段视为空"""
+    return _fingerprint(connection.get(field) for field in CONNECTION_FINGERPRINT_FIELDS)
+
+
+class ConnectionSync:
+    """
+    本次导入的连接同步状态
+    预加载涉及本次导入设备的已有连接，导入的每条连接依次与之匹配：
+    - 指纹完全一致：保留原连接，不写入
+    - 键 (A端设备ID, B端设备ID, A端端口, B端端口) 一致：原地更新原连接
+    - 都不匹配：新建连接
+    导入结束后仍未匹配的已有连接即为过期连接，由 unmatched_ids() 返回并删除
+    """
+
+    UNCHANGED = "unchanged"
+    UPDATED = "updated"
+
+    def __init__(self, db: Session, device_ids: list):
+        self._unmatched = {}       # 未匹配的已有连接 {连接ID: 指纹}
+        self._by_fingerprint = {}  # 指纹 -> [连接ID]
+        self._by_key = {}          # 键 -> [连接ID]
+        self.imported_keys = set()  # 本次导入已写入或保留的连接的键
+
+        columns = [getattr(Connection, field) for field in CONNECTION_FINGERPRINT_FIELDS]
+        for chunk in _chunks(device_ids):
+            for connection_id, *values in db.query(Connection.id, *columns).filter(
+                or_(Connection.source_device_id.in_(chunk), Connection.target_device_id.in_(chunk))
+            ).order_by(Connection.id):
+                if connection_id in self._unmatched:
+                    continue
+                fingerprint = _fingerprint(values)
+                self._unmatched[connection_id] = fingerprint
+                self._by_fingerprint.setdefault(fingerprint, []).append(connection_id)
+                self._by_key.setdefault(fingerprint[:4], []).append(connection_id)
+
+    def __contains__(self, connection_id: int) -> bool:
+        """连接是否为尚未匹配的已有连接"""
+        return connection_id in self._unmatched
+
+    def _claim(self, candidates: list):
+        """从候选连接ID中取出第一个尚未匹配的连接"""
+        while candidates:
+            connection_id = candidates.pop(0)
+            if self._unmatched.pop(connection_id, None) is not None:
+                return connection_id
+        return None
+
+    def match(self, fingerprint: tuple, exact_only: bool = False):
+        """
+        为导入的连接匹配一条已有连接，返回 (UNCHANGED 或 UPDATED, 连接ID)，没有可匹配的连接时返回 (None, None)
+        exact_only=True 时只接受指纹完全一致的连接
+        """
+        connection_id = self._claim(self._by_fingerprint.get(fingerprint, []))
+        if connection_id is not None:
+            return self.UNCHANGED, connection_id
+        if not exact_only:
+            connection_id = self._claim(self._by_key.get(fingerprint[:4], []))
+            if connection_id is not None:
+                return self.UPDATED, connection_id
+        return None, None
+
+    def unmatched_ids(self) -> list:
+        """尚未匹配的已有连接ID"""
+        return sorted(self._unmatched)
+
+
+# --- 工作簿流式读取 ---
+
+def open_workbook(file):
+    """
+    以只读流式模式打开工作簿
+    file 可以是文件路径或可 seek 的文件对象（如上传文件的临时文件），不会整体读入内存
+    使用完毕后需要调用 workbook.close()
+    """
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return load_workbook(file, read_only=True, data_only=True)
+
+
+def read_header(worksheet) -> list:
+    """读取工作表第一行作为列名，空列名按 pandas 的方式命名为 'Unnamed: 序号'"""
+    worksheet.reset_dimensions()  # 部分文件记录的表格范围不准确，按实际内容读取
+    first_row = next(worksheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+    return [str(value) if value is not None else f"Unnamed: {index}" for index, value in enumerate(first_row)]
+
+
+def iter_sheet_batches(worksheet, header: list, text_columns=(), batch_size: int = READ_BATCH_SIZE):
+    """
+    从第2行开始逐批读取工作表，yield (本批第一行的Excel行号, DataFrame)
+    - EXCEL_NA_VALUES 中的文本视为空单元格，text_columns 中的列非空值统一转为字符串；
+    - 空行保留（与 pandas 读取结果一致，便于报告行号），但丢弃表格末尾的空行。
+    """
+    width = len(header)
+    text_positions = [header.index(column) for column in text_columns if column in header]
+
+    batch = []
+    pending_blank = 0   # 尚未确定是否位于表格末尾的连续空行数
+    start_row = 2
+
+    for values in worksheet.iter_rows(min_row=2, values_only=True):
+        row = [None if isinstance(value, str) and value in EXCEL_NA_VALUES else value for value in values[:width]]
+        if len(row) < width:
+            row.extend([None] * (width - len(row)))
+
+        if all(value is None for value in row):
+            pending_blank += 1
+            continue
+
+        for _ in range(pending_blank):
+            batch.append([None] * width)
+        pending_blank = 0
+
+        for position in text_positions:
+            if row[position] is not None:
+                row[position] = str(row[position])
+        batch.append(row)
+
+        if len(batch) >= batch_size:
+            yield start_row, pd.DataFrame(batch, columns=header, dtype=object)
+            start_row += len(batch)
+            batch = []
+
+    if batch:
+        yield start_row, pd.DataFrame(batch, columns=header, dtype=object)
+
+
+# --- 列运算工具 ---
+
+def _column_values(df: pd.DataFrame, column: str) -> pd.Series:
+    """取出一列的原始值（object 类型），缺少该列或值为空时为 None"""
+    if column not in df.columns:
+        return pd.Series([None] * len(df), index=df.index, dtype=object)
+    values = df[column].astype(object)
+    return values.where(values.notna(), None)
+
+
+def _text_values(df: pd.DataFrame, column: str) -> pd.Series:
+    """取出文本列：非空值转为字符串并去除首尾空白，空值为 None"""
+    values = _column_values(df, column)
+    present = values.notna()
+    if present.any():
+        values[present] = values[present].astype(str).str.strip()
+    return values
+
+
+def _is_blank(values: pd.Series) -> pd.Series:
+    """空值、空字符串、'nan'、'none'（不区分大小写）视为无效"""
+    return (
+        values.isna()
+        | (values == "")
+        | (values == "nan")
+        | (values.str.lower() == "none").fillna(False).astype(bool)
+    )
+
+
+def _reasons(mask: pd.Series, values: pd.Series, template: str) -> pd.Series:
+    """为 mask 为 True 的行生成跳过原因，其余行为 None"""
+    reasons = pd.Series(None, index=mask.index, dtype=object)
+    if mask.any():
+        reasons[mask] = [template.format(value) for value in values[mask]]
+    return reasons
+
+
+def _first_reason(*reason_columns: pd.Series) -> pd.Series:
+    """按优先顺序取每行第一个非空的跳过原因"""
+    result = reason_columns[0]
+    for reasons in reason_columns[1:]:
+        result = result.where(result.notna(), reasons)
+    return result
+
+
+def _is_missing(value) -> bool:
+    """单元格是否为空（None 或 NaN）"""
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def _cell_text(value) -> str:
+    """单元格文本：空单元格为空字符串，其余转为去除首尾空白的字符串"""
+    return "" if _is_missing(value) else str(value).strip()
+
+
+def _optional_text(value):
+    """单元格文本：空单元格为 None，其余转为去除首尾空白的字符串"""
+    return None if _is_missing(value) else str(value).strip()
+
+
+# --- 设备表（Sheet1） ---
+
+def _validate_devices(df: pd.DataFrame, seen_asset_ids: set) -> pd.DataFrame:
+    """
+    校验并规范化一批设备行，返回按行对齐的 DataFrame：
+    asset_id / name / station / device_type 为规范化后的值，skip_reason 为跳过原因（通过校验为 None）
+    校验顺序与原逐行处理一致：资产编号、设备名称、文件内重复、局站、设备类型
+    seen_asset_ids 为之前批次中已通过校验的资产编号
+    """
+    asset_ids = _text_values(df, "资产编号")
+    names = _text_values(df, "设备名称")
+    stations = _text_values(df, "局站")
+    device_types = _text_values(df, "设备类型")
+
+    asset_reasons = _reasons(_is_blank(asset_ids), asset_ids, "资产编号为空或无效: '{}'")
+    name_reasons = _reasons(_is_blank(names), names, "设备名称为空或无效: '{}'")
+    station_reasons = _reasons(_is_blank(stations), stations, "局站信息为空或无效: '{}'")
+
+    # 设备类型：为空时设为默认值，非空时必须在标准列表中（按不同取值各校验一次）
+    type_given = ~_is_blank(device_types)
+    type_reason_map = {}
+    for device_type in device_types[type_given].unique():
+        if not validate_device_type(device_type):
+            # 提供建议的设备类型
+            suggestions = get_device_type_suggestions(device_type)
+            suggestion_text = f"，建议使用: {', '.join(suggestions[:3])}" if suggestions else ""
+            type_reason_map[device_type] = f"设备类型 '{device_type}' 不在标准列表中{suggestion_text}"
+    type_reasons = device_types.map(type_reason_map).where(type_given, None)
+    type_reasons = type_reasons.astype(object).where(type_reasons.notna(), None)
+    device_types = device_types.where(type_given, DEFAULT_DEVICE_TYPE)
+
+    # 文件内重复：与前面已通过全部校验的行资产编号相同
+    basic_valid = asset_reasons.isna() & name_reasons.isna()
+    fully_valid = basic_valid & station_reasons.isna() & type_reasons.isna()
+    positions = pd.Series(np.arange(len(df)), index=df.index)
+    first_valid_position = positions[fully_valid].groupby(asset_ids[fully_valid]).min()
+    duplicate = basic_valid & (
+        asset_ids.isin(seen_asset_ids)
+        | (positions > asset_ids.map(first_valid_position).fillna(len(df)))
+    )
+    duplicate_reasons = _reasons(duplicate, asset_ids, "资产编号 '{}' 在Excel文件中重复")
+
+    return pd.DataFrame({
+        "asset_id": asset_ids,
+        "name": names,
+        "station": stations,
+        "device_type": device_types,
+        "skip_reason": _first_reason(asset_reasons, name_reasons, duplicate_reasons, station_reasons, type_reasons),
+    }, index=df.index)
+
+
+class DeviceSheetImporter:
+    """
+    设备表导入（增量更新模式：保留手工添加的设备，只创建或更新Excel中的设备）
+    按批次调用 add_batch() 写入设备，全部批次完成后调用 finish()：
+    删除涉及Excel设备的旧连接，并按“上级设备”列重新创建连接
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        # 一次查询预加载已有设备的资产编号和字段指纹
+        self.existing_ids = {}           # {资产编号: 设备ID}
+        self.existing_fingerprints = {}  # {资产编号: 设备字段指纹}
+        columns = [getattr(Device, field) for field in DEVICE_FINGERPRINT_FIELDS]
+        for device_id, asset_id, *values in db.query(Device.id, Device.asset_id, *columns):
+            self.existing_ids[asset_id] = device_id
+            self.existing_fingerprints[asset_id] = _fingerprint(values)
+        self.devices_map = {}  # 本次导入的设备 {资产编号: 设备ID}
+        self.devices_created = 0
+        self.devices_updated = 0
+        self.devices_unchanged = 0
+        self.connection_sync = None  # finish() 中创建，供连接表导入继续匹配已有连接
+        self.skipped_rows = []
+        self.rows_processed = 0
+        self._connection_candidates = []  # 每批中可能创建连接的行
+
+    def add_batch(self, start_row: int, df: pd.DataFrame, validated: pd.DataFrame = None):
+        """
+        校验并写入一批设备行，start_row 为本批第一行的Excel行号
+        validated 为 validate_device_batches() 预先校验的结果，为 None 时在这里校验
+        """
+        df = df.reset_index(drop=True)
+        row_numbers = df.index + start_row
+
+        if validated is None:
+            validated = _validate_devices(df, self.devices_map.keys())
+        accepted = validated["skip_reason"].isna()
+        self.skipped_rows.extend(zip(row_numbers[~accepted].tolist(), validated["skip_reason"][~accepted].tolist()))
+
+        records = validated.loc[accepted, ["asset_id", "name", "station", "device_type"]]
+        for field, column in DEVICE_FIELD_COLUMNS.items():
+            records[field] = _column_values(df, column)[accepted]
+
+        new_devices = []
+        updated_devices = []
+        unchanged_devices = []
+        for record in records.to_dict("records"):
+            parsed, quality = lifecycle.normalize_commission_date(record["commission_date"])
+            record["commission_date_parsed"] = parsed.date() if parsed else None
+            record["commission_date_quality"] = quality
+
+            device_id = self.existing_ids.get(record["asset_id"])
+            if device_id is None:
+                new_devices.append(record)
+                continue
+            record["id"] = device_id
+            # 字段与数据库中完全一致的设备不更新
+            fingerprint = _fingerprint(record[field] for field in DEVICE_FINGERPRINT_FIELDS)
+            if fingerprint == self.existing_fingerprints.get(record["asset_id"]):
+                unchanged_devices.append(record)
+            else:
+                updated_devices.append(record)
+
+        _insert_devices(self.db, new_devices)
+        for chunk in _chunks(updated_devices):
+            self.db.bulk_update_mappings(Device, chunk)
+
+        for record in new_devices + updated_devices + unchanged_devices:
+            self.devices_map[record["asset_id"]] = record["id"]
+        self.devices_created += len(new_devices)
+        self.devices_updated += len(updated_devices)
+        self.devices_unchanged += len(unchanged_devices)
+        self.rows_processed += len(df)
+
+        # 连接要等全部设备写入后才能解析，这里只保留需要的列
+        source_asset_ids = _text_values(df, "上级设备")
+        target_asset_ids = validated["asset_id"]
+        # 没有上级设备信息或目标资产编号为空的行不创建连接
+        candidate = ~_is_blank(source_asset_ids) & target_asset_ids.notna() & (target_asset_ids != "")
+        if candidate.any():
+            self._connection_candidates.append(pd.DataFrame({
+                "row_number": row_numbers[candidate.to_numpy()],
+                "source_asset_id": source_asset_ids[candidate],
+                "target_asset_id": target_asset_ids[candidate],
+                "source_port": _column_values(df, "上级端口")[candidate],
+                "target_port": _column_values(df, "本端端口")[candidate],
+                "cable_type": _column_values(df, "线缆类型")[candidate],
+            }))
+
+        print(f"  已处理设备表 {self.rows_processed} 行（新建 {self.devices_created}，更新 {self.devices_updated}，未变化 {self.devices_unchanged}，跳过 {len(self.skipped_rows)}）")
+
+    def finish(self) -> dict:
+        """
+        提交设备，同步涉及Excel设备的连接，返回导入结果：
+        - devices_created / devices_updated / devices_unchanged: 新建、更新、未变化的设备数
+        - skipped_rows: 跳过的设备行 [(Excel行号, 原因)]
+        - devices_map: 本次导入的设备 {资产编号: 设备ID}
+        - connections_created / connections_updated / connections_unchanged: 新建、更新、未变化的连接数
+        - connection_skipped_rows: 跳过的连接行 [(Excel行号, 原因)]
+        涉及Excel设备、但本次导入中没有对应行的旧连接在连接表导入之后删除（见 import_workbook）
+        """
+        db = self.db
+        db.commit()
+
+        # 预加载涉及Excel设备的已有连接，与“上级设备”生成的连接逐一匹配
+        sync = ConnectionSync(db, list(self.devices_map.values()))
+        self.connection_sync = sync
+
+        connections, connection_skipped_rows = self._build_connections()
+        fingerprints = [_connection_fingerprint(connection) for connection in connections]
+        matches = [sync.match(fingerprint, exact_only=True) for fingerprint in fingerprints]
+        new_connections = []
+        updated_connections = []
+        unchanged_count = 0
+        for connection, fingerprint, (status, connection_id) in zip(connections, fingerprints, matches):
+            if status is None:
+                # 先匹配完全一致的连接，剩余的再按键匹配已有连接原地更新
+                status, connection_id = sync.match(fingerprint)
+            sync.imported_keys.add(fingerprint[:4])
+            if status == ConnectionSync.UNCHANGED:
+                unchanged_count += 1
+            elif status == ConnectionSync.UPDATED:
+                updated_connections.append(
+                    dict({field: connection.get(field) for field in CONNECTION_FINGERPRINT_FIELDS}, id=connection_id)
+                )
+            else:
+                new_connections.append(connection)
+
+        _insert_connections(db, new_connections)
+        _update_connections(db, updated_connections)
+        db.commit()
+
+        return {
+            "rows_processed": self.rows_processed,
+            "devices_created": self.devices_created,
+            "devices_updated": self.devices_updated,
+            "devices_unchanged": self.devices_unchanged,
+            "skipped_rows": self.skipped_rows,
+            "devices_map": self.devices_map,
+            "connections_created": len(new_connections),
+            "connections_updated": len(updated_connections),
+            "connections_unchanged": unchanged_count,
+            "connection_skipped_rows": connection_skipped_rows,
+        }
+
+    def _build_connections(self) -> tuple:
+        """
+        按“上级设备”（父设备资产编号）生成连接记录，返回 (连接字典列表, 跳过的行)
+        源设备和目标设备都必须是本次导入的设备
+        """
+        if not self._connection_candidates:
+            return [], []
+        candidates = pd.concat(self._connection_candidates, ignore_index=True)
+
+        source_ids = candidates["source_asset_id"].map(self.devices_map)
+        target_ids = candidates["target_asset_id"].map(self.devices_map)
+        source_missing = source_ids.isna()
+        target_missing = ~source_missing & target_ids.isna()
+        skip_reasons = _first_reason(
+            _reasons(source_missing, candidates["source_asset_id"], "上级设备 '{}' 不存在"),
+            _reasons(target_missing, candidates["target_asset_id"], "目标设备 '{}' 不存在"),
+        )
+        skipped = skip_reasons.notna()
+        connection_skipped_rows = list(zip(candidates["row_number"][skipped].tolist(), skip_reasons[skipped].tolist()))
+
+        creatable = ~skipped
+        connections = pd.DataFrame({
+            "source_device_id": source_ids[creatable].astype(int),
+            "source_port": candidates["source_port"][creatable],
+            "target_device_id": target_ids[creatable].astype(int),
+            "target_port": candidates["target_port"][creatable],
+            "cable_type": candidates["cable_type"][creatable],
+        })
+        return connections.to_dict("records"), connection_skipped_rows
+
+
+def validate_device_batches(batches):
+    """
+    逐批校验设备表，产出 (start_row, DataFrame, 校验结果)
+    文件内重复按本文件之前批次中已通过校验的资产编号判断，结果与导入时逐批校验一致，
+    因此可以在解析进程中预先完成校验
+    """
+    seen_asset_ids = set()
+    for start_row, df in batches:
+        df = df.reset_index(drop=True)
+        validated = _validate_devices(df, seen_asset_ids)
+        seen_asset_ids.update(validated["asset_id"][validated["skip_reason"].isna()])
+        yield start_row, df, validated
+
+
+# --- 连接表（Sheet2） ---
+
+def _build_port_info(fuse_number, fuse_spec, breaker_number, breaker_spec):
+    """构建端口信息，优先使用熔丝，其次使用空开"""
+    fuse_num = _cell_text(fuse_number)
+    fuse_sp = _cell_text(fuse_spec)
+    breaker_num = _cell_text(breaker_number)
+    breaker_sp = _cell_text(breaker_spec)
+
+    if fuse_num and fuse_num != 'nan':
+        return f"{fuse_num} ({fuse_sp})" if fuse_sp and fuse_sp != 'nan' else fuse_num
+    elif breaker_num and breaker_num != 'nan':
+        return f"{breaker_num} ({breaker_sp})" if breaker_sp and breaker_sp != 'nan' else breaker_num
+    else:
+        return None
+
+
+class DeviceNameResolver:
+    """
+    导入范围内的设备名称解析器：一次查询预加载全部设备的 名称 -> 设备ID，
+    名称不存在的设备先登记，再由 create_pending() 批量创建
+    同名设备有多个时取ID最小的一个（与按名称查询第一条记录一致）
+    """
+
+    def __init__(self, db: Session, default_station: str = "未知站点"):
+        self.db = db
+        self.default_station = default_station
+        self.device_ids = {}          # 设备名称 -> 设备ID
+        self.auto_created_ids = set()  # 通过Excel导入自动创建、信息尚未完善的设备ID
+        self.asset_ids = set()        # 已占用的资产编号
+        self._pending = {}            # 待创建的设备 {设备名称: 设备字典}
+
+        for device_id, name, asset_id, remark in db.query(
+            Device.id, Device.name, Device.asset_id, Device.remark
+        ).order_by(Device.id):
+            self.asset_ids.add(asset_id)
+            if name not in self.device_ids:
+                self.device_ids[name] = device_id
+                if remark and "通过Excel导入时自动创建" in remark:
+                    self.auto_created_ids.add(device_id)
+
+    def _allocate_asset_id(self, device_name: str) -> str:
+        """生成自动创建设备的资产编号：AUTO_名称长度_名称校验码，已被占用时追加序号"""
+        base = f"AUTO_{len(device_name)}_{zlib.crc32(device_name.encode('utf-8')) % 10000:04d}"
+        asset_id = base
+        suffix = 2
+        while asset_id in self.asset_ids:
+            asset_id = f"{base}_{suffix}"
+            suffix += 1
+        self.asset_ids.add(asset_id)
+        return asset_id
+
+    def register(self, device_name: str):
+        """登记设备名称，设备不存在时加入待创建列表"""
+        if device_name in self.device_ids or device_name in self._pending:
+            return
+        parsed, quality = lifecycle.normalize_commission_date(None)
+        self._pending[device_name] = {
+            "name": device_name,
+            "asset_id": self._allocate_asset_id(device_name),
+            "station": self.default_station,
+            "device_type": DEFAULT_DEVICE_TYPE,
+            "location": "待确认",
+            "remark": AUTO_CREATED_REMARK,
+            "commission_date_parsed": parsed,
+            "commission_date_quality": quality,
+        }
+
+    def create_pending(self) -> list:
+        """批量创建已登记的新设备（不提交），返回创建的设备名称"""
+        new_devices = list(self._pending.values())
+        self._pending = {}
+        _insert_devices(self.db, new_devices)
+        for device in new_devices:
+            self.device_ids[device["name"]] = device["id"]
+            self.auto_created_ids.add(device["id"])
+            print(f"  * 自动创建设备: {device['name']} (ID: {device['id']})")
+        return [device["name"] for device in new_devices]
+
+    def resolve(self, device_name: str):
+        """返回设备ID，设备不存在（或尚未创建）时返回 None"""
+        return self.device_ids.get(device_name)
+
+    def is_auto_created(self, device_id: int) -> bool:
+        """设备是否为导入时自动创建、信息尚未完善的设备"""
+        return device_id in self.auto_created_ids
+
+
+class ConnectionSheetImporter:
+    """
+    连接表（Sheet2）导入：按A端、B端设备名称创建连接，设备不存在时自动创建
+    按批次调用 add_batch()，全部批次完成后调用 finish() 提交
+    设备名称和已有连接在创建导入器时一次性预加载，之后每批只有批量写入，查询次数与行数无关
+    与已有连接完全一致的行不写入，涉及设备表设备的已有连接按键原地更新
+    """
+
+    SKIPPED = "skipped"
+
+    def __init__(self, db: Session, connection_sync: ConnectionSync):
+        self.db = db
+        self.resolver = DeviceNameResolver(db)
+        # 涉及设备表设备的已有连接（由设备表导入预加载），本批匹配后保留或原地更新
+        self.connection_sync = connection_sync
+        # 其他已有连接 {键: 指纹}，键为 (A端设备ID, B端设备ID, A端端口, B端端口)
+        self.stored_connections = {}
+        columns = [getattr(Connection, field) for field in CONNECTION_FINGERPRINT_FIELDS]
+        for connection_id, *values in db.query(Connection.id, *columns).order_by(Connection.id):
+            if connection_id in connection_sync:
+                continue
+            fingerprint = _fingerprint(values)
+            self.stored_connections.setdefault(fingerprint[:4], fingerprint)
+        self.connections_created = 0
+        self.connections_updated = 0
+        self.connections_unchanged = 0
+        self.devices_created = 0
+        self.skipped_rows = []
+        self.created_devices = []
+        self.warnings = []
+        self.rows_processed = 0
+        self._created_device_names = set()
+
+    def add_batch(self, start_row: int, df: pd.DataFrame):
+        """处理一批连接行，start_row 为本批第一行的Excel行号"""
+        rows = df.to_dict("records")
+
+        # 第一遍：登记本批所有设备名称，不存在的设备一次批量创建
+        for row in rows:
+            source_device_name = _cell_text(row.get('A端设备名称'))
+            target_device_name = _cell_text(row.get('B端设备名称'))
+            if source_device_name and target_device_name:
+                self.resolver.register(source_device_name)
+                self.resolver.register(target_device_name)
+        self.devices_created += len(self.resolver.create_pending())
+
+        # 第二遍：按行顺序生成连接
+        new_connections = []
+        updated_connections = []
+        for offset, row in enumerate(rows):
+            row_number = start_row + offset
+            try:
+                connection = self._build_row(row_number, row)
+                if connection is None:
+                    continue
+                status, connection_id = self._match_connection(row_number, connection)
+            except Exception as conn_error:
+                skip_reason = f"处理连接失败: {conn_error}"
+                print(f"  - 第 {row_number} 行：跳过连接，{skip_reason}")
+                self.skipped_rows.append((row_number, skip_reason))
+                continue
+            if status == ConnectionSync.UPDATED:
+                connection["id"] = connection_id
+                updated_connections.append(connection)
+            elif status is None:
+                new_connections.append(connection)
+
+        _insert_connections(self.db, new_connections)
+        _update_connections(self.db, updated_connections)
+        self.connections_created += len(new_connections)
+        self.connections_updated += len(updated_connections)
+        self.rows_processed += len(df)
+        print(f"  已处理连接表 {self.rows_processed} 行（创建 {self.connections_created}，跳过 {len(self.skipped_rows)}）")
+
+    def _build_row(self, row_number: int, row: dict):
+        """处理一行连接数据，返回待写入的连接字典，跳过的行返回 None"""
+        # 获取设备名称
+        source_device_name = _cell_text(row.get('A端设备名称'))
+        target_device_name = _cell_text(row.get('B端设备名称'))
+
+        # 处理空设备名称的情况
+        if not source_device_name and not target_device_name:
+            skip_reason = "A端和B端设备名称都为空"
+        elif not source_device_name:
+            skip_reason = "A端设备名称为空"
+        elif not target_device_name:
+            skip_reason = "B端设备名称为空"
+        else:
+            skip_reason = None
+        if skip_reason:
+            print(f"  - 第 {row_number} 行：跳过连接，{skip_reason}")
+            self.skipped_rows.append((row_number, skip_reason))
+            return None
+
+        # 获取设备（不存在的设备已在本批第一遍中创建）
+        source_device_id = self.resolver.resolve(source_device_name)
+        target_device_id = self.resolver.resolve(target_device_name)
+
+        if source_device_id is None or target_device_id is None:
+            skip_reason = "设备创建失败"
+            print(f"  - 第 {row_number} 行：跳过连接，{skip_reason}")
+            self.skipped_rows.append((row_number, skip_reason))
+            return None
+
+        # 记录新创建的设备
+        for device_id, device_name in ((source_device_id, source_device_name), (target_device_id, target_device_name)):
+            if self.resolver.is_auto_created(device_id) and device_name not in self._created_device_names:
+                self._created_device_names.add(device_name)
+                self.created_devices.append(device_name)
+
+        # 构建A端和B端端口信息
+        source_port = _build_port_info(
+            row.get('A端熔丝编号'), row.get('A端熔丝规格'),
+            row.get('A端空开编号'), row.get('A端空开规格')
+        )
+        target_port = _build_port_info(
+            row.get('B端熔丝编号'), row.get('B端熔丝规格'),
+            row.get('B端空开编号'), row.get('空开规格')
+        )
+
+        # 处理连接类型 - 空值说明是空闲端口，不设置连接类型
+        connection_type_raw = _cell_text(row.get('连接类型（交流/直流）'))
+        if connection_type_raw == '':
+            connection_type = None
+        else:
+            # 无法映射时设置为None而不是默认的'cable'，避免空闲端口被错误归类为电缆连接
+            connection_type = CONNECTION_TYPE_MAPPING.get(connection_type_raw, None)
+
+            # 如果连接类型仍然无法识别，记录警告但不设置为cable
+            if connection_type_raw not in CONNECTION_TYPE_MAPPING:
+                print(f"  * 警告：第 {row_number} 行连接类型 '{connection_type_raw}' 无法识别，设置为空闲端口")
+                self.warnings.append(f"第 {row_number} 行：连接类型 '{connection_type_raw}' 无法识别")
+
+        connection = {
+            "source_device_id": source_device_id,
+            "target_device_id": target_device_id,
+            "source_port": source_port,
+            "target_port": target_port,
+            "connection_type": connection_type,
+            # 安装日期（Excel中没有此字段，设置为None）
+            "installation_date": None,
+        }
+        for field, column in CONNECTION_FIELD_COLUMNS.items():
+            connection[field] = _optional_text(row.get(column))
+        connection["cable_type"] = None
+        return connection
+
+    def _match_connection(self, row_number: int, connection: dict):
+        """
+        与已有连接比较，返回 (状态, 连接ID)：
+        - (UNCHANGED, ID): 已有完全一致的连接，不写入
+        - (UPDATED, ID): 原地更新涉及设备表设备的已有连接
+        - (None, None): 需要新建
+        连接已存在（本次导入中已写入同一个键，或其他已有连接的键相同但内容不同）时记录跳过并返回 (SKIPPED, None)
+        """
+        fingerprint = _connection_fingerprint(connection)
+        connection_key = fingerprint[:4]
+
+        # 检查是否已存在相同连接（包括本次导入中已写入的连接）
+        if connection_key not in self.connection_sync.imported_keys:
+            self.connection_sync.imported_keys.add(connection_key)
+            status, connection_id = self.connection_sync.match(fingerprint)
+            if status is not None:
+                if status == ConnectionSync.UNCHANGED:
+                    self.connections_unchanged += 1
+                return status, connection_id
+
+            stored_fingerprint = self.stored_connections.get(connection_key)
+            if stored_fingerprint is None:
+                return None, None
+            if stored_fingerprint == fingerprint:
+                self.connections_unchanged += 1
+                return ConnectionSync.UNCHANGED, None
+
+        skip_reason = "连接已存在"
+        print(f"  - 第 {row_number} 行：跳过连接，{skip_reason}")
+        self.skipped_rows.append((row_number, skip_reason))
+        return self.SKIPPED, None
+
+    def finish(self) -> dict:
+        """
+        提交连接，返回导入结果：
+        - rows_processed: 处理的行数
+        - connections_created / connections_updated / connections_unchanged: 新建、更新、未变化的连接数
+        - devices_created: 本次自动创建的设备数
+        - skipped_rows: 跳过的连接行 [(Excel行号, 原因)]
+        - created_devices: 自动创建（信息尚未完善）的设备名称
+        - warnings: 警告信息
+        """
+        if self.connections_created + self.connections_updated > 0:
+            print(f"\n准备提交 {self.connections_created + self.connections_updated} 个Sheet2连接到数据库...")
+        self.db.commit()
+
+        return {
+            "rows_processed": self.rows_processed,
+            "connections_created": self.connections_created,
+            "connections_updated": self.connections_updated,
+            "connections_unchanged": self.connections_unchanged,
+            "devices_created": self.devices_created,
+            "skipped_rows": self.skipped_rows,
+            "created_devices": self.created_devices,
+            "warnings": self.warnings,
+        }
+
+
+# --- 工作簿导入 ---
+
+class ImportValidationError(ValueError):
+    """工作簿结构不符合要求（如缺少必要的列），导入未执行"""
+
+
+def _diff_summary(sheet1_result: dict, sheet2_result) -> dict:
+    """汇总两个工作表的变更：设备和连接各自新建、更新、未变化（连接另有删除）的数量"""
+    sheet2_result = sheet2_result or {}
+    return {
+        "devices_created": sheet1_result["devices_created"] + sheet2_result.get("devices_created", 0),
+        "devices_updated": sheet1_result["devices_updated"],
+        "devices_unchanged": sheet1_result["devices_unchanged"],
+        "connections_created": sheet1_result["connections_created"] + sheet2_result.get("connections_created", 0),
+        "connections_updated": sheet1_result["connections_updated"] + sheet2_result.get("connections_updated", 0),
+        "connections_unchanged": sheet1_result["connections_unchanged"] + sheet2_result.get("connections_unchanged", 0),
+        "connections_deleted": sheet1_result["old_connections_deleted"],
+    }
+
+
+# 导入阶段（用于进度回调）
+STAGE_DEVICES = "devices"          # 导入设备表
+STAGE_CONNECTIONS = "connections"  # 按“上级设备”重建设备表连接
+STAGE_SHEET2 = "sheet2"            # 导入“连接”工作表
+
+
+def import_workbook(db: Session, file, progress=None) -> dict:
+    """
+    导入工作簿：只打开一次，依次流式处理设备表和“连接”工作表
+    file 为文件路径或可 seek 的文件对象
+    progress 为可选的进度回调 progress(阶段, 本阶段已处理行数, 本阶段跳过行数)，每批处理完成后调用
+    只写入实际发生变化的设备和连接，重新导入未修改的工作簿不会写入数据
+    返回 {"sheet1": 设备表结果, "sheet2": 连接表结果或 None, "sheet2_error": 连接表错误信息或 None,
+          "diff": 变更汇总（见 _diff_summary）}
+    """
+    workbook = open_workbook(file)
+    try:
+        device_sheet = workbook.worksheets[0]
+        header = _read_device_header(device_sheet)
+        device_batches = (
+            (start_row, batch, None)
+            for start_row, batch in iter_sheet_batches(device_sheet, header, DEVICE_SHEET_TEXT_COLUMNS)
+        )
+
+        connection_batches = None
+        if CONNECTION_SHEET_NAME in workbook.sheetnames:
+            def connection_batches():
+                connection_sheet = workbook[CONNECTION_SHEET_NAME]
+                return iter_sheet_batches(connection_sheet, read_header(connection_sheet))
+
+        return _import_sheets(db, device_batches, connection_batches, progress)
+    finally:
+        workbook.close()
+
+
+def read_workbook(file) -> dict:
+    """
+    读取并校验整个工作簿（不访问数据库），结果可以跨进程传递，再由 import_parsed_workbook() 写入数据库
+    返回 {"device_batches": [(start_row, DataFrame, 校验结果)],
+          "connection_batches": [(start_row, DataFrame)] 或 None（没有“连接”工作表）,
+          "connection_error": 读取“连接”工作表的错误信息或 None}
+    工作簿结构不符合要求时抛出 ImportValidationError
+    """
+    workbook = open_workbook(file)
+    try:
+        device_sheet = workbook.worksheets[0]
+        header = _read_device_header(device_sheet)
+        device_batches = list(validate_device_batches(
+            iter_sheet_batches(device_sheet, header, DEVICE_SHEET_TEXT_COLUMNS)
+        ))
+
+        connection_batches = None
+        connection_error = None
+        if CONNECTION_SHEET_NAME in workbook.sheetnames:
+            try:
+                connection_sheet = workbook[CONNECTION_SHEET_NAME]
+                connection_batches = list(iter_sheet_batches(connection_sheet, read_header(connection_sheet)))
+            except Exception as e:
+                connection_error = str(e)
+
+        return {
+            "device_batches": device_batches,
+            "connection_batches": connection_batches,
+            "connection_error": connection_error,
+        }
+    finally:
+        workbook.close()
+
+
+def import_parsed_workbook(db: Session, parsed: dict, progress=None) -> dict:
+    """把 read_workbook() 的结果写入数据库，返回值与 import_workbook() 相同"""
+    connection_batches = None
+    if parsed["connection_error"] is not None:
+        def connection_batches():
+            raise RuntimeError(parsed["connection_error"])
+    elif parsed["connection_batches"] is not None:
+        def connection_batches():
+            return parsed["connection_batches"]
+
+    return _import_sheets(db, parsed["device_batches"], connection_batches, progress)
+
+
+def _read_device_header(device_sheet) -> list:
+    """读取设备表列名并验证必要的列是否存在"""
+    header = read_header(device_sheet)
+    print(f"设备表列名: {header}")
+
+    missing_columns = [column for column in DEVICE_SHEET_REQUIRED_COLUMNS if column not in header]
+    if missing_columns:
+        raise ImportValidationError(f"Excel文件缺少必要的列: {missing_columns}")
+    return header
+
+
+def _import_sheets(db: Session, device_batches, connection_batches, progress=None) -> dict:
+    """
+    依次导入设备表和连接表
+    device_batches 为 (start_row, DataFrame, 校验结果或 None) 的可迭代对象；
+    connection_batches 为返回 (start_row, DataFrame) 可迭代对象的函数，没有“连接”工作表时为 None
+    """
+    def report(stage, importer):
+        if progress is not None:
+            progress(stage, importer.rows_processed, len(importer.skipped_rows))
+
+    # 设备表：第一个工作表
+    device_importer = DeviceSheetImporter(db)
+    for start_row, batch, validated in device_batches:
+        device_importer.add_batch(start_row, batch, validated)
+        report(STAGE_DEVICES, device_importer)
+    if progress is not None:
+        progress(STAGE_CONNECTIONS, 0, 0)
+    sheet1_result = device_importer.finish()
+    connection_sync = device_importer.connection_sync
+    stale_connection_ids = connection_sync.unmatched_ids()
+
+    # 连接表：按名称读取，不存在或处理出错时不影响设备表的导入结果
+    sheet2_result = None
+    sheet2_error = None
+    if connection_batches is not None:
+        try:
+            connection_importer = ConnectionSheetImporter(db, connection_sync)
+            for start_row, batch in connection_batches():
+                connection_importer.add_batch(start_row, batch)
+                report(STAGE_SHEET2, connection_importer)
+            sheet2_result = connection_importer.finish()
+            stale_connection_ids = connection_sync.unmatched_ids()
+        except Exception as sheet2_exception:
+            # 连接表的写入已回滚，按连接表导入前的匹配结果删除旧连接
+            db.rollback()
+            sheet2_error = str(sheet2_exception)
+    else:
+        print(f"工作簿中没有 '{CONNECTION_SHEET_NAME}' 工作表，跳过Sheet2处理")
+
+    # 删除涉及Excel设备、但两个工作表中都没有对应行的旧连接
+    sheet1_result["old_connections_deleted"] = _delete_connections(db, stale_connection_ids)
+    db.commit()
+
+    return {
+        "sheet1": sheet1_result,
+        "sheet2": sheet2_result,
+        "sheet2_error": sheet2_error,
+        "diff": _diff_summary(sheet1_result, sheet2_result),
+    }
+
+
+# --- 导入结果 ---
+
+def summarize_import_result(result: dict) -> dict:
+    """把 import_workbook 的返回值整理为可保存为JSON的导入结果（不含设备ID映射）"""
+    sheet1 = result["sheet1"]
+    sheet2 = result["sheet2"]
+    return {
+        "rows_processed": sheet1["rows_processed"],
+        "devices_created": sheet1["devices_created"],
+        "devices_updated": sheet1["devices_updated"],
+        "devices_unchanged": sheet1["devices_unchanged"],
+        "skipped_rows": sheet1["skipped_rows"],
+        "old_connections_deleted": sheet1["old_connections_deleted"],
+        "connections_created": sheet1["connections_created"],
+        "connections_updated": sheet1["connections_updated"],
+        "connections_unchanged": sheet1["connections_unchanged"],
+        "connection_skipped_rows": sheet1["connection_skipped_rows"],
+        "sheet2_rows_processed": sheet2["rows_processed"] if sheet2 else 0,
+        "sheet2_connections_created": sheet2["connections_created"] if sheet2 else 0,
+        "sheet2_connections_updated": sheet2["connections_updated"] if sheet2 else 0,
+        "sheet2_connections_unchanged": sheet2["connections_unchanged"] if sheet2 else 0,
+        "sheet2_skipped_rows": sheet2["skipped_rows"] if sheet2 else [],
+        "sheet2_created_devices": sheet2["created_devices"] if sheet2 else [],
+        "sheet2_warnings": sheet2["warnings"] if sheet2 else [],
+        "sheet2_error": result["sheet2_error"],
+        "diff": result["diff"],
+    }
+
+
+def print_import_report(db: Session, result: dict):
+    """打印导入报告（与原先在上传请求中打印的日志一致）"""
+    sheet1_result = result["sheet1"]
+    devices_created_count = sheet1_result["devices_created"]
+    devices_updated_count = sheet1_result["devices_updated"]
+    skipped_rows = sheet1_result["skipped_rows"]
+    connections_created_count = sheet1_result["connections_created"]
+    connection_skipped_rows = sheet1_result["connection_skipped_rows"]
+    
+    # 验证设备数量
+    actual_device_count = db.query(Device).count()
+    print(f"步骤 3: 完成。读取到 {sheet1_result['rows_processed']} 行数据，新建 {devices_created_count} 个设备，更新 {devices_updated_count} 个设备，{sheet1_result['devices_unchanged']} 个设备未变化，数据库中总共有 {actual_device_count} 个设备。")
+    
+    if skipped_rows:
+        print(f"\n跳过的行数统计: {len(skipped_rows)} 行")
+        for row_num, reason in skipped_rows[:5]:  # 只显示前5个
+            print(f"  第{row_num}行: {reason}")
+        if len(skipped_rows) > 5:
+            print(f"  ... 还有 {len(skipped_rows) - 5} 行被跳过")
+    
+    print(f"步骤 4: 完成。删除了 {sheet1_result['old_connections_deleted']} 个涉及Excel设备的旧连接")
+        
+    # 验证连接是否真的被创建
+    actual_connection_count = db.query(Connection).count()
+    print(f"步骤 5: 完成。新建 {connections_created_count} 个连接，更新 {sheet1_result['connections_updated']} 个连接，{sheet1_result['connections_unchanged']} 个连接未变化，实际数据库中有 {actual_connection_count} 个连接。")
+    
+    if connection_skipped_rows:
+        print(f"\n连接跳过的行数统计: {len(connection_skipped_rows)} 行")
+        for row_num, reason in connection_skipped_rows[:5]:  # 只显示前5个
+            print(f"  第{row_num}行: {reason}")
+        if len(connection_skipped_rows) > 5:
+            print(f"  ... 还有 {len(connection_skipped_rows) - 5} 行连接被跳过")
+    
+    # 步骤 6: Sheet2连接数据的处理结果
+    sheet2_result = result["sheet2"]
+    sheet2_connections_count = sheet2_result["connections_created"] if sheet2_result else 0
+    
+    if result["sheet2_error"]:
+        print(f"处理Sheet2时出错: {result['sheet2_error']}")
+        print("继续完成导入，忽略Sheet2错误")
+    elif sheet2_result and sheet2_result["rows_processed"] > 0:
+        sheet2_skipped_rows = sheet2_result["skipped_rows"]
+        created_devices = sheet2_result["created_devices"]
+        sheet2_total_rows = sheet2_result["rows_processed"]
+        sheet2_imported_count = sheet2_connections_count + sheet2_result["connections_updated"] + sheet2_result["connections_unchanged"]
+        
+        # 生成详细的导入报告
+        print(f"\n=== Sheet2连接导入报告 ===")
+        print(f"总连接数: {sheet2_total_rows} 行")
+        print(f"成功导入: {sheet2_imported_count} 个连接（新建 {sheet2_connections_count}，更新 {sheet2_result['connections_updated']}，未变化 {sheet2_result['connections_unchanged']}）")
+        print(f"跳过连接: {len(sheet2_skipped_rows)} 行")
+        
+        if created_devices:
+            print(f"\n自动创建的设备 ({len(created_devices)} 个):")
+            for device_name in created_devices:
+                print(f"  + {device_name}")
+            print("\n注意: 自动创建的设备信息不完整，请在设备管理页面完善相关信息。")
+        
+        if sheet2_skipped_rows:
+            print(f"\n跳过的连接详情:")
+            skip_reasons = {}
+            for row_num, reason in sheet2_skipped_rows:
+                if reason not in skip_reasons:
+                    skip_reasons[reason] = []
+                skip_reasons[reason].append(row_num)
+            
+            for reason, rows in skip_reasons.items():
+                print(f"  {reason}: {len(rows)} 行 (第{', '.join(map(str, rows[:3]))}行{'...' if len(rows) > 3 else ''})")
+        
+        # 计算导入成功率
+        success_rate = (sheet2_imported_count / sheet2_total_rows) * 100
+        print(f"\n导入成功率: {success_rate:.1f}% ({sheet2_imported_count}/{sheet2_total_rows})")
+    
+    print(f"步骤 6: 完成。从Sheet2创建了 {sheet2_connections_count} 个连接")
+    
+    # 最终统计
+    final_connection_count = db.query(Connection).count()
+    total_connections_created = connections_created_count + sheet2_connections_count
+    
+    print("\n=== Excel文件增量更新处理成功 ===")
+    print(f"处理结果: 新建 {devices_created_count} 个设备, 更新 {devices_updated_count} 个设备")
+    print(f"连接创建: Sheet1创建 {connections_created_count} 个, Sheet2创建 {sheet2_connections_count} 个, 总计 {total_connections_created} 个")
+    diff = result["diff"]
+    print(f"变更汇总: 设备 新建 {diff['devices_created']} / 更新 {diff['devices_updated']} / 未变化 {diff['devices_unchanged']}，"
+          f"连接 新建 {diff['connections_created']} / 更新 {diff['connections_updated']} / 未变化 {diff['connections_unchanged']} / 删除 {diff['connections_deleted']}")
+    print(f"数据库最终状态: {actual_device_count} 个设备, {final_connection_count} 个连接")
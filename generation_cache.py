@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+懒加载缓存模块（永久模块，供各进程内全局缓存使用）
+
+GenerationCache 封装“首次访问时从数据库构建、写入后失效、下次访问时重建”的缓存，
+拓扑索引、设备查找表、设备联想索引、生命周期规则都使用它：
+- 同一时间只有一个线程在构建，其他线程等待后直接使用构建好的结果；
+- 每次失效时代数（generation）加一；构建完成时代数已变化，说明构建期间数据被修改，
+  结果只返回给当前请求，不写入缓存；
+- 支持增量更新的缓存（如设备联想索引）通过 update() 在锁内修改已构建的值。
+注意：缓存是进程级的，多进程部署时每个进程各自维护一份。
+"""
+
+import threading
+
+
+class GenerationCache:
+    """按代数校验的懒加载缓存，build(db) 从数据库构建缓存值"""
+
+    def __init__(self, build):
+        self._build = build
+        self.lock = threading.Lock()           # 保护缓存值和代数；需要与 update() 互斥的读取也在此锁内进行
+        self._build_lock = threading.Lock()    # 保证同一时间只有一个线程在构建
+        self._value = None
+        self._generation = 0
+
+    def get(self, db):
+        """获取缓存值，缓存失效时自动重建"""
+        value = self._value
+        if value is not None:
+            return value
+
+        with self._build_lock:
+            with self.lock:
+                if self._value is not None:
+                    return self._value
+                generation = self._generation
+
+            value = self._build(db)
+
+            with self.lock:
+                if generation == self._generation:
+                    self._value = value
+            return value
+
+    def update(self, modify):
+        """
+        增量修改已构建的缓存值：modify(value) 在锁内执行
+        尚未构建或正在构建时只使代数加一，正在进行的构建结果不写入缓存，下次访问时重建
+        """
+        with self.lock:
+            if self._value is not None:
+                modify(self._value)
+            else:
+                self._generation += 1
+
+    def invalidate(self):
+        """使缓存失效（数据写入后调用），下次访问时重建"""
+        with self.lock:
+            self._value = None
+            self._generation += 1
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Excel导入任务模块（永久模块，进程内后台线程执行，任务状态持久化在 import_jobs 表）
+
+用途：/upload（单个工作簿）和 /upload-bulk（多个工作簿的zip压缩包）只保存上传文件并登记导入任务，立即返回任务ID；
+导入在后台的单个工作线程中按提交顺序依次执行（同一时间只有一个导入在写数据库），
+/api/import-jobs/{id} 查询任务进度和导入结果。
+
+导入过程中会长时间持有SQLite写事务，期间无法再写入任务表，
+因此实时进度（当前阶段、已处理行数、跳过行数）保存在进程内存中，任务表只在开始和结束时写入；
+查询时优先返回内存中的实时进度。服务重启时，上次未完成的任务会被标记为失败。
+注意：实时进度是进程级的，多进程部署时只有执行任务的进程能看到实时进度，其他进程看到的是任务表中的状态。
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from config import IMPORT_UPLOAD_DIR
+from models import SessionLocal, Device, Connection, ImportJob
+import bulk_import
+from excel_import import import_workbook, ImportValidationError, STAGE_DEVICES, summarize_import_result, print_import_report
+
+
+# 任务状态
+JOB_PENDING = "pending"      # 排队中
+JOB_RUNNING = "running"      # 导入中
+JOB_SUCCEEDED = "succeeded"  # 导入成功
+JOB_FAILED = "failed"        # 导入失败
+
+# 服务重启时中断的任务的失败原因
+INTERRUPTED_ERROR = "服务重启，导入任务中断，请重新上传"
+
+# 单个工作线程：导入任务按提交顺序依次执行，避免多个导入同时写数据库
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="excel-import")
+
+# 正在执行的任务的实时进度 {任务ID: {...}}
+_live_lock = threading.Lock()
+_live_progress = {}
+
+
+def submit_import_job(db: Session, upload_file, filename: str, on_finished=None, bulk: bool = False) -> ImportJob:
+    """
+    保存上传文件、登记导入任务并提交到后台线程，立即返回任务
+    on_finished 为可选回调，导入结束（无论成功或失败）后在工作线程中调用，用于使缓存失效
+    bulk=True 时上传文件为包含多个工作簿的zip压缩包，由 bulk_import 并行解析后依次导入
+    """
+    job = ImportJob(filename=filename, status=JOB_PENDING, rows_processed=0, skipped_count=0)
+    db.add(job)
+    db.commit()
+
+    # 上传文件在请求结束后会被关闭，需要先复制到上传目录
+    os.makedirs(IMPORT_UPLOAD_DIR, exist_ok=True)
+    file_path = os.path.join(IMPORT_UPLOAD_DIR, f"import_job_{job.id}{'.zip' if bulk else '.xlsx'}")
+    try:
+        upload_file.seek(0)
+        with open(file_path, "wb") as saved_file:
+            shutil.copyfileobj(upload_file, saved_file)
+    except Exception as e:
+        job.status = JOB_FAILED
+        job.error = f"保存上传文件失败: {e}"
+        job.finished_at = datetime.now()
+        db.commit()
+        raise
+
+    job.file_path = file_path
+    db.commit()
+
+    _executor.submit(_run_job, job.id, on_finished, bulk)
+    print(f"📥 导入任务 {job.id} 已提交: {filename}")
+    return job
+
+
+def recover_interrupted_jobs():
+    """
+    应用启动时调用：把上次运行中未完成的任务标记为失败，并删除其上传文件
+    返回处理的任务数
+    """
+    db = SessionLocal()
+    try:
+        jobs = db.query(ImportJob).filter(ImportJob.status.in_([JOB_PENDING, JOB_RUNNING])).all()
+        for job in jobs:
+            job.status = JOB_FAILED
+            job.error = INTERRUPTED_ERROR
+            job.finished_at = datetime.now()
+            _remove_upload(job.file_path)
+        db.commit()
+        return len(jobs)
+    finally:
+        db.close()
+
+
+def get_job_status(db: Session, job_id: int):
+    """查询任务状态，任务不存在时返回 None"""
+    job = db.get(ImportJob, job_id)
+    if job is None:
+        return None
+
+    status = {
+        "id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "stage": job.stage,
+        "rows_processed": job.rows_processed or 0,
+        "skipped_count": job.skipped_count or 0,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "error": job.error,
+        "result": json.loads(job.result) if job.result else None,
+    }
+
+    if job.started_at and job.finished_at:
+        elapsed = (job.finished_at - job.started_at).total_seconds()
+    else:
+        elapsed = None
+
+    # 正在执行的任务：使用内存中的实时进度
+    with _live_lock:
+        live = _live_progress.get(job_id)
+        if live is not None:
+            live = dict(live)
+    if live is not None:
+        status["status"] = JOB_RUNNING
+        status["stage"] = live["stage"]
+        status["rows_processed"] = live["rows_processed"]
+        status["skipped_count"] = live["skipped_count"]
+        elapsed = time.monotonic() - live["started"]
+
+    status["elapsed_seconds"] = round(elapsed, 2) if elapsed is not None else None
+    status["rows_per_second"] = round(status["rows_processed"] / elapsed, 1) if elapsed else None
+    return status
+
+
+# --- 后台执行 ---
+
+def _remove_upload(file_path):
+    """删除任务的上传文件"""
+    if file_path and os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except OSError as e:
+            print(f"删除上传文件失败: {file_path}, {e}")
+
+
+def _run_job(job_id: int, on_finished=None, bulk: bool = False):
+    """在工作线程中执行导入任务"""
+    db = SessionLocal()
+    file_path = None
+    try:
+        job = db.get(ImportJob, job_id)
+        file_path = job.file_path
+        print(f"\n=== 开始执行导入任务 {job_id}: {job.filename} ===")
+
+        job.status = JOB_RUNNING
+        job.stage = STAGE_DEVICES
+        job.started_at = datetime.now()
+        db.commit()
+
+        # 每个（文件, 阶段）的 (已处理行数, 跳过行数)，任务进度为各阶段之和
+        stage_counts = {}
+        with _live_lock:
+            _live_progress[job_id] = {
+                "stage": STAGE_DEVICES,
+                "rows_processed": 0,
+                "skipped_count": 0,
+                "started": time.monotonic(),
+            }
+
+        def progress(stage, rows_processed, skipped_count, file_name=None):
+            stage_counts[(file_name, stage)] = (rows_processed, skipped_count)
+            with _live_lock:
+                live = _live_progress[job_id]
+                live["stage"] = stage
+                live["rows_processed"] = sum(rows for rows, _ in stage_counts.values())
+                live["skipped_count"] = sum(skipped for _, skipped in stage_counts.values())
+
+        # 步骤 1: 增量更新模式 - 保留手工添加的设备，只更新Excel中的设备
+        print("\n步骤 1: 采用增量更新模式，保留现有手工添加的设备...")
+        current_connections_count = db.query(Connection).count()
+        current_devices_count = db.query(Device).count()
+        print(f"当前数据库状态: {current_connections_count} 个连接, {current_devices_count} 个设备")
+        print("步骤 1: 完成。将采用增量更新模式处理Excel数据。")
+
+        if bulk:
+            job_result, rows_processed, skipped_count = _import_bulk(file_path, progress)
+        else:
+            job_result, rows_processed, skipped_count = _import_single(db, file_path, progress)
+
+        job = db.get(ImportJob, job_id)
+        job.status = JOB_SUCCEEDED
+        job.result = json.dumps(job_result, ensure_ascii=False)
+        job.rows_processed = rows_processed
+        job.skipped_count = skipped_count
+        print(f"=== 导入任务 {job_id} 完成 ===\n")
+
+    except Exception as e:
+        db.rollback()
+        if isinstance(e, ImportValidationError):
+            # 工作簿结构不符合要求，导入未执行
+            error_message = str(e)
+            print(f"错误: {error_message}")
+        else:
+            error_message = f"处理Excel文件时出错: {e}"
+            print(f"\n=== Excel文件处理失败（导入任务 {job_id}） ===")
+            print(f"错误类型: {type(e).__name__}")
+            print(f"错误信息: {error_message}")
+            print("\n完整错误堆栈:")
+            traceback.print_exc()
+            print("=" * 50)
+
+        job = db.get(ImportJob, job_id)
+        job.status = JOB_FAILED
+        job.error = error_message
+        with _live_lock:
+            live = _live_progress.get(job_id)
+            if live is not None:
+                job.stage = live["stage"]
+                job.rows_processed = live["rows_processed"]
+                job.skipped_count = live["skipped_count"]
+
+    finally:
+        try:
+            job = db.get(ImportJob, job_id)
+            if job is not None:
+                if job.status == JOB_SUCCEEDED:
+                    job.stage = None
+                job.finished_at = datetime.now()
+                db.commit()
+        except Exception as e:
+            print(f"更新导入任务 {job_id} 状态失败: {e}")
+            db.rollback()
+        finally:
+            db.close()
+            with _live_lock:
+                _live_progress.pop(job_id, None)
+            _remove_upload(file_path)
+
+        # 导入可能已部分提交（如设备表已提交、连接表失败），无论成功与否都使缓存失效
+        if on_finished is not None:
+            try:
+                on_finished()
+            except Exception as e:
+                print(f"导入任务 {job_id} 完成回调执行失败: {e}")
+
+
+def _import_single(db: Session, file_path: str, progress) -> tuple:
+    """导入单个工作簿，返回 (任务结果, 处理行数, 跳过行数)"""
+    # 步骤 2-6: 以只读流式模式打开上传文件，依次分批导入设备表和“连接”工作表
+    print("\n步骤 2: 流式读取Excel文件并导入...")
+    result = import_workbook(db, file_path, progress=progress)
+    print_import_report(db, result)
+
+    sheet1 = result["sheet1"]
+    sheet2 = result["sheet2"]
+    rows_processed = sheet1["rows_processed"] + (sheet2["rows_processed"] if sheet2 else 0)
+    skipped_count = len(sheet1["skipped_rows"]) + (len(sheet2["skipped_rows"]) if sheet2 else 0)
+    return summarize_import_result(result), rows_processed, skipped_count
+
+
+def _import_bulk(file_path: str, progress) -> tuple:
+    """导入zip压缩包中的全部工作簿，返回 (任务结果, 处理行数, 跳过行数)"""
+    print("\n步骤 2: 并行解析压缩包中的工作簿，依次导入...")
+    result = bulk_import.import_source(
+        file_path,
+        progress=lambda file_name, stage, rows, skipped: progress(stage, rows, skipped, file_name)
+    )
+    if not result["files"]:
+        raise ImportValidationError("压缩包中没有Excel工作簿（.xlsx）")
+    bulk_import.print_bulk_report(result)
+
+    rows_processed = 0
+    skipped_count = 0
+    for report in result["files"]:
+        if report["status"] == "succeeded":
+            rows_processed += report["rows_processed"] + report["sheet2_rows_processed"]
+            skipped_count += len(report["skipped_rows"]) + len(report["sheet2_skipped_rows"])
+    return result, rows_processed, skipped_count
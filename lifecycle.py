@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+设备生命周期计算模块（永久模块，进程内全局缓存）
+
+用途：
+1. 缓存启用中的生命周期规则（设备类型 -> 规则），避免每个设备都查询一次规则表；
+   规则的新增、修改、删除接口在提交后调用 invalidate_rules() 使缓存失效。
+2. 提供带缓存的投产日期解析函数，同一个日期字符串只解析一次；
+   设备写入时用 fill_commission_date() 把解析结果和解析质量保存到设备表，
+   之后的状态计算直接使用保存的日期，不再重复解析。
+3. 统一的生命周期状态计算引擎 evaluate_lifecycle()：一次性计算一批设备的状态，
+   首页、/api/devices/lifecycle-status 和拓扑图节点都使用它，保证各处结果一致。
+4. status_clause() 把按状态筛选转换为对投产日期的 SQL 范围条件，可以使用索引。
+"""
+
+import re
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, false, or_
+from sqlalchemy.orm import Session
+
+from generation_cache import GenerationCache
+from models import Device, LifecycleRule
+
+
+# 规则快照：缓存跨会话使用，因此不直接缓存ORM对象
+LifecycleRuleInfo = namedtuple("LifecycleRuleInfo", ["device_type", "lifecycle_years", "warning_months"])
+
+# 投产日期解析质量（保存在 Device.commission_date_quality）
+DATE_QUALITY_DAY = "day"          # 精确到日
+DATE_QUALITY_MONTH = "month"      # 只有年月，按当月1日计算
+DATE_QUALITY_YEAR = "year"        # 只有年份，按当年1月1日计算
+DATE_QUALITY_MISSING = "missing"  # 未填写
+DATE_QUALITY_INVALID = "invalid"  # 格式无法识别
+
+# 投产日期支持的格式及对应的解析质量（YYYYMM 格式单独处理）
+COMMISSION_DATE_FORMATS = {
+    "%Y-%m-%d": DATE_QUALITY_DAY,
+    "%Y/%m/%d": DATE_QUALITY_DAY,
+    "%Y.%m.%d": DATE_QUALITY_DAY,
+    "%Y-%m": DATE_QUALITY_MONTH,
+    "%Y/%m": DATE_QUALITY_MONTH,
+    "%Y.%m": DATE_QUALITY_MONTH,
+    "%Y年%m月%d日": DATE_QUALITY_DAY,
+    "%Y年%m月": DATE_QUALITY_MONTH,
+    "%Y": DATE_QUALITY_YEAR
+}
+
+_YYYYMM_PATTERN = re.compile(r'^\d{6}$')
+
+
+@lru_cache(maxsize=4096)
+def normalize_commission_date(date_str: Optional[str]) -> tuple:
+    """
+    解析投产日期字符串，返回 (datetime 或 None, 解析质量)
+    只有年份的默认为该年1月1日，只有年月的默认为该月1日
+    """
+    if not date_str:
+        return None, DATE_QUALITY_MISSING
+
+    date_str = date_str.strip()
+
+    # 处理特殊格式：YYYYMM (如 202312)
+    if _YYYYMM_PATTERN.match(date_str):
+        try:
+            return datetime(int(date_str[:4]), int(date_str[4:6]), 1), DATE_QUALITY_MONTH
+        except ValueError:
+            pass
+
+    for fmt, quality in COMMISSION_DATE_FORMATS.items():
+        try:
+            return datetime.strptime(date_str, fmt), quality
+        except ValueError:
+            continue
+
+    return None, DATE_QUALITY_INVALID
+
+
+def parse_commission_date(date_str: Optional[str]) -> Optional[datetime]:
+    """解析投产日期字符串，无法识别时返回 None"""
+    return normalize_commission_date(date_str)[0]
+
+
+def fill_commission_date(device: Device):
+    """设备写入前调用：根据 commission_date 填写 commission_date_parsed 和 commission_date_quality"""
+    parsed, quality = normalize_commission_date(device.commission_date)
+    device.commission_date_parsed = parsed.date() if parsed else None
+    device.commission_date_quality = quality
+
+
+# --- 生命周期规则缓存 ---
+
+def _load_rules(db: Session) -> dict:
+    """从数据库加载启用中的生命周期规则"""
+    return {
+        device_type: LifecycleRuleInfo(device_type, lifecycle_years, warning_months)
+        for device_type, lifecycle_years, warning_months in db.query(
+            LifecycleRule.device_type, LifecycleRule.lifecycle_years, LifecycleRule.warning_months
+        ).filter(LifecycleRule.is_active == "true")
+    }
+
+
+_rules_cache = GenerationCache(_load_rules)
+
+
+def get_active_rules(db: Session) -> dict:
+    """获取启用中的生命周期规则 {设备类型: LifecycleRuleInfo}，首次访问或失效后从数据库加载"""
+    return _rules_cache.get(db)
+
+
+def invalidate_rules():
+    """使生命周期规则缓存失效（规则新增、修改、删除后调用）"""
+    _rules_cache.invalidate()
+
+
+# --- 生命周期状态计算 ---
+
+# 规则中未设置提前预警月数时使用的默认值（与 LifecycleRule.warning_months 的默认值一致）
+DEFAULT_WARNING_MONTHS = 6
+
+# 状态计算结果的列
+LIFECYCLE_COLUMNS = ["lifecycle_status", "lifecycle_status_text", "days_in_service", "remaining_days", "rule_years"]
+
+_ONE_DAY = np.timedelta64(1, "D")
+
+# 状态编码：未配置规则 / 投产日期未填写 / 投产日期格式无法识别 / 已超期 / 临近超限 / 正常
+_NO_RULE, _DATE_MISSING, _DATE_INVALID, _EXPIRED, _WARNING, _NORMAL = range(6)
+_STATUS_VALUES = np.array(["unknown", "unknown", "unknown", "expired", "warning", "normal"], dtype=object)
+_STATUS_TEXTS = np.array(["未配置规则", "投产日期未填写", "投产日期格式无法识别", "", "", ""], dtype=object)
+
+
+def _rule_arrays(device_types, rules: dict):
+    """按设备展开规则：返回 (生命周期年限, 提前预警月数)，未配置规则的设备为 NaN"""
+    codes, uniques = pd.factorize(pd.Series(device_types, dtype=object))
+    rule_years = [np.nan] * (len(uniques) + 1)
+    warning_months = [np.nan] * (len(uniques) + 1)
+    for position, device_type in enumerate(uniques):
+        rule = rules.get(device_type)
+        if rule is not None:
+            rule_years[position] = rule.lifecycle_years
+            warning_months[position] = rule.warning_months if rule.warning_months is not None else DEFAULT_WARNING_MONTHS
+    # 末尾的 NaN 对应设备类型为空（编码 -1）
+    return np.array(rule_years, dtype=float)[codes], np.array(warning_months, dtype=float)[codes]
+
+
+def _parse_commission_dates(commission_dates):
+    """
+    批量解析投产日期，返回 (datetime64[us] 数组, 是否未填写)，无法识别的日期为 NaT
+    先按字符串去重，每个不同的日期字符串只调用一次 parse_commission_date，
+    与单个解析的结果完全一致，再按编码一次性展开回每个设备。
+    """
+    codes, uniques = pd.factorize(pd.Series(commission_dates, dtype=object))
+    parsed = [parse_commission_date(value) if isinstance(value, str) else None for value in uniques]
+    missing = [value == "" for value in uniques]
+    # 末尾追加一项，缺失值的编码 -1 正好取到它
+    parsed.append(None)
+    missing.append(True)
+    return np.array(parsed, dtype="datetime64[us]")[codes], np.array(missing, dtype=bool)[codes]
+
+
+def _stored_commission_dates(commission_dates, parsed_dates, date_qualities):
+    """
+    使用设备表中保存的解析结果，返回值同 _parse_commission_dates
+    尚未回填解析结果（质量为空）的设备仍按字符串解析
+    """
+    qualities = np.array(date_qualities, dtype=object)
+    parsed = np.array(parsed_dates, dtype="datetime64[us]")
+    missing = qualities == DATE_QUALITY_MISSING
+
+    not_stored = np.flatnonzero(pd.isna(qualities))
+    if len(not_stored):
+        fallback_dates, fallback_missing = _parse_commission_dates(np.array(commission_dates, dtype=object)[not_stored])
+        parsed[not_stored] = fallback_dates
+        missing[not_stored] = fallback_missing
+    return parsed, missing
+
+
+def evaluate_lifecycle(device_types, commission_dates, rules: dict, now: Optional[datetime] = None,
+                       parsed_dates=None, date_qualities=None) -> pd.DataFrame:
+    """
+    批量计算设备生命周期状态
+
+    device_types / commission_dates: 按设备顺序排列的设备类型和投产日期字符串
+    rules: get_active_rules() 返回的 {设备类型: LifecycleRuleInfo}
+    parsed_dates / date_qualities: 可选，设备表中保存的投产日期解析结果和解析质量
+
+    返回与输入顺序一致的 DataFrame，列见 LIFECYCLE_COLUMNS：
+    - lifecycle_status: normal / warning / expired / unknown
+    - lifecycle_status_text: 状态说明（含剩余或超期天数）
+    - days_in_service / remaining_days: 服役天数、剩余天数，无法计算时为 None
+    - rule_years: 规则设定的生命周期年限，未配置规则时为 None
+
+    计算口径：剩余天数 = 生命周期年限 × 365 - 服役天数；
+    剩余天数小于0为已超期，不超过 提前预警月数 × 30 天为临近超限，其余为正常。
+    """
+    now64 = np.datetime64(now or datetime.now(), "us")
+
+    # 规则匹配
+    rule_years, warning_months = _rule_arrays(device_types, rules)
+    has_rule = ~np.isnan(rule_years)
+    count = len(rule_years)
+
+    # 投产日期：优先使用写入时保存的解析结果
+    if date_qualities is None:
+        parsed_dates, date_missing = _parse_commission_dates(commission_dates)
+    else:
+        parsed_dates, date_missing = _stored_commission_dates(commission_dates, parsed_dates, date_qualities)
+    date_parsed = ~np.isnat(parsed_dates)
+
+    # 服役天数和剩余天数（只对可计算的设备计算）
+    computable = has_rule & date_parsed
+    days_in_service = np.zeros(count, dtype=np.int64)
+    days_in_service[computable] = (now64 - parsed_dates[computable]) // _ONE_DAY
+    remaining_days = np.zeros(count, dtype=np.int64)
+    remaining_days[computable] = rule_years[computable].astype(np.int64) * 365 - days_in_service[computable]
+    warning_days = np.nan_to_num(warning_months).astype(np.int64) * 30
+
+    expired = computable & (remaining_days < 0)
+    warning = computable & ~expired & (remaining_days <= warning_days)
+
+    status_codes = np.select(
+        [~has_rule, date_missing, ~date_parsed, expired, warning],
+        [_NO_RULE, _DATE_MISSING, _DATE_INVALID, _EXPIRED, _WARNING],
+        default=_NORMAL,
+    )
+    status = _STATUS_VALUES[status_codes]
+    status_text = _STATUS_TEXTS[status_codes]
+
+    # 含天数的状态说明：相同 (状态, 剩余天数) 只格式化一次
+    if computable.any():
+        keys = remaining_days[computable] * 8 + status_codes[computable]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        texts = np.array([_format_status_text(int(key)) for key in unique_keys], dtype=object)
+        status_text[computable] = texts[inverse]
+
+    # 数值列转为 Python 对象，无法计算处为 None，便于直接序列化为 JSON
+    return pd.DataFrame({
+        "lifecycle_status": status,
+        "lifecycle_status_text": status_text,
+        "days_in_service": _to_optional_ints(days_in_service, computable),
+        "remaining_days": _to_optional_ints(remaining_days, computable),
+        "rule_years": _to_optional_ints(np.nan_to_num(rule_years).astype(np.int64), has_rule),
+    }, columns=LIFECYCLE_COLUMNS)
+
+
+def _format_status_text(key: int) -> str:
+    """由 剩余天数 × 8 + 状态编码 生成状态说明"""
+    remaining_days, status_code = divmod(key, 8)
+    if status_code == _EXPIRED:
+        return f"已超期 {abs(remaining_days)} 天"
+    if status_code == _WARNING:
+        return f"临近超限，剩余 {remaining_days} 天"
+    return f"正常，剩余 {remaining_days} 天"
+
+
+def evaluate_devices(devices, rules: dict, now: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    批量计算一组设备（ORM对象或带 device_type / commission_date 属性的记录）的生命周期状态
+    记录带有 commission_date_parsed / commission_date_quality 时直接使用保存的解析结果
+    """
+    devices = list(devices)
+    if devices and hasattr(devices[0], "commission_date_quality"):
+        return evaluate_lifecycle(
+            [device.device_type for device in devices],
+            [device.commission_date for device in devices],
+            rules,
+            now,
+            parsed_dates=[device.commission_date_parsed for device in devices],
+            date_qualities=[device.commission_date_quality for device in devices],
+        )
+    return evaluate_lifecycle(
+        [device.device_type for device in devices],
+        [device.commission_date for device in devices],
+        rules,
+        now,
+    )
+
+
+def status_clause(status: str, rules: dict, today: Optional[date] = None):
+    """
+    把生命周期状态筛选转换为 SQL 条件（基于 Device.commission_date_parsed 的范围比较）
+    与 evaluate_lifecycle() 口径一致：服役天数 = 今天 - 投产日期，
+    已超期: 服役天数 > 年限×365；临近超限: 年限×365 - 预警月数×30 <= 服役天数 <= 年限×365
+    status 不是 normal / warning / expired / unknown 时不匹配任何设备
+    """
+    today = today or date.today()
+
+    if status == "unknown":
+        return or_(
+            Device.device_type.is_(None),
+            Device.device_type.notin_(list(rules)),
+            Device.commission_date_parsed.is_(None)
+        )
+
+    clauses = []
+    for device_type, rule in rules.items():
+        lifecycle_days = rule.lifecycle_years * 365
+        warning_months = rule.warning_months if rule.warning_months is not None else DEFAULT_WARNING_MONTHS
+        # 投产日期早于 expired_before 为已超期，晚于 warning_after 为正常
+        expired_before = today - timedelta(days=lifecycle_days)
+        warning_after = today - timedelta(days=lifecycle_days - warning_months * 30)
+
+        if status == "expired":
+            date_condition = Device.commission_date_parsed < expired_before
+        elif status == "warning":
+            date_condition = Device.commission_date_parsed.between(expired_before, warning_after)
+        elif status == "normal":
+            date_condition = Device.commission_date_parsed > warning_after
+        else:
+            return false()
+        clauses.append(and_(Device.device_type == device_type, date_condition))
+
+    return or_(*clauses) if clauses else false()
+
+
+def _to_optional_ints(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """整数数组转为对象数组，mask 为 False 的位置置为 None"""
+    result = values.astype(object)
+    result[~mask] = None
+    return result
@@ -1,31 +1,40 @@
 import os
 from fastapi import FastAPI, Request, Depends, Form, UploadFile, File, HTTPException, Query
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse, Response
 from fastapi.encoders import jsonable_encoder
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
+from anyio import to_thread
 from sqlalchemy.orm import Session, aliased
-from sqlalchemy import func, or_
-import pandas as pd
+from sqlalchemy import func, or_, case, literal, select, union_all
 from typing import List, Optional
 from urllib.parse import quote
-import io
+import heapq
+from collections import deque
 import traceback # 导入 traceback 用于打印详细的错误堆栈
 from datetime import datetime, timedelta, date
 import re
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils.dataframe import dataframe_to_rows
 from pydantic import BaseModel
 import re
-from sqlalchemy import and_
 
 # 导入配置
-from config import ADMIN_PASSWORD, PORT
+from config import ADMIN_PASSWORD, PORT, DB_THREADPOOL_SIZE
 
 # 修正了导入，使用正确的函数名和模型
 from models import SessionLocal, Device, Connection, LifecycleRule, create_db_and_tables
-from device_types import STANDARD_DEVICE_TYPES, validate_device_type, get_device_type_suggestions, STANDARD_DEVICE_TYPES
+from device_types import STANDARD_DEVICE_TYPES
+import topology_index
+import lifecycle
+import import_jobs
+import device_export
+import pagination
+import device_lookup
+import device_suggest
+import search_index
+from schema_migrations import run_migrations
+from topology_index import TopologyIndex, get_topology_index
 
 
 # --- 端口统计服务类 ---
@@ -36,62 +45,29 @@ class PortStatisticsService:
     def __init__(self, db: Session):
         self.db = db
     
+    def get_port_statistics(self) -> dict:
+        """获取全局端口统计信息 - 只扫描一次连接表，同时生成四个统计分区"""
+        try:
+            # 设备只取展示所需的列，避免构造ORM对象
+            devices = self.db.query(Device.id, Device.name, Device.device_type, Device.station).all()
+            scan = self._scan_connections()
+            
+            return {
+                "device_port_summary": self._build_port_summary(len(devices), scan),
+                "port_type_statistics": self._build_port_type_statistics(scan),
+                "capacity_statistics": self._build_capacity_statistics(scan),
+                "device_port_details": self._build_device_port_details(devices, scan)
+            }
+        except Exception as e:
+            print(f"获取端口统计信息时出错: {e}")
+            raise HTTPException(status_code=500, detail=f"获取端口统计信息失败: {str(e)}")
+    
     def _get_device_port_summary(self) -> dict:
         """获取设备端口总览 - 采用集合统计逻辑，统计所有有连接的端口"""
         try:
             # 统计总设备数
             total_devices = self.db.query(Device).count()
-            
-            # 使用集合来避免重复计算同一个端口
-            all_ports = set()
-            connected_ports = set()
-            
-            # 获取所有连接记录
-            connections = self.db.query(Connection).all()
-            
-            for conn in connections:
-                # 统计源端口（A端）
-                if conn.source_fuse_number and conn.source_device_id:
-                    port_key = f"device_{conn.source_device_id}_fuse_{conn.source_fuse_number}"
-                    all_ports.add(port_key)
-                    # 通过连接类型字段是否为空判断端口使用状态
-                    if conn.connection_type and conn.connection_type.strip():
-                        connected_ports.add(port_key)
-                        
-                if conn.source_breaker_number and conn.source_device_id:
-                    port_key = f"device_{conn.source_device_id}_breaker_{conn.source_breaker_number}"
-                    all_ports.add(port_key)
-                    # 通过连接类型字段是否为空判断端口使用状态
-                    if conn.connection_type and conn.connection_type.strip():
-                        connected_ports.add(port_key)
-                
-                # 统计目标端口（B端）- 符合设计文档中"一个连接占用两个端口"的要求
-                if conn.target_fuse_number and conn.target_device_id:
-                    port_key = f"device_{conn.target_device_id}_fuse_{conn.target_fuse_number}"
-                    all_ports.add(port_key)
-                    # 通过连接类型字段是否为空判断端口使用状态
-                    if conn.connection_type and conn.connection_type.strip():
-                        connected_ports.add(port_key)
-                        
-                if conn.target_breaker_number and conn.target_device_id:
-                    port_key = f"device_{conn.target_device_id}_breaker_{conn.target_breaker_number}"
-                    all_ports.add(port_key)
-                    # 通过连接类型字段是否为空判断端口使用状态
-                    if conn.connection_type and conn.connection_type.strip():
-                        connected_ports.add(port_key)
-            
-            total_ports = len(all_ports)
-            connected_count = len(connected_ports)
-            idle_ports = total_ports - connected_count
-            utilization_rate = (connected_count / total_ports * 100) if total_ports > 0 else 0
-            
-            return {
-                "total_devices": total_devices,
-                "total_ports": total_ports,
-                "connected_ports": connected_count,
-                "idle_ports": idle_ports,
-                "utilization_rate": round(utilization_rate, 2)
-            }
+            return self._build_port_summary(total_devices, self._scan_connections())
         except Exception as e:
             print(f"获取设备端口总览时出错: {e}")
             return {
@@ -102,6 +78,184 @@ class PortStatisticsService:
                 "utilization_rate": 0
             }
     
+    def _scan_connections(self) -> dict:
+        """
+        单次流式扫描连接表，累积所有端口统计所需的数据
+        只查询需要的列（元组行），端口用 (设备ID, 类型, 编号) 元组标识，不再拼接字符串
+        """
+        all_ports = set()         # 全部端口（A端+B端）
+        connected_ports = set()   # 已连接端口（A端+B端）
+        a_end_ports = {}          # A端设备ID -> {"fuse": 编号集合, "breaker": 编号集合, "connected": (类型, 编号)集合}
+        capacity_stats = {}
+        high_capacity_available = {"630A_above": 0, "400A_above": 0, "250A_above": 0}
+        rating_cache = {}         # 规格字符串 -> 电流等级，同一规格只解析一次
+        
+        rows = self.db.query(
+            Connection.source_device_id, Connection.target_device_id,
+            Connection.source_fuse_number, Connection.source_breaker_number,
+            Connection.target_fuse_number, Connection.target_breaker_number,
+            Connection.source_fuse_spec, Connection.source_breaker_spec,
+            Connection.target_fuse_spec, Connection.target_breaker_spec,
+            Connection.connection_type
+        ).yield_per(1000)
+        
+        for (source_id, target_id, source_fuse, source_breaker, target_fuse, target_breaker,
+             source_fuse_spec, source_breaker_spec, target_fuse_spec, target_breaker_spec,
+             connection_type) in rows:
+            # 通过连接类型字段是否为空判断端口使用状态
+            is_connected = bool(connection_type and connection_type.strip())
+            
+            # 统计源端口（A端），同时记录A端设备的端口明细
+            if source_id:
+                for port_type, port_number in (("fuse", source_fuse), ("breaker", source_breaker)):
+                    if not port_number:
+                        continue
+                    port_key = (source_id, port_type, port_number)
+                    all_ports.add(port_key)
+                    device_ports = a_end_ports.get(source_id)
+                    if device_ports is None:
+                        device_ports = a_end_ports[source_id] = {"fuse": set(), "breaker": set(), "connected": set()}
+                    device_ports[port_type].add(port_number)
+                    if is_connected:
+                        connected_ports.add(port_key)
+                        device_ports["connected"].add((port_type, port_number))
+            
+            # 统计目标端口（B端）- 符合设计文档中"一个连接占用两个端口"的要求
+            if target_id:
+                for port_type, port_number in (("fuse", target_fuse), ("breaker", target_breaker)):
+                    if not port_number:
+                        continue
+                    port_key = (target_id, port_type, port_number)
+                    all_ports.add(port_key)
+                    if is_connected:
+                        connected_ports.add(port_key)
+            
+            # 容量统计：处理各种规格字段
+            for spec in (source_fuse_spec, source_breaker_spec, target_fuse_spec, target_breaker_spec):
+                if not spec:
+                    continue
+                rating = rating_cache.get(spec)
+                if rating is None:
+                    rating = rating_cache[spec] = self._extract_current_rating(spec)
+                if rating == "未知":
+                    continue
+                
+                stats = capacity_stats.get(rating)
+                if stats is None:
+                    stats = capacity_stats[rating] = {"total": 0, "connected": 0, "idle": 0}
+                stats["total"] += 1
+                
+                # 判断是否已连接
+                if source_id and target_id:
+                    stats["connected"] += 1
+                else:
+                    stats["idle"] += 1
+                    
+                    # 统计大容量可用端口
+                    try:
+                        rating_value = int(rating.replace('A', ''))
+                        if rating_value >= 630:
+                            high_capacity_available["630A_above"] += 1
+                        if rating_value >= 400:
+                            high_capacity_available["400A_above"] += 1
+                        if rating_value >= 250:
+                            high_capacity_available["250A_above"] += 1
+                    except ValueError:
+                        pass  # 忽略无法转换的容量值
+        
+        return {
+            "all_ports": all_ports,
+            "connected_ports": connected_ports,
+            "a_end_ports": a_end_ports,
+            "capacity_stats": capacity_stats,
+            "high_capacity_available": high_capacity_available
+        }
+    
+    def _build_port_summary(self, total_devices: int, scan: dict) -> dict:
+        """由扫描结果生成设备端口总览"""
+        total_ports = len(scan["all_ports"])
+        connected_count = len(scan["connected_ports"])
+        idle_ports = total_ports - connected_count
+        utilization_rate = (connected_count / total_ports * 100) if total_ports > 0 else 0
+        
+        return {
+            "total_devices": total_devices,
+            "total_ports": total_ports,
+            "connected_ports": connected_count,
+            "idle_ports": idle_ports,
+            "utilization_rate": round(utilization_rate, 2)
+        }
+    
+    def _build_port_type_statistics(self, scan: dict) -> dict:
+        """由扫描结果生成端口类型统计 - 基于A端设备统计"""
+        fuse_total = fuse_connected = breaker_total = breaker_connected = 0
+        for device_ports in scan["a_end_ports"].values():
+            fuse_total += len(device_ports["fuse"])
+            breaker_total += len(device_ports["breaker"])
+            for port_type, _ in device_ports["connected"]:
+                if port_type == "fuse":
+                    fuse_connected += 1
+                else:
+                    breaker_connected += 1
+        
+        return {
+            "fuse_ports": {
+                "total": fuse_total,
+                "connected": fuse_connected,
+                "idle": fuse_total - fuse_connected,
+                "utilization_rate": round((fuse_connected / fuse_total * 100) if fuse_total > 0 else 0, 2)
+            },
+            "breaker_ports": {
+                "total": breaker_total,
+                "connected": breaker_connected,
+                "idle": breaker_total - breaker_connected,
+                "utilization_rate": round((breaker_connected / breaker_total * 100) if breaker_total > 0 else 0, 2)
+            }
+        }
+    
+    def _build_capacity_statistics(self, scan: dict) -> dict:
+        """由扫描结果生成容量统计"""
+        return {
+            "by_rating": scan["capacity_stats"],
+            "high_capacity_available": scan["high_capacity_available"]
+        }
+    
+    def _build_device_port_details(self, devices: list, scan: dict) -> list:
+        """由扫描结果生成设备端口详情 - 基于A端设备统计，不再按设备逐个查询"""
+        a_end_ports = scan["a_end_ports"]
+        device_details = []
+        
+        for device_id, name, device_type, station in devices:
+            device_ports = a_end_ports.get(device_id)
+            if device_ports:
+                fuse_count = len(device_ports["fuse"])
+                breaker_count = len(device_ports["breaker"])
+                connected_ports = len(device_ports["connected"])
+            else:
+                fuse_count = breaker_count = connected_ports = 0
+            
+            total_ports = fuse_count + breaker_count
+            idle_ports = total_ports - connected_ports
+            utilization_rate = (connected_ports / total_ports * 100) if total_ports > 0 else 0
+            
+            device_details.append({
+                "device_id": device_id,
+                "device_name": name,
+                "device_type": device_type or "未知",
+                "station": station or "未知",
+                "total_ports": total_ports,
+                "connected_ports": connected_ports,
+                "idle_ports": idle_ports,
+                "utilization_rate": round(utilization_rate, 2),
+                "fuse_ports": fuse_count,
+                "breaker_ports": breaker_count
+            })
+        
+        # 按利用率降序排序
+        device_details.sort(key=lambda x: x["utilization_rate"], reverse=True)
+        
+        return device_details
+    
     def get_device_port_details(self, device_id: int) -> dict:
         """获取指定设备的端口详情 - 基于连接表中该设备的实际端口数据"""
         try:
@@ -215,6 +369,27 @@ class PortStatisticsService:
             return f"{match.group(1)}{match.group(2)}"
         else:
             return "未知"
+    
+    def _extract_current_rating(self, spec_string: str) -> str:
+        """从规格字符串中提取电流等级"""
+        if not spec_string:
+            return "未知"
+        
+        try:
+            # 匹配括号内的电流值，如 "NT4(500A)" -> "500A"
+            match = re.search(r'\((\d+)A\)', spec_string)
+            if match:
+                return f"{match.group(1)}A"
+            
+            # 匹配直接的电流值，如 "500A" -> "500A"
+            match = re.search(r'(\d+)A', spec_string)
+            if match:
+                return f"{match.group(1)}A"
+            
+            return "未知"
+        except Exception as e:
+            print(f"提取电流等级时出错: {e}")
+            return "未知"
 
 
 
@@ -318,73 +493,7 @@ class AnalyticsService:
     def _calculate_device_type_utilization(self) -> list:
         """按设备类型计算使用率"""
         try:
-            # 获取所有设备类型
-            device_types = self.db.query(Device.device_type).distinct().all()
-            device_type_stats = []
-            
-            for device_type_tuple in device_types:
-                device_type = device_type_tuple[0] or "未知类型"
-                
-                # 获取该类型的所有设备
-                devices = self.db.query(Device).filter(Device.device_type == device_type_tuple[0]).all()
-                device_ids = [d.id for d in devices]
-                
-                if not device_ids:
-                    continue
-                
-                # 统计该类型设备的端口使用情况
-                all_ports = set()
-                connected_ports = set()
-                
-                connections = self.db.query(Connection).filter(
-                    (Connection.source_device_id.in_(device_ids)) |
-                    (Connection.target_device_id.in_(device_ids))
-                ).all()
-                
-                for conn in connections:
-                    # 统计源端口
-                    if conn.source_device_id in device_ids:
-                        if conn.source_fuse_number:
-                            port_key = f"device_{conn.source_device_id}_fuse_{conn.source_fuse_number}"
-                            all_ports.add(port_key)
-                            if conn.connection_type and conn.connection_type.strip():
-                                connected_ports.add(port_key)
-                        if conn.source_breaker_number:
-                            port_key = f"device_{conn.source_device_id}_breaker_{conn.source_breaker_number}"
-                            all_ports.add(port_key)
-                            if conn.connection_type and conn.connection_type.strip():
-                                connected_ports.add(port_key)
-                    
-                    # 统计目标端口
-                    if conn.target_device_id in device_ids:
-                        if conn.target_fuse_number:
-                            port_key = f"device_{conn.target_device_id}_fuse_{conn.target_fuse_number}"
-                            all_ports.add(port_key)
-                            if conn.connection_type and conn.connection_type.strip():
-                                connected_ports.add(port_key)
-                        if conn.target_breaker_number:
-                            port_key = f"device_{conn.target_device_id}_breaker_{conn.target_breaker_number}"
-                            all_ports.add(port_key)
-                            if conn.connection_type and conn.connection_type.strip():
-                                connected_ports.add(port_key)
-                
-                total_ports = len(all_ports)
-                connected_count = len(connected_ports)
-                utilization_rate = (connected_count / total_ports * 100) if total_ports > 0 else 0
-                
-                device_type_stats.append({
-                    "device_type": device_type,
-                    "device_count": len(devices),
-                    "total_ports": total_ports,
-                    "connected_ports": connected_count,
-                    "idle_ports": total_ports - connected_count,
-                    "utilization_rate": round(utilization_rate, 2)
-                })
-            
-            # 按使用率降序排序
-            device_type_stats.sort(key=lambda x: x["utilization_rate"], reverse=True)
-            return device_type_stats
-            
+            return self._calculate_group_utilization(Device.device_type, "device_type", "未知类型")
         except Exception as e:
             print(f"计算设备类型使用率时出错: {e}")
             return []
@@ -392,77 +501,79 @@ class AnalyticsService:
     def _calculate_station_utilization(self) -> list:
         """按站点计算使用率"""
         try:
-            # 获取所有站点
-            stations = self.db.query(Device.station).distinct().all()
-            station_stats = []
-            
-            for station_tuple in stations:
-                station = station_tuple[0] or "未知站点"
-                
-                # 获取该站点的所有设备
-                devices = self.db.query(Device).filter(Device.station == station_tuple[0]).all()
-                device_ids = [d.id for d in devices]
-                
-                if not device_ids:
-                    continue
-                
-                # 统计该站点设备的端口使用情况
-                all_ports = set()
-                connected_ports = set()
-                
-                connections = self.db.query(Connection).filter(
-                    (Connection.source_device_id.in_(device_ids)) |
-                    (Connection.target_device_id.in_(device_ids))
-                ).all()
-                
-                for conn in connections:
-                    # 统计源端口
-                    if conn.source_device_id in device_ids:
-                        if conn.source_fuse_number:
-                            port_key = f"device_{conn.source_device_id}_fuse_{conn.source_fuse_number}"
-                            all_ports.add(port_key)
-                            if conn.connection_type and conn.connection_type.strip():
-                                connected_ports.add(port_key)
-                        if conn.source_breaker_number:
-                            port_key = f"device_{conn.source_device_id}_breaker_{conn.source_breaker_number}"
-                            all_ports.add(port_key)
-                            if conn.connection_type and conn.connection_type.strip():
-                                connected_ports.add(port_key)
-                    
-                    # 统计目标端口
-                    if conn.target_device_id in device_ids:
-                        if conn.target_fuse_number:
-                            port_key = f"device_{conn.target_device_id}_fuse_{conn.target_fuse_number}"
-                            all_ports.add(port_key)
-                            if conn.connection_type and conn.connection_type.strip():
-                                connected_ports.add(port_key)
-                        if conn.target_breaker_number:
-                            port_key = f"device_{conn.target_device_id}_breaker_{conn.target_breaker_number}"
-                            all_ports.add(port_key)
-                            if conn.connection_type and conn.connection_type.strip():
-                                connected_ports.add(port_key)
-                
-                total_ports = len(all_ports)
-                connected_count = len(connected_ports)
-                utilization_rate = (connected_count / total_ports * 100) if total_ports > 0 else 0
-                
-                station_stats.append({
-                    "station": station,
-                    "device_count": len(devices),
-                    "total_ports": total_ports,
-                    "connected_ports": connected_count,
-                    "idle_ports": total_ports - connected_count,
-                    "utilization_rate": round(utilization_rate, 2)
-                })
-            
-            # 按使用率降序排序
-            station_stats.sort(key=lambda x: x["utilization_rate"], reverse=True)
-            return station_stats
-            
+            return self._calculate_group_utilization(Device.station, "station", "未知站点")
         except Exception as e:
             print(f"计算站点使用率时出错: {e}")
             return []
     
+    def _device_ports_subquery(self):
+        """
+        构建设备端口子查询
+        将A端、B端的熔丝/空开端口列 UNION ALL 成 (设备ID, 端口类型, 端口编号) 行，
+        再按端口去重：同一端口只要有一条连接的连接类型非空即视为已连接
+        """
+        is_connected = case((func.trim(Connection.connection_type) != '', 1), else_=0)
+        port_columns = [
+            (Connection.source_device_id, "fuse", Connection.source_fuse_number),
+            (Connection.source_device_id, "breaker", Connection.source_breaker_number),
+            (Connection.target_device_id, "fuse", Connection.target_fuse_number),
+            (Connection.target_device_id, "breaker", Connection.target_breaker_number),
+        ]
+        ports = union_all(*[
+            select(
+                device_column.label("device_id"),
+                literal(port_type).label("port_type"),
+                number_column.label("port_number"),
+                is_connected.label("is_connected")
+            ).where(device_column.isnot(None), number_column != '')
+            for device_column, port_type, number_column in port_columns
+        ]).subquery("ports")
+        
+        return select(
+            ports.c.device_id,
+            func.max(ports.c.is_connected).label("is_connected")
+        ).group_by(ports.c.device_id, ports.c.port_type, ports.c.port_number).subquery("device_ports")
+    
+    def _calculate_group_utilization(self, group_column, group_key: str, unknown_label: str) -> list:
+        """
+        按设备分组（设备类型/站点）计算端口使用率
+        全部在SQL中分组聚合完成，查询次数与分组数量无关
+        """
+        # 每个分组的设备数量
+        device_counts = self.db.query(group_column, func.count(Device.id)).group_by(group_column).all()
+        
+        # 每个分组的端口总数和已连接端口数
+        device_ports = self._device_ports_subquery()
+        port_counts = {
+            group_value: (total_ports, connected_ports or 0)
+            for group_value, total_ports, connected_ports in self.db.query(
+                group_column,
+                func.count(),
+                func.sum(device_ports.c.is_connected)
+            ).select_from(device_ports)
+             .join(Device, Device.id == device_ports.c.device_id)
+             .group_by(group_column)
+             .all()
+        }
+        
+        group_stats = []
+        for group_value, device_count in device_counts:
+            total_ports, connected_count = port_counts.get(group_value, (0, 0))
+            utilization_rate = (connected_count / total_ports * 100) if total_ports > 0 else 0
+            
+            group_stats.append({
+                group_key: group_value or unknown_label,
+                "device_count": device_count,
+                "total_ports": total_ports,
+                "connected_ports": connected_count,
+                "idle_ports": total_ports - connected_count,
+                "utilization_rate": round(utilization_rate, 2)
+            })
+        
+        # 按使用率降序排序
+        group_stats.sort(key=lambda x: x["utilization_rate"], reverse=True)
+        return group_stats
+    
     def _calculate_overall_idle_rate(self) -> dict:
         """计算端口总体空闲率"""
         overall_utilization = self._calculate_overall_utilization()
@@ -614,19 +725,8 @@ class AnalyticsService:
     def _calculate_load_balance_analysis(self) -> dict:
         """计算负载均衡分析"""
         try:
-            # 获取所有设备的使用率
-            devices = self.db.query(Device).all()
-            device_utilizations = []
-            
-            for device in devices:
-                utilization_rate = self._get_device_utilization_rate(device.id)
-                device_utilizations.append({
-                    "device_id": device.id,
-                    "device_name": device.name,
-                    "device_type": device.device_type or "未知",
-                    "station": device.station or "未知",
-                    "utilization_rate": utilization_rate
-                })
+            # 获取所有设备的使用率（一次批量查询）
+            device_utilizations = self._get_device_utilizations()
             
             if not device_utilizations:
                 return {
@@ -670,357 +770,46 @@ class AnalyticsService:
     def _get_top_utilized_devices(self, limit: int = 10) -> list:
         """获取使用率最高的设备"""
         try:
-            devices = self.db.query(Device).all()
-            device_utilizations = []
-            
-            for device in devices:
-                utilization_rate = self._get_device_utilization_rate(device.id)
-                device_utilizations.append({
-                    "device_id": device.id,
-                    "device_name": device.name,
-                    "device_type": device.device_type or "未知",
-                    "station": device.station or "未知",
-                    "utilization_rate": utilization_rate
-                })
+            device_utilizations = self._get_device_utilizations()
             
-            # 按使用率降序排序并返回前N个
-            device_utilizations.sort(key=lambda x: x["utilization_rate"], reverse=True)
-            return device_utilizations[:limit]
+            # 用堆取使用率最高的前N个，无需对全部设备排序（并列时保持原有顺序）
+            return heapq.nlargest(limit, device_utilizations, key=lambda x: x["utilization_rate"])
             
         except Exception as e:
             print(f"获取使用率最高设备时出错: {e}")
             return []
     
-    def _get_device_utilization_rate(self, device_id: int) -> float:
-        """获取单个设备的使用率"""
-        try:
-            # 获取设备的所有端口
-            connections = self.db.query(Connection).filter(
-                (Connection.source_device_id == device_id) |
-                (Connection.target_device_id == device_id)
-            ).all()
-            
-            all_ports = set()
-            connected_ports = set()
-            
-            for conn in connections:
-                if conn.source_device_id == device_id:
-                    if conn.source_fuse_number:
-                        port_key = f"fuse_{conn.source_fuse_number}"
-                        all_ports.add(port_key)
-                        if conn.connection_type and conn.connection_type.strip():
-                            connected_ports.add(port_key)
-                    if conn.source_breaker_number:
-                        port_key = f"breaker_{conn.source_breaker_number}"
-                        all_ports.add(port_key)
-                        if conn.connection_type and conn.connection_type.strip():
-                            connected_ports.add(port_key)
-                
-                if conn.target_device_id == device_id:
-                    if conn.target_fuse_number:
-                        port_key = f"fuse_{conn.target_fuse_number}"
-                        all_ports.add(port_key)
-                        if conn.connection_type and conn.connection_type.strip():
-                            connected_ports.add(port_key)
-                    if conn.target_breaker_number:
-                        port_key = f"breaker_{conn.target_breaker_number}"
-                        all_ports.add(port_key)
-                        if conn.connection_type and conn.connection_type.strip():
-                            connected_ports.add(port_key)
-            
-            total_ports = len(all_ports)
-            connected_count = len(connected_ports)
-            
-            return (connected_count / total_ports * 100) if total_ports > 0 else 0
-            
-        except Exception as e:
-            print(f"获取设备 {device_id} 使用率时出错: {e}")
-            return 0
-    
-
-    
-    def get_port_statistics(self) -> dict:
-        """获取全局端口统计信息"""
-        try:
-            # 1. 设备端口总览
-            device_port_summary = self._get_device_port_summary()
-            
-            # 2. 端口类型统计
-            port_type_statistics = self._get_port_type_statistics()
-            
-            # 3. 容量统计
-            capacity_statistics = self._get_capacity_statistics()
-            
-            # 4. 设备端口详情
-            device_port_details = self._get_device_port_details()
-            
-            return {
-                "device_port_summary": device_port_summary,
-                "port_type_statistics": port_type_statistics,
-                "capacity_statistics": capacity_statistics,
-                "device_port_details": device_port_details
-            }
-        except Exception as e:
-            print(f"获取端口统计信息时出错: {e}")
-            raise HTTPException(status_code=500, detail=f"获取端口统计信息失败: {str(e)}")
-    
-    def _get_device_port_summary(self) -> dict:
-        """获取设备端口总览 - 采用集合统计逻辑，统计所有有连接的端口"""
-        try:
-            # 统计总设备数
-            total_devices = self.db.query(Device).count()
-            
-            # 使用集合来避免重复计算同一个端口
-            all_ports = set()
-            connected_ports = set()
-            
-            # 获取所有连接记录
-            connections = self.db.query(Connection).all()
-            
-            for conn in connections:
-                # 统计源端口（A端）
-                if conn.source_fuse_number and conn.source_device_id:
-                    port_key = f"device_{conn.source_device_id}_fuse_{conn.source_fuse_number}"
-                    all_ports.add(port_key)
-                    # 通过连接类型字段是否为空判断端口使用状态
-                    if conn.connection_type and conn.connection_type.strip():
-                        connected_ports.add(port_key)
-                        
-                if conn.source_breaker_number and conn.source_device_id:
-                    port_key = f"device_{conn.source_device_id}_breaker_{conn.source_breaker_number}"
-                    all_ports.add(port_key)
-                    # 通过连接类型字段是否为空判断端口使用状态
-                    if conn.connection_type and conn.connection_type.strip():
-                        connected_ports.add(port_key)
-                
-                # 统计目标端口（B端）- 符合设计文档中"一个连接占用两个端口"的要求
-                if conn.target_fuse_number and conn.target_device_id:
-                    port_key = f"device_{conn.target_device_id}_fuse_{conn.target_fuse_number}"
-                    all_ports.add(port_key)
-                    # 通过连接类型字段是否为空判断端口使用状态
-                    if conn.connection_type and conn.connection_type.strip():
-                        connected_ports.add(port_key)
-                        
-                if conn.target_breaker_number and conn.target_device_id:
-                    port_key = f"device_{conn.target_device_id}_breaker_{conn.target_breaker_number}"
-                    all_ports.add(port_key)
-                    # 通过连接类型字段是否为空判断端口使用状态
-                    if conn.connection_type and conn.connection_type.strip():
-                        connected_ports.add(port_key)
-            
-            total_ports = len(all_ports)
-            connected_count = len(connected_ports)
-            idle_ports = total_ports - connected_count
-            utilization_rate = (connected_count / total_ports * 100) if total_ports > 0 else 0
-            
-            return {
-                "total_devices": total_devices,
-                "total_ports": total_ports,
-                "connected_ports": connected_count,
-                "idle_ports": idle_ports,
-                "utilization_rate": round(utilization_rate, 2)
-            }
-        except Exception as e:
-            print(f"获取设备端口总览时出错: {e}")
-            return {
-                "total_devices": 0,
-                "total_ports": 0,
-                "connected_ports": 0,
-                "idle_ports": 0,
-                "utilization_rate": 0
-            }
-    
-    def _get_port_type_statistics(self) -> dict:
-        """获取端口类型统计 - 基于A端设备统计"""
-        try:
-            # 获取所有连接记录
-            connections = self.db.query(Connection).all()
-            
-            # 使用集合来避免重复计算端口
-            fuse_ports = set()
-            breaker_ports = set()
-            connected_fuse_ports = set()
-            connected_breaker_ports = set()
-            
-            for conn in connections:
-                # 只统计A端（源端）设备的端口
-                if conn.source_fuse_number and conn.source_device_id:
-                    port_key = f"{conn.source_device_id}_fuse_{conn.source_fuse_number}"
-                    fuse_ports.add(port_key)
-                    # 通过连接类型字段是否为空判断端口使用状态
-                    if conn.connection_type and conn.connection_type.strip():
-                        connected_fuse_ports.add(port_key)
-                
-                if conn.source_breaker_number and conn.source_device_id:
-                    port_key = f"{conn.source_device_id}_breaker_{conn.source_breaker_number}"
-                    breaker_ports.add(port_key)
-                    # 通过连接类型字段是否为空判断端口使用状态
-                    if conn.connection_type and conn.connection_type.strip():
-                        connected_breaker_ports.add(port_key)
-            
-            fuse_total = len(fuse_ports)
-            fuse_connected = len(connected_fuse_ports)
-            breaker_total = len(breaker_ports)
-            breaker_connected = len(connected_breaker_ports)
-            
-            return {
-                "fuse_ports": {
-                    "total": fuse_total,
-                    "connected": fuse_connected,
-                    "idle": fuse_total - fuse_connected,
-                    "utilization_rate": round((fuse_connected / fuse_total * 100) if fuse_total > 0 else 0, 2)
-                },
-                "breaker_ports": {
-                    "total": breaker_total,
-                    "connected": breaker_connected,
-                    "idle": breaker_total - breaker_connected,
-                    "utilization_rate": round((breaker_connected / breaker_total * 100) if breaker_total > 0 else 0, 2)
-                }
-            }
-        except Exception as e:
-            print(f"获取端口类型统计时出错: {e}")
-            return {
-                "fuse_ports": {"total": 0, "connected": 0, "idle": 0, "utilization_rate": 0},
-                "breaker_ports": {"total": 0, "connected": 0, "idle": 0, "utilization_rate": 0}
-            }
-    
-    def _get_capacity_statistics(self) -> dict:
-        """获取容量统计"""
-        try:
-            # 获取所有连接的规格信息
-            connections = self.db.query(Connection).all()
-            
-            capacity_stats = {}
-            high_capacity_available = {"630A_above": 0, "400A_above": 0, "250A_above": 0}
-            
-            for conn in connections:
-                # 处理各种规格字段
-                for spec_field in [conn.source_fuse_spec, conn.source_breaker_spec, 
-                                 conn.target_fuse_spec, conn.target_breaker_spec]:
-                    if spec_field:
-                        rating = self._extract_rating_from_spec(spec_field)
-                        if rating and rating != "未知":
-                            if rating not in capacity_stats:
-                                capacity_stats[rating] = {"total": 0, "connected": 0, "idle": 0}
-                            
-                            capacity_stats[rating]["total"] += 1
-                            
-                            # 判断是否已连接
-                            if conn.source_device_id and conn.target_device_id:
-                                capacity_stats[rating]["connected"] += 1
-                            else:
-                                capacity_stats[rating]["idle"] += 1
-                                
-                                # 统计大容量可用端口
-                                try:
-                                    rating_value = int(rating.replace('A', ''))
-                                    if rating_value >= 630:
-                                        high_capacity_available["630A_above"] += 1
-                                    if rating_value >= 400:
-                                        high_capacity_available["400A_above"] += 1
-                                    if rating_value >= 250:
-                                        high_capacity_available["250A_above"] += 1
-                                except ValueError:
-                                    pass  # 忽略无法转换的容量值
-            
-            return {
-                "by_rating": capacity_stats,
-                "high_capacity_available": high_capacity_available
-            }
-        except Exception as e:
-            print(f"获取容量统计时出错: {e}")
-            return {
-                "by_rating": {},
-                "high_capacity_available": {"630A_above": 0, "400A_above": 0, "250A_above": 0}
-            }
-    
-    def _get_device_port_details(self) -> list:
-        """获取设备端口详情 - 基于A端设备统计"""
-        try:
-            # 获取所有设备及其端口使用情况
-            devices = self.db.query(Device).all()
-
-            device_details = []
-            
-            for device in devices:
-                # 只统计该设备作为A端（源端）的连接记录
-                device_connections = self.db.query(Connection).filter(
-                    Connection.source_device_id == device.id
-                ).all()
-
-                # 使用集合来避免重复计算端口
-                all_ports = set()
-                connected_ports_set = set()
-                fuse_ports = set()
-                breaker_ports = set()
-                
-                for conn in device_connections:
-                    # 只统计该设备作为A端的端口
-                    if conn.source_fuse_number:
-                        port_key = f"fuse_{conn.source_fuse_number}"
-                        all_ports.add(port_key)
-                        fuse_ports.add(port_key)
-                        # 通过连接类型字段是否为空判断端口使用状态
-                        if conn.connection_type and conn.connection_type.strip():
-                            connected_ports_set.add(port_key)
-
-                    if conn.source_breaker_number:
-                        port_key = f"breaker_{conn.source_breaker_number}"
-                        all_ports.add(port_key)
-                        breaker_ports.add(port_key)
-                        # 通过连接类型字段是否为空判断端口使用状态
-                        if conn.connection_type and conn.connection_type.strip():
-                            connected_ports_set.add(port_key)
-
-                
-                total_ports = len(all_ports)
-                connected_ports = len(connected_ports_set)
-                
-                idle_ports = total_ports - connected_ports
-                utilization_rate = (connected_ports / total_ports * 100) if total_ports > 0 else 0
-                
-                device_details.append({
-                    "device_id": device.id,
-                    "device_name": device.name,
-                    "device_type": device.device_type or "未知",
-                    "station": device.station or "未知",
-                    "total_ports": total_ports,
-                    "connected_ports": connected_ports,
-                    "idle_ports": idle_ports,
-                    "utilization_rate": round(utilization_rate, 2),
-                    "fuse_ports": len(fuse_ports),
-                    "breaker_ports": len(breaker_ports)
-                })
-            
-            # 按利用率降序排序
-            device_details.sort(key=lambda x: x["utilization_rate"], reverse=True)
-            
-            return device_details
-        except Exception as e:
-            print(f"获取设备端口详情时出错: {e}")
-            return []
+    def _get_device_utilizations(self) -> list:
+        """获取所有设备的使用率列表，供负载均衡分析和Top N统计共用"""
+        port_usage = self._get_all_device_port_usage()
+        devices = self.db.query(Device.id, Device.name, Device.device_type, Device.station).all()
+        
+        device_utilizations = []
+        for device_id, name, device_type, station in devices:
+            total_ports, connected_ports = port_usage.get(device_id, (0, 0))
+            device_utilizations.append({
+                "device_id": device_id,
+                "device_name": name,
+                "device_type": device_type or "未知",
+                "station": station or "未知",
+                "utilization_rate": (connected_ports / total_ports * 100) if total_ports > 0 else 0
+            })
+        return device_utilizations
     
-    def _extract_rating_from_spec(self, spec_string: str) -> str:
-        """从规格字符串中提取电流等级"""
-        if not spec_string:
-            return "未知"
+    def _get_all_device_port_usage(self) -> dict:
+        """
+        批量获取所有设备的端口使用情况
+        一次分组查询返回 {设备ID: (端口总数, 已连接端口数)}，统计A端和B端端口
+        """
+        device_ports = self._device_ports_subquery()
+        rows = self.db.query(
+            device_ports.c.device_id,
+            func.count(),
+            func.sum(device_ports.c.is_connected)
+        ).group_by(device_ports.c.device_id).all()
         
-        try:
-            # 匹配括号内的电流值，如 "NT4(500A)" -> "500A"
-            match = re.search(r'\((\d+)A\)', spec_string)
-            if match:
-                return f"{match.group(1)}A"
-            
-            # 匹配直接的电流值，如 "500A" -> "500A"
-            match = re.search(r'(\d+)A', spec_string)
-            if match:
-                return f"{match.group(1)}A"
-            
-            return "未知"
-        except Exception as e:
-            print(f"提取电流等级时出错: {e}")
-            return "未知"
-    
+        return {device_id: (total_ports, connected_ports or 0) for device_id, total_ports, connected_ports in rows}
+
 
 
 
@@ -1048,6 +837,10 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 # --- 数据库会话管理 ---
+# 注意：所有访问数据库的路由都声明为普通 def（而非 async def），
+# FastAPI 会把它们连同 get_db 依赖一起放到线程池中执行，
+# 这样同步的 SQLAlchemy 查询不会阻塞事件循环，慢请求（如 /upload）也不会让其他请求排队。
+# 确需 async 的路由（如需要 await request.json()）必须通过 run_in_threadpool 执行数据库操作。
 
 def get_db():
     """
@@ -1073,6 +866,44 @@ def get_db():
             print("数据库会话已关闭")
         print("--- 数据库会话管理结束 ---\n")
 
+# --- 缓存失效通知 ---
+# 进程内缓存（如拓扑索引）在数据写入后必须失效，所有写路由在提交后调用以下函数。
+
+def _on_devices_changed(device: Device = None, deleted_device_id: int = None):
+    """
+    设备数据写入后调用：使依赖设备数据的进程内缓存失效
+    单个设备新增/修改时传入该设备、删除时传入其ID，设备联想索引增量更新；不传参数（批量写入）时整体失效
+    """
+    topology_index.invalidate()
+    device_lookup.invalidate()
+    if device is not None:
+        device_suggest.upsert_device(device.id, device.name, device.asset_id, device.station)
+    elif deleted_device_id is not None:
+        device_suggest.remove_device(deleted_device_id)
+    else:
+        device_suggest.invalidate()
+    # 连接列表按设备名称筛选，删除设备也会删除其连接，因此同时使连接列表的总数失效
+    pagination.invalidate(pagination.SCOPE_DEVICES)
+    pagination.invalidate(pagination.SCOPE_CONNECTIONS)
+
+
+def _on_connections_changed():
+    """连接数据写入后调用：使依赖连接数据的进程内缓存失效"""
+    topology_index.invalidate()
+    pagination.invalidate(pagination.SCOPE_CONNECTIONS)
+
+
+def _on_import_finished():
+    """Excel导入任务结束后在后台线程中调用：导入会写入设备和连接"""
+    _on_devices_changed()
+    _on_connections_changed()
+
+
+def _on_lifecycle_rules_changed():
+    """生命周期规则写入后调用：使规则缓存和按生命周期状态筛选的设备总数失效"""
+    lifecycle.invalidate_rules()
+    pagination.invalidate(pagination.SCOPE_DEVICES)
+
 # --- 应用启动事件 ---
 
 @app.on_event("startup")
@@ -1098,6 +929,20 @@ def on_startup():
         print("🗄️ 正在初始化数据库...")
         create_db_and_tables()
         
+        # 执行尚未执行的数据库迁移（字段、索引等，已执行的版本不再重复执行）
+        print("🔧 正在检查数据库迁移...")
+        if not run_migrations():
+            raise RuntimeError("数据库迁移失败")
+        
+        # 创建全文检索索引和同步触发器（SQLite 不支持 FTS5 trigram 时检索退回到 LIKE 查询）
+        print("🔎 正在检查全文检索索引...")
+        search_index.upgrade_search_index()
+        
+        # 上次运行中未完成的导入任务已随进程中断，标记为失败
+        interrupted_jobs = import_jobs.recover_interrupted_jobs()
+        if interrupted_jobs:
+            print(f"⚠️ {interrupted_jobs} 个未完成的导入任务已标记为失败")
+        
         print("✅ 应用启动完成！")
         print(f"🌐 服务器地址: http://localhost:{PORT}")
         print("=" * 60 + "\n")
@@ -1111,105 +956,58 @@ def on_startup():
         print("=" * 60)
         raise  # 重新抛出异常，停止应用启动
 
+@app.on_event("startup")
+async def configure_db_threadpool():
+    """
+    设置执行同步路由（数据库操作）的线程池大小
+    所有同步路由和依赖共享 anyio 的默认线程池，容量由 DB_THREADPOOL_SIZE 控制
+    """
+    limiter = to_thread.current_default_thread_limiter()
+    limiter.total_tokens = DB_THREADPOOL_SIZE
+    print(f"🧵 数据库线程池大小: {DB_THREADPOOL_SIZE}")
+
 # --- 路由和视图函数 ---
 
+# 首页服务端渲染的设备数量（第一页），后续页面由页面脚本请求 /api/devices
+HOME_PAGE_SIZE = 50
+# 首页总数与 /api/devices 无筛选时的总数共用缓存（筛选条件均为空）
+HOME_TOTAL_FILTERS = ("", "", "", "", "")
+
+
 @app.get("/", response_class=HTMLResponse)
-async def read_root(request: Request, db: Session = Depends(get_db)):
+def read_root(request: Request, db: Session = Depends(get_db)):
     """
-    首页路由 - 显示所有设备列表
-    增加了详细的日志记录来跟踪数据获取过程
+    首页路由 - 渲染页面框架和设备列表第一页
+    后续页面、排序和筛选由页面脚本通过 /api/devices 按游标分页加载，设备数和连接数用聚合查询统计
     """
     print("\n=== 首页数据获取开始 ===")
     
     try:
-        # 获取设备数据
-        print("正在从数据库查询设备数据...")
-        devices = db.query(Device).order_by(Device.id).all()
-        device_count = len(devices)
-        print(f"查询到 {device_count} 个设备")
-        
-        # 获取生命周期规则
-        lifecycle_rules = db.query(LifecycleRule).filter(LifecycleRule.is_active == 'true').all()
-        rules_dict = {rule.device_type: rule for rule in lifecycle_rules}
-        print(f"加载了 {len(rules_dict)} 个生命周期规则")
-        
-        # 为每个设备计算生命周期状态
-        for device in devices:
-            lifecycle_status = "unknown"
-            lifecycle_status_text = "未配置规则"
-            
-            if device.device_type and device.device_type in rules_dict:
-                rule = rules_dict[device.device_type]
-                if device.commission_date:
-                    try:
-                        # 解析投产日期
-                        commission_date = None
-                        date_str = str(device.commission_date).strip()
-                        
-                        # 处理特殊格式：YYYYMM (如 202312)
-                        if re.match(r'^\d{6}$', date_str):
-                            try:
-                                year = int(date_str[:4])
-                                month = int(date_str[4:6])
-                                commission_date = datetime(year, month, 1)
-                            except ValueError:
-                                pass
-                        
-                        # 如果特殊格式解析失败，尝试标准格式
-                        if not commission_date:
-                            date_formats = [
-                                "%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d",
-                                "%Y-%m", "%Y/%m", "%Y.%m",
-                                "%Y年%m月%d日", "%Y年%m月"
-                            ]
-                            
-                            for fmt in date_formats:
-                                try:
-                                    commission_date = datetime.strptime(date_str, fmt)
-                                    break
-                                except ValueError:
-                                    continue
-                        
-                        if commission_date:
-                            # 计算服役时间
-                            today = datetime.now()
-                            service_years = (today - commission_date).days / 365.25
-                            
-                            # 判断状态
-                            if service_years >= rule.lifecycle_years:
-                                lifecycle_status = "expired"
-                                lifecycle_status_text = "已超期"
-                            elif service_years >= (rule.lifecycle_years - rule.warning_months / 12):
-                                lifecycle_status = "warning"
-                                lifecycle_status_text = "临近超限"
-                            else:
-                                lifecycle_status = "normal"
-                                lifecycle_status_text = "正常"
-                        else:
-                            lifecycle_status = "unknown"
-                            lifecycle_status_text = "投产日期格式无法识别"
-                    except Exception as e:
-                        lifecycle_status = "unknown"
-                        lifecycle_status_text = "投产日期格式无法识别"
-                else:
-                    lifecycle_status = "unknown"
-                    lifecycle_status_text = "投产日期未填写"
-            
-            # 将状态信息添加到设备对象
+        # 获取设备列表第一页（与 /api/devices 的默认排序一致）
+        print("正在从数据库查询第一页设备数据...")
+        devices, next_cursor = pagination.keyset_page(
+            db.query(Device), "id", DEVICE_SORT_COLUMNS["id"], None, HOME_PAGE_SIZE
+        )
+        device_count = pagination.cached_total(pagination.SCOPE_DEVICES, HOME_TOTAL_FILTERS, db.query(Device).count)
+        print(f"数据库中共有 {device_count} 个设备，首页显示前 {len(devices)} 个")
+        
+        # 获取生命周期规则（进程内缓存）
+        rules = lifecycle.get_active_rules(db)
+        print(f"加载了 {len(rules)} 个生命周期规则")
+        
+        # 批量计算第一页设备的生命周期状态，并将状态信息添加到设备对象
+        statuses = lifecycle.evaluate_devices(devices, rules)
+        for device, lifecycle_status, lifecycle_status_text in zip(
+            devices, statuses["lifecycle_status"], statuses["lifecycle_status_text"]
+        ):
             device.lifecycle_status = lifecycle_status
             device.lifecycle_status_text = lifecycle_status_text
         
-        # 显示前几个设备的信息用于调试
-        if device_count > 0:
-            print("\n前3个设备信息:")
-            for i, device in enumerate(devices[:3]):
-                print(f"  设备{i+1}: ID={device.id}, 资产编号={device.asset_id}, 名称={device.name}, 生命周期状态={device.lifecycle_status}")
-        else:
+        if device_count == 0:
             print("警告: 数据库中没有设备数据！")
         
-        # 获取连接数据用于统计
-        connections = db.query(Connection).all()
-        connection_count = len(connections)
+        # 连接数用聚合查询统计
+        connection_count = db.query(func.count(Connection.id)).scalar()
         print(f"数据库中共有 {connection_count} 个连接")
         
         # 获取所有不重复的局站列表，用于筛选下拉框
@@ -1241,644 +1039,123 @@ async def read_root(request: Request, db: Session = Depends(get_db)):
         # 检查是否有成功信息
         success_message = request.query_params.get("success")
         if success_message:
-            print(f"检测到成功信息: {success_message}")
-        else:
-            print("没有成功信息")
-        
-        print("=== 首页数据获取完成 ===")
-        
-        return templates.TemplateResponse("index.html", {
-            "request": request, 
-            "devices": devices, 
-            "stations": station_list,
-            "device_types": device_type_list,
-            "vendors": vendor_list,
-            "upload_error": upload_error,
-            "success_message": success_message
-        })
-        
-    except Exception as e:
-        print(f"\n!!! 首页数据获取失败 !!!")
-        print(f"错误类型: {type(e).__name__}")
-        print(f"错误信息: {e}")
-        print("\n完整错误堆栈:")
-        traceback.print_exc()
-        print("=" * 50)
-        
-        # 返回错误页面或空设备列表
-        return templates.TemplateResponse("index.html", {
-            "request": request, 
-            "devices": [], 
-            "stations": [],
-            "device_types": [],
-            "vendors": [],
-            "upload_error": f"获取设备数据时出错: {e}"
-        })
-
-@app.post("/upload")
-async def upload_excel(file: UploadFile = File(...), password: str = Form(...), db: Session = Depends(get_db)):
-    """
-    处理 Excel 文件上传。
-    如果失败，则重定向回主页并附带详细错误信息。
-    增加了详细的日志记录来跟踪处理过程。
-    """
-    print("\n=== 开始处理上传的Excel文件 ===")
-    print(f"上传文件名: {file.filename}")
-    print(f"文件类型: {file.content_type}")
-    
-    # 验证管理员密码
-    if not verify_admin_password(password):
-        error_message = "密码错误，无权限执行此操作。"
-        print(f"权限验证失败: {error_message}")
-        return RedirectResponse(url=f"/?error={quote(error_message)}", status_code=303)
-    
-    print("管理员密码验证通过")
-    
-    try:
-        # 步骤 1: 增量更新模式 - 保留手工添加的设备，只更新Excel中的设备
-        print("\n步骤 1: 采用增量更新模式，保留现有手工添加的设备...")
-        
-        # 记录当前数据量
-        current_connections_count = db.query(Connection).count()
-        current_devices_count = db.query(Device).count()
-        print(f"当前数据库状态: {current_connections_count} 个连接, {current_devices_count} 个设备")
-        print("步骤 1: 完成。将采用增量更新模式处理Excel数据。")
-
-        contents = await file.read()
-        print(f"文件大小: {len(contents)} 字节")
-        buffer = io.BytesIO(contents)
-        
-        # 步骤 2: 读取Excel文件
-        print("\n步骤 2: 使用 pandas 读取Excel文件...")
-        # 通过 dtype 参数指定列以字符串形式读取，避免自动转换格式
-        # 重要：假设"上级设备"列现在包含的是父设备的资产编号
-        df = pd.read_excel(buffer, dtype={
-            '资产编号': str,
-            '设备投产时间': str,
-            '上级设备': str 
-        })
-        df = df.where(pd.notna(df), None) # 将 NaN 替换为 None
-        print(f"步骤 2: 完成。读取到 {len(df)} 行数据。")
-        print(f"Excel 文件列名: {df.columns.tolist()}")
-        
-        # 验证必要的列是否存在
-        required_columns = ['资产编号', '设备名称']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            error_msg = f"Excel文件缺少必要的列: {missing_columns}"
-            print(f"错误: {error_msg}")
-            return RedirectResponse(url=f"/?error={quote(error_msg)}", status_code=303)
-        
-        # 显示前几行数据样本用于调试
-        print("\n前3行数据样本:")
-        for i in range(min(3, len(df))):
-            print(f"第{i+1}行: 资产编号={df.iloc[i].get('资产编号')}, 设备名称={df.iloc[i].get('设备名称')}")
-
-        devices_map = {} # 这个映射将以 资产编号 为键
-        devices_created_count = 0
-        devices_updated_count = 0
-        skipped_rows = []
-
-        # 步骤 3: 增量更新设备（创建或更新）
-        print("\n步骤 3: 开始第一遍处理 - 增量更新设备（创建新设备或更新现有设备）...")
-        for index, row in df.iterrows():
-            # 新增：获取并校验资产编号
-            asset_id = row.get("资产编号")
-            if isinstance(asset_id, str):
-                asset_id = asset_id.strip()
-
-            if not asset_id or asset_id == 'nan' or asset_id.lower() == 'none':
-                skip_reason = f"资产编号为空或无效: '{asset_id}'"
-                print(f"  - 第 {index+2} 行：跳过，{skip_reason}")
-                skipped_rows.append((index+2, skip_reason))
-                continue
-            
-            device_name = row.get("设备名称")
-            if isinstance(device_name, str):
-                device_name = device_name.strip()
-
-            if not device_name or device_name == 'nan' or device_name.lower() == 'none':
-                skip_reason = f"设备名称为空或无效: '{device_name}'"
-                print(f"  - 第 {index+2} 行：跳过，{skip_reason}")
-                skipped_rows.append((index+2, skip_reason))
-                continue
-            
-            # 检查资产编号是否已在本次上传中重复
-            if asset_id in devices_map:
-                skip_reason = f"资产编号 '{asset_id}' 在Excel文件中重复"
-                print(f"  - 第 {index+2} 行：跳过，{skip_reason}")
-                skipped_rows.append((index+2, skip_reason))
-                continue
-
-            try:
-                # 检查数据库中是否已存在该资产编号的设备
-                existing_device = db.query(Device).filter(Device.asset_id == asset_id).first()
-                
-                # 获取局站信息
-                station = row.get("局站")
-                if isinstance(station, str):
-                    station = station.strip()
-                if not station or station == 'nan' or station.lower() == 'none':
-                    skip_reason = f"局站信息为空或无效: '{station}'"
-                    print(f"  - 第 {index+2} 行：跳过，{skip_reason}")
-                    skipped_rows.append((index+2, skip_reason))
-                    continue
-                
-                # 获取并验证设备类型
-                device_type = row.get("设备类型")
-                if isinstance(device_type, str):
-                    device_type = device_type.strip()
-                
-                # 验证设备类型是否在标准列表中
-                if device_type and device_type != 'nan' and device_type.lower() != 'none':
-                    if not validate_device_type(device_type):
-                        # 提供建议的设备类型
-                        suggestions = get_device_type_suggestions(device_type)
-                        if suggestions:
-                            suggestion_text = f"，建议使用: {', '.join(suggestions[:3])}"
-                        else:
-                            suggestion_text = ""
-                        skip_reason = f"设备类型 '{device_type}' 不在标准列表中{suggestion_text}"
-                        print(f"  - 第 {index+2} 行：跳过，{skip_reason}")
-                        skipped_rows.append((index+2, skip_reason))
-                        continue
-                else:
-                    # 如果设备类型为空，设置为"待确认"
-                    device_type = "待确认"
-                
-                if existing_device:
-                    # 更新现有设备
-                    existing_device.name = device_name
-                    existing_device.station = station
-                    existing_device.model = row.get("设备型号")
-                    existing_device.device_type = device_type  # 使用验证后的设备类型
-                    existing_device.location = row.get("机房内空间位置")
-                    existing_device.power_rating = row.get("设备额定容量")
-                    existing_device.vendor = row.get("设备生产厂家")
-                    existing_device.commission_date = row.get("设备投产时间")
-                    existing_device.remark = row.get("备注")
-                    
-                    # 注意：以下机房相关字段被忽略（根据用户要求）：
-                    # - 机房名称
-                    # - 资源系统机房名称  
-                    # - 资源系统机房编码
-                    # - 机房等级
-                    
-                    devices_map[asset_id] = existing_device
-                    devices_updated_count += 1
-                    print(f"  - 第 {index+2} 行：准备更新现有设备 '{device_name}' (资产编号: {asset_id}, 局站: {station})")
-                else:
-                    # 创建新设备
-                    device = Device(
-                        asset_id=asset_id,
-                        name=device_name,
-                        station=station,
-                        model=row.get("设备型号"),
-                        device_type=device_type,  # 使用验证后的设备类型
-                        location=row.get("机房内空间位置"),
-                        power_rating=row.get("设备额定容量"),
-                        vendor=row.get("设备生产厂家"),
-                        commission_date=row.get("设备投产时间"),
-                        remark=row.get("备注")
-                        # 注意：以下机房相关字段被忽略（根据用户要求）：
-                        # - 机房名称
-                        # - 资源系统机房名称  
-                        # - 资源系统机房编码
-                        # - 机房等级
-                    )
-                    db.add(device)
-                    devices_map[asset_id] = device
-                    devices_created_count += 1
-                    print(f"  - 第 {index+2} 行：准备创建新设备 '{device_name}' (资产编号: {asset_id}, 局站: {station})")
-                    
-            except Exception as device_error:
-                skip_reason = f"处理设备失败: {device_error}"
-                print(f"  - 第 {index+2} 行：跳过，{skip_reason}")
-                skipped_rows.append((index+2, skip_reason))
-                continue
-        
-        print(f"\n准备提交设备更改到数据库（新建: {devices_created_count}, 更新: {devices_updated_count}）...")
-        try:
-            db.commit() # 提交事务以生成设备ID
-            print("设备提交成功！")
-        except Exception as commit_error:
-            print(f"设备提交失败: {commit_error}")
-            db.rollback()
-            raise commit_error
-            
-        # 验证设备数量
-        actual_device_count = db.query(Device).count()
-        print(f"步骤 3: 完成。新建 {devices_created_count} 个设备，更新 {devices_updated_count} 个设备，数据库中总共有 {actual_device_count} 个设备。")
-        
-        if skipped_rows:
-            print(f"\n跳过的行数统计: {len(skipped_rows)} 行")
-            for row_num, reason in skipped_rows[:5]:  # 只显示前5个
-                print(f"  第{row_num}行: {reason}")
-            if len(skipped_rows) > 5:
-                print(f"  ... 还有 {len(skipped_rows) - 5} 行被跳过")
-
-        # 刷新映射，确保对象包含数据库生成的ID
-        print("\n刷新设备对象以获取数据库生成的ID...")
-        for asset_id_key in list(devices_map.keys()):
-            try:
-                db.refresh(devices_map[asset_id_key])
-                print(f"  设备 {asset_id_key} ID: {devices_map[asset_id_key].id}")
-            except Exception as refresh_error:
-                print(f"  刷新设备 {asset_id_key} 失败: {refresh_error}")
-
-        # 步骤 4: 清理涉及Excel设备的旧连接
-        print("\n步骤 4: 清理涉及Excel中设备的旧连接...")
-        excel_device_ids = [device.id for device in devices_map.values()]
-        if excel_device_ids:
-            # 删除涉及这些设备的所有连接（作为源设备或目标设备）
-            old_connections_deleted = db.query(Connection).filter(
-                (Connection.source_device_id.in_(excel_device_ids)) |
-                (Connection.target_device_id.in_(excel_device_ids))
-            ).delete(synchronize_session=False)
-            db.commit()
-            print(f"删除了 {old_connections_deleted} 个涉及Excel设备的旧连接")
-        else:
-            print("没有Excel设备，跳过连接清理")
-            
-        connections_created_count = 0
-        connection_skipped_rows = []
-        
-        # 步骤 5: 创建新连接
-        print("\n步骤 5: 开始第二遍处理 - 创建新连接...")
-        for index, row in df.iterrows():
-            # 使用资产编号来查找设备
-            source_asset_id = row.get("上级设备")
-            target_asset_id = row.get("资产编号")
-
-            if isinstance(source_asset_id, str):
-                source_asset_id = source_asset_id.strip()
-            if isinstance(target_asset_id, str):
-                target_asset_id = target_asset_id.strip()
-            
-            # 检查是否有上级设备信息
-            if not source_asset_id or source_asset_id == 'nan' or source_asset_id.lower() == 'none':
-                print(f"  - 第 {index+2} 行：跳过连接创建，无上级设备信息")
-                continue
-                
-            # 确保源和目标设备都存在于映射中
-            if target_asset_id and source_asset_id:
-                if source_asset_id not in devices_map:
-                    skip_reason = f"上级设备 '{source_asset_id}' 不存在"
-                    print(f"  - 第 {index+2} 行：跳过连接，{skip_reason}")
-                    connection_skipped_rows.append((index+2, skip_reason))
-                    continue
-                    
-                if target_asset_id not in devices_map:
-                    skip_reason = f"目标设备 '{target_asset_id}' 不存在"
-                    print(f"  - 第 {index+2} 行：跳过连接，{skip_reason}")
-                    connection_skipped_rows.append((index+2, skip_reason))
-                    continue
-                
-                source_device = devices_map[source_asset_id]
-                target_device = devices_map[target_asset_id]
-                
-                try:
-                    connection = Connection(
-                        source_device_id=source_device.id,
-                        source_port=row.get("上级端口"),
-                        target_device_id=target_device.id,
-                        target_port=row.get("本端端口"),
-                        cable_type=row.get("线缆类型")
-                    )
-                    db.add(connection)
-                    connections_created_count += 1
-                    print(f"  - 第 {index+2} 行：准备创建从 '{source_device.name}' 到 '{target_device.name}' 的连接")
-                except Exception as conn_error:
-                    skip_reason = f"创建连接对象失败: {conn_error}"
-                    print(f"  - 第 {index+2} 行：跳过连接，{skip_reason}")
-                    connection_skipped_rows.append((index+2, skip_reason))
-                    continue
-        
-        print(f"\n准备提交 {connections_created_count} 个连接到数据库...")
-        try:
-            db.commit()
-            print("连接提交成功！")
-        except Exception as commit_error:
-            print(f"连接提交失败: {commit_error}")
-            db.rollback()
-            raise commit_error
-            
-        # 验证连接是否真的被创建
-        actual_connection_count = db.query(Connection).count()
-        print(f"步骤 5: 完成。预期创建 {connections_created_count} 个连接，实际数据库中有 {actual_connection_count} 个连接。")
-        
-        if connection_skipped_rows:
-            print(f"\n连接跳过的行数统计: {len(connection_skipped_rows)} 行")
-            for row_num, reason in connection_skipped_rows[:5]:  # 只显示前5个
-                print(f"  第{row_num}行: {reason}")
-            if len(connection_skipped_rows) > 5:
-                print(f"  ... 还有 {len(connection_skipped_rows) - 5} 行连接被跳过")
-        
-        # 步骤 6: 处理Sheet2连接数据
-        sheet2_connections_count = 0
-        sheet2_skipped_rows = []
+            print(f"检测到成功信息: {success_message}")
+        else:
+            print("没有成功信息")
         
-        try:
-            print("\n步骤 6: 开始处理Sheet2连接数据...")
-            
-            # 尝试读取Sheet2（连接表）
-            try:
-                # 重置buffer位置到开头，因为之前读取Sheet1时已经移动了位置
-                buffer.seek(0)
-                df_connections = pd.read_excel(buffer, sheet_name='连接')
-                print(f"成功读取Sheet2，共 {len(df_connections)} 行连接数据")
-            except Exception as sheet_error:
-                print(f"无法读取Sheet2（连接表）: {sheet_error}")
-                print("跳过Sheet2处理，继续完成导入")
-                df_connections = None
-            
-            if df_connections is not None and len(df_connections) > 0:
-                # 连接类型映射 - 扩展映射表以包含更多可能的空值表示
-                CONNECTION_TYPE_MAPPING = {
-                    # 标准连接类型
-                    '电缆': 'cable',
-                    '铜排': 'busbar', 
-                    '母线': 'busway',
-                    'cable': 'cable',
-                    'busbar': 'busbar',
-                    'busway': 'busway',
-                    # 电气连接类型 - 根据实际Excel数据添加
-                    '直流': 'DC',
-                    '交流': 'AC',
-                    'DC': 'DC',
-                    'AC': 'AC',
-                    'dc': 'DC',
-                    'ac': 'AC',
-                    # 空值的各种表示方式 - 统一映射为None表示空闲端口
-                    '无': None,
-                    '空': None,
-                    '空闲': None,
-                    '未连接': None,
-                    'N/A': None,
-                    'n/a': None,
-                    'NA': None,
-                    'na': None,
-                    '无连接': None,
-                    '待连接': None,
-                    '预留': None,
-                    'None': None,
-                    'null': None,
-                    'NULL': None,
-                    '': None,  # 空字符串
-                    ' ': None,  # 空格
-                }
-                
-                # 辅助函数：获取或创建设备
-                def get_or_create_device(device_name: str, default_station: str = "未知站点"):
-                    """获取设备，如果不存在则自动创建"""
-                    if not device_name:
-                        return None
-                    
-                    device = db.query(Device).filter(Device.name == device_name).first()
-                    if not device:
-                        # 自动创建设备
-                        device = Device(
-                            name=device_name,
-                            asset_id=f"AUTO_{len(device_name)}_{hash(device_name) % 10000:04d}",  # 生成唯一资产编号
-                            station=default_station,
-                            device_type="待确认",
-                            location="待确认",
-                            remark="通过Excel导入时自动创建，请完善设备信息"
-                        )
-                        db.add(device)
-                        db.flush()  # 获取ID但不提交
-                        print(f"  * 自动创建设备: {device_name} (ID: {device.id})")
-                    return device
-                
-                # 统计信息
-                created_devices = []
-                warnings = []
-                
-                for index, row in df_connections.iterrows():
-                    try:
-                        # 获取设备名称
-                        source_device_name = str(row.get('A端设备名称', '')).strip()
-                        target_device_name = str(row.get('B端设备名称', '')).strip()
-                        
-                        # 处理空设备名称的情况
-                        if not source_device_name and not target_device_name:
-                            skip_reason = "A端和B端设备名称都为空"
-                            print(f"  - 第 {index+2} 行：跳过连接，{skip_reason}")
-                            sheet2_skipped_rows.append((index+2, skip_reason))
-                            continue
-                        elif not source_device_name:
-                            skip_reason = "A端设备名称为空"
-                            print(f"  - 第 {index+2} 行：跳过连接，{skip_reason}")
-                            sheet2_skipped_rows.append((index+2, skip_reason))
-                            continue
-                        elif not target_device_name:
-                            skip_reason = "B端设备名称为空"
-                            print(f"  - 第 {index+2} 行：跳过连接，{skip_reason}")
-                            sheet2_skipped_rows.append((index+2, skip_reason))
-                            continue
-                        
-                        # 获取或创建设备
-                        source_device = get_or_create_device(source_device_name)
-                        target_device = get_or_create_device(target_device_name)
-                        
-                        if not source_device or not target_device:
-                            skip_reason = "设备创建失败"
-                            print(f"  - 第 {index+2} 行：跳过连接，{skip_reason}")
-                            sheet2_skipped_rows.append((index+2, skip_reason))
-                            continue
-                        
-                        # 记录新创建的设备
-                        if source_device.remark and "通过Excel导入时自动创建" in source_device.remark:
-                            if source_device_name not in created_devices:
-                                created_devices.append(source_device_name)
-                        if target_device.remark and "通过Excel导入时自动创建" in target_device.remark:
-                            if target_device_name not in created_devices:
-                                created_devices.append(target_device_name)
-                        
-                        # 处理端口逻辑
-                        def build_port_info(fuse_number, fuse_spec, breaker_number, breaker_spec):
-                            """构建端口信息，优先使用熔丝，其次使用空开"""
-                            fuse_num = str(fuse_number).strip() if pd.notna(fuse_number) else ''
-                            fuse_sp = str(fuse_spec).strip() if pd.notna(fuse_spec) else ''
-                            breaker_num = str(breaker_number).strip() if pd.notna(breaker_number) else ''
-                            breaker_sp = str(breaker_spec).strip() if pd.notna(breaker_spec) else ''
-                            
-                            if fuse_num and fuse_num != 'nan':
-                                return f"{fuse_num} ({fuse_sp})" if fuse_sp and fuse_sp != 'nan' else fuse_num
-                            elif breaker_num and breaker_num != 'nan':
-                                return f"{breaker_num} ({breaker_sp})" if breaker_sp and breaker_sp != 'nan' else breaker_num
-                            else:
-                                return None
-                        
-                        # 构建A端和B端端口信息
-                        source_port = build_port_info(
-                            row.get('A端熔丝编号'), row.get('A端熔丝规格'),
-                            row.get('A端空开编号'), row.get('A端空开规格')
-                        )
-                        target_port = build_port_info(
-                            row.get('B端熔丝编号'), row.get('B端熔丝规格'),
-                            row.get('B端空开编号'), row.get('空开规格')
-                        )
-                        
-                        # 处理连接类型 - 修复空闲端口被错误归类为电缆的问题
-                        connection_type_raw = row.get('连接类型（交流/直流）')  # 修正：使用实际Excel列名
-                        if pd.isna(connection_type_raw) or str(connection_type_raw).strip() == '':
-                            # 如果连接类型为空，说明是空闲端口，不设置连接类型
-                            connection_type = None
-                        else:
-                            connection_type_raw = str(connection_type_raw).strip()
-                            # 修复：当无法映射时，设置为None而不是默认的'cable'
-                            # 这样可以避免空闲端口被错误归类为电缆连接
-                            connection_type = CONNECTION_TYPE_MAPPING.get(connection_type_raw, None)
-                            
-                            # 如果连接类型仍然无法识别，记录警告但不设置为cable
-                            if connection_type_raw not in CONNECTION_TYPE_MAPPING:
-                                print(f"  * 警告：第 {index+2} 行连接类型 '{connection_type_raw}' 无法识别，设置为空闲端口")
-                                warnings.append(f"第 {index+2} 行：连接类型 '{connection_type_raw}' 无法识别")
-                        
-                        # 检查是否已存在相同连接
-                        existing_connection = db.query(Connection).filter(
-                            Connection.source_device_id == source_device.id,
-                            Connection.target_device_id == target_device.id,
-                            Connection.source_port == source_port,
-                            Connection.target_port == target_port
-                        ).first()
-                        
-                        if existing_connection:
-                            skip_reason = "连接已存在"
-                            print(f"  - 第 {index+2} 行：跳过连接，{skip_reason}")
-                            sheet2_skipped_rows.append((index+2, skip_reason))
-                            continue
-                        
-                        # 创建连接对象
-                        connection = Connection(
-                            source_device_id=source_device.id,
-                            target_device_id=target_device.id,
-                            source_port=source_port,
-                            target_port=target_port,
-                            # A端信息
-                            source_fuse_number=str(row.get('A端熔丝编号', '')).strip() if pd.notna(row.get('A端熔丝编号')) else None,
-                            source_fuse_spec=str(row.get('A端熔丝规格', '')).strip() if pd.notna(row.get('A端熔丝规格')) else None,
-                            source_breaker_number=str(row.get('A端空开编号', '')).strip() if pd.notna(row.get('A端空开编号')) else None,
-                            source_breaker_spec=str(row.get('A端空开规格', '')).strip() if pd.notna(row.get('A端空开规格')) else None,
-                            # B端信息
-                            target_fuse_number=str(row.get('B端熔丝编号', '')).strip() if pd.notna(row.get('B端熔丝编号')) else None,
-                            target_fuse_spec=str(row.get('B端熔丝规格', '')).strip() if pd.notna(row.get('B端熔丝规格')) else None,
-                            target_breaker_number=str(row.get('B端空开编号', '')).strip() if pd.notna(row.get('B端空开编号')) else None,
-                            target_breaker_spec=str(row.get('空开规格', '')).strip() if pd.notna(row.get('空开规格')) else None,
-                            target_device_location=str(row.get('B端设备位置（非动力设备）', '')).strip() if pd.notna(row.get('B端设备位置（非动力设备）')) else None,
-                            # 额定电流信息
-                            a_rated_current=str(row.get('A端额定电流', '')).strip() if pd.notna(row.get('A端额定电流')) else None,
-                            b_rated_current=str(row.get('B端额定电流', '')).strip() if pd.notna(row.get('B端额定电流')) else None,
-                            # 连接信息
-                            hierarchy_relation=str(row.get('上下级', '')).strip() if pd.notna(row.get('上下级')) else None,
-                            upstream_downstream=str(row.get('上下游', '')).strip() if pd.notna(row.get('上下游')) else None,
-                            connection_type=connection_type,
-                            cable_model=str(row.get('电缆型号', '')).strip() if pd.notna(row.get('电缆型号')) else None,
-                            # 附加信息
-                            source_device_photo=str(row.get('A端设备照片', '')).strip() if pd.notna(row.get('A端设备照片')) else None,
-                            target_device_photo=str(row.get('B端设备照片', '')).strip() if pd.notna(row.get('B端设备照片')) else None,
-                            remark=str(row.get('备注', '')).strip() if pd.notna(row.get('备注')) else None,
-                            # 安装日期（Excel中没有此字段，设置为None）
-                            installation_date=None
-                        )
-                        
-                        db.add(connection)
-                        sheet2_connections_count += 1
-                        print(f"  - 第 {index+2} 行：准备创建从 '{source_device_name}' 到 '{target_device_name}' 的连接")
-                        print(f"    源端口: {source_port}, 目标端口: {target_port}, 连接类型: {connection_type}")
-                        
-                    except Exception as conn_error:
-                        skip_reason = f"处理连接失败: {conn_error}"
-                        print(f"  - 第 {index+2} 行：跳过连接，{skip_reason}")
-                        sheet2_skipped_rows.append((index+2, skip_reason))
-                        continue
-                
-                # 提交Sheet2连接
-                if sheet2_connections_count > 0:
-                    print(f"\n准备提交 {sheet2_connections_count} 个Sheet2连接到数据库...")
-                    try:
-                        db.commit()
-                        print("Sheet2连接提交成功！")
-                    except Exception as commit_error:
-                        print(f"Sheet2连接提交失败: {commit_error}")
-                        db.rollback()
-                        raise commit_error
-                
-                # 生成详细的导入报告
-                print(f"\n=== Sheet2连接导入报告 ===")
-                print(f"总连接数: {len(df_connections)} 行")
-                print(f"成功导入: {sheet2_connections_count} 个连接")
-                print(f"跳过连接: {len(sheet2_skipped_rows)} 行")
-                
-                if created_devices:
-                    print(f"\n自动创建的设备 ({len(created_devices)} 个):")
-                    for device_name in created_devices:
-                        print(f"  + {device_name}")
-                    print("\n注意: 自动创建的设备信息不完整，请在设备管理页面完善相关信息。")
-                
-                if sheet2_skipped_rows:
-                    print(f"\n跳过的连接详情:")
-                    skip_reasons = {}
-                    for row_num, reason in sheet2_skipped_rows:
-                        if reason not in skip_reasons:
-                            skip_reasons[reason] = []
-                        skip_reasons[reason].append(row_num)
-                    
-                    for reason, rows in skip_reasons.items():
-                        print(f"  {reason}: {len(rows)} 行 (第{', '.join(map(str, rows[:3]))}行{'...' if len(rows) > 3 else ''})")
-                
-                # 计算导入成功率
-                success_rate = (sheet2_connections_count / len(df_connections)) * 100 if len(df_connections) > 0 else 0
-                print(f"\n导入成功率: {success_rate:.1f}% ({sheet2_connections_count}/{len(df_connections)})")
-            
-            print(f"步骤 6: 完成。从Sheet2创建了 {sheet2_connections_count} 个连接")
-            
-        except Exception as sheet2_error:
-            print(f"处理Sheet2时出错: {sheet2_error}")
-            print("继续完成导入，忽略Sheet2错误")
+        print("=== 首页数据获取完成 ===")
         
-        # 最终统计
-        final_connection_count = db.query(Connection).count()
-        total_connections_created = connections_created_count + sheet2_connections_count
+        return templates.TemplateResponse("index.html", {
+            "request": request, 
+            "devices": devices, 
+            "device_count": device_count,
+            "next_cursor": next_cursor,
+            "page_size": HOME_PAGE_SIZE,
+            "stations": station_list,
+            "device_types": device_type_list,
+            "vendors": vendor_list,
+            "upload_error": upload_error,
+            "success_message": success_message
+        })
         
-        print("\n=== Excel文件增量更新处理成功 ===")
-        print(f"处理结果: 新建 {devices_created_count} 个设备, 更新 {devices_updated_count} 个设备")
-        print(f"连接创建: Sheet1创建 {connections_created_count} 个, Sheet2创建 {sheet2_connections_count} 个, 总计 {total_connections_created} 个")
-        print(f"数据库最终状态: {actual_device_count} 个设备, {final_connection_count} 个连接")
-
     except Exception as e:
-        print(f"\n!!! 发生异常，开始回滚事务 !!!")
-        try:
-            db.rollback()
-            print("事务回滚成功")
-        except Exception as rollback_error:
-            print(f"事务回滚失败: {rollback_error}")
-            
-        error_message = f"处理Excel文件时出错: {e}"
-        print(f"\n=== Excel文件处理失败 ===")
+        print(f"\n!!! 首页数据获取失败 !!!")
         print(f"错误类型: {type(e).__name__}")
-        print(f"错误信息: {error_message}")
+        print(f"错误信息: {e}")
         print("\n完整错误堆栈:")
         traceback.print_exc()
         print("=" * 50)
         
-        # 检查数据库状态
-        try:
-            final_device_count = db.query(Device).count()
-            final_connection_count = db.query(Connection).count()
-            print(f"\n错误后数据库状态: {final_device_count} 个设备, {final_connection_count} 个连接")
-        except Exception as db_check_error:
-            print(f"无法检查数据库状态: {db_check_error}")
-            
+        # 返回错误页面或空设备列表
+        return templates.TemplateResponse("index.html", {
+            "request": request, 
+            "devices": [], 
+            "device_count": 0,
+            "next_cursor": None,
+            "page_size": HOME_PAGE_SIZE,
+            "stations": [],
+            "device_types": [],
+            "vendors": [],
+            "upload_error": f"获取设备数据时出错: {e}"
+        })
+
+def _submit_import_upload(request: Request, file: UploadFile, password: str, db: Session, bulk: bool = False):
+    """
+    验证密码、保存上传文件并登记后台导入任务（/upload 和 /upload-bulk 共用）
+    - 表单提交：重定向到 /?import_job=<任务ID>，首页轮询任务进度
+    - 请求头 Accept 为 application/json 时：返回 202 和任务ID
+    """
+    print("\n=== 收到上传的Excel文件 ===")
+    print(f"上传文件名: {file.filename}")
+    print(f"文件类型: {file.content_type}")
+    wants_json = "application/json" in request.headers.get("accept", "")
+    
+    def error_response(error_message, status_code):
+        if wants_json:
+            return JSONResponse(content={"success": False, "message": error_message}, status_code=status_code)
         return RedirectResponse(url=f"/?error={quote(error_message)}", status_code=303)
+    
+    # 验证管理员密码
+    if not verify_admin_password(password):
+        error_message = "密码错误，无权限执行此操作。"
+        print(f"权限验证失败: {error_message}")
+        return error_response(error_message, 401)
+    
+    print("管理员密码验证通过")
+    
+    if bulk and not (file.filename or "").lower().endswith(".zip"):
+        return error_response("批量导入请上传包含多个Excel工作簿的 .zip 压缩包", 400)
+    
+    try:
+        job = import_jobs.submit_import_job(db, file.file, file.filename, on_finished=_on_import_finished, bulk=bulk)
+    except Exception as e:
+        error_message = f"处理Excel文件时出错: {e}"
+        print(f"登记导入任务失败: {error_message}")
+        traceback.print_exc()
+        return error_response(error_message, 500)
+    
+    if wants_json:
+        return JSONResponse(content={
+            "success": True,
+            "message": "文件已上传，正在后台导入",
+            "job_id": job.id,
+            "status_url": f"/api/import-jobs/{job.id}"
+        }, status_code=202)
+    print(f"导入任务 {job.id} 已登记，重定向到首页...")
+    return RedirectResponse(url=f"/?import_job={job.id}", status_code=303)
 
-    print(f"\n上传处理完成，重定向到首页...")
-    return RedirectResponse(url="/", status_code=303)
+@app.post("/upload")
+def upload_excel(request: Request, file: UploadFile = File(...), password: str = Form(...), db: Session = Depends(get_db)):
+    """
+    处理 Excel 文件上传。
+    只保存上传文件并登记后台导入任务，立即返回任务ID，不在请求中执行导入；
+    导入进度和结果通过 /api/import-jobs/{job_id} 查询。
+    """
+    return _submit_import_upload(request, file, password, db)
+
+@app.post("/upload-bulk")
+def upload_excel_bulk(request: Request, file: UploadFile = File(...), password: str = Form(...), db: Session = Depends(get_db)):
+    """
+    批量导入：上传包含多个局站设备表的zip压缩包
+    工作簿在进程池中并行解析，再依次写入数据库；任务结果中 files 为每个文件的导入报告
+    """
+    return _submit_import_upload(request, file, password, db, bulk=True)
+
+@app.get("/api/import-jobs/{job_id}")
+def get_import_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    查询Excel导入任务的状态和进度
+    返回任务状态、当前阶段、已处理行数、跳过行数、耗时和吞吐量（行/秒）；
+    任务结束后 result 中包含 skipped_rows（设备表跳过的行）和 sheet2_skipped_rows（连接表跳过的行）等导入结果
+    """
+    job_status = import_jobs.get_job_status(db, job_id)
+    if job_status is None:
+        raise HTTPException(status_code=404, detail="导入任务不存在")
+    return JSONResponse(content={"success": True, "job": job_status})
 
 # 更新设备信息
 @app.post("/devices/{device_id}")
-async def update_device(
+def update_device(
     device_id: int,
     asset_id: str = Form(...),
     name: str = Form(...),
@@ -1920,8 +1197,10 @@ async def update_device(
         device.vendor = vendor if vendor else None
         device.commission_date = commission_date if commission_date else None
         device.remark = remark if remark else None
+        lifecycle.fill_commission_date(device)
         
         db.commit()
+        _on_devices_changed(device)
         
         success_message = f"设备 {name} 更新成功。"
         return RedirectResponse(url=f"/?success={quote(success_message)}", status_code=303)
@@ -1933,7 +1212,7 @@ async def update_device(
 
 # 编辑设备页面
 @app.get("/edit/{device_id}")
-async def edit_device_page(device_id: int, password: str, request: Request, db: Session = Depends(get_db)):
+def edit_device_page(device_id: int, password: str, request: Request, db: Session = Depends(get_db)):
     """显示编辑设备页面"""
     # 验证管理员密码
     if not verify_admin_password(password):
@@ -1955,11 +1234,19 @@ async def edit_device_page(device_id: int, password: str, request: Request, db:
 @app.delete("/devices/{device_id}")
 async def delete_device(device_id: int, request: Request, db: Session = Depends(get_db)):
     """删除设备"""
+    # 获取请求体中的密码（异步读取），数据库操作交给线程池执行
     try:
-        # 获取请求体中的密码
         body = await request.json()
-        password = body.get("password")
-        
+    except ValueError:  # 包括 json.JSONDecodeError 和非 UTF-8 请求体
+        body = None
+    if not isinstance(body, dict):
+        raise HTTPException(status_code=400, detail="请求体格式错误，应为包含 password 的JSON对象。")
+    return await run_in_threadpool(_delete_device, device_id, body.get("password"), db)
+
+
+def _delete_device(device_id: int, password: Optional[str], db: Session) -> dict:
+    """删除设备的同步实现，在线程池中运行"""
+    try:
         # 验证管理员密码
         if not verify_admin_password(password):
             raise HTTPException(status_code=403, detail="密码错误，无权限执行此操作。")
@@ -1980,6 +1267,8 @@ async def delete_device(device_id: int, request: Request, db: Session = Depends(
         # 删除设备
         db.delete(device)
         db.commit()
+        _on_devices_changed(deleted_device_id=device_id)
+        _on_connections_changed()
         
         return {"message": f"设备 {device_name} 删除成功。"}
         
@@ -1990,7 +1279,7 @@ async def delete_device(device_id: int, request: Request, db: Session = Depends(
         raise HTTPException(status_code=500, detail=f"删除设备失败：{str(e)}")
 
 @app.post("/devices")
-async def create_device(
+def create_device(
     asset_id: str = Form(...),
     name: str = Form(...),
     station: str = Form(...),
@@ -2028,12 +1317,14 @@ async def create_device(
         commission_date=commission_date,
         remark=remark
     )
+    lifecycle.fill_commission_date(new_device)
     db.add(new_device)
     db.commit()
+    _on_devices_changed(new_device)
     return RedirectResponse(url="/", status_code=303)
 
 @app.get("/graph_data/{device_id}")
-async def get_graph_data(
+def get_graph_data(
     device_id: int, 
     level: str = Query("device", regex="^(device|port)$", description="显示级别：device=设备级，port=端口级"),
     station: Optional[str] = Query(None, description="按站点筛选"),
@@ -2042,21 +1333,23 @@ async def get_graph_data(
     show_critical_only: bool = Query(False, description="仅显示关键设备"),
     db: Session = Depends(get_db)
 ):
-    """获取拓扑图数据，支持多种筛选条件"""
+    """获取拓扑图数据，支持多种筛选条件（基于内存拓扑索引遍历）"""
     nodes = []
     edges = []
     processed_ids = set()
+    node_device_ids = []  # 设备级显示时需要生成节点的设备ID，按遍历顺序
 
     # 查找起始设备
-    device = db.query(Device).filter(Device.id == device_id).first()
+    index = get_topology_index(db)
+    device = index.devices.get(device_id)
     if not device:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    queue = [device]
+    queue = deque([device])
     visited_ids = {device.id}
 
     while queue:
-        current_device = queue.pop(0)
+        current_device = queue.popleft()
 
         # 应用设备筛选条件
         if not _should_include_device(current_device, station, device_type, show_critical_only):
@@ -2066,31 +1359,20 @@ async def get_graph_data(
             # 根据显示级别构建节点数据
             if level == "port":
                 # 端口级显示：为每个设备的端口创建节点
-                port_nodes = _create_port_nodes(current_device, db)
+                port_nodes = _create_port_nodes(current_device, index)
                 nodes.extend(port_nodes)
             else:
-                # 设备级显示：为设备创建节点
-                # 计算设备生命周期状态
-                lifecycle_status = _get_device_lifecycle_status(current_device, db)
-                
-                node_data = {
-                    "id": current_device.id,
-                    "label": current_device.name,
-                    "title": f"""资产编号: {current_device.asset_id}\n名称: {current_device.name}\n设备类型: {current_device.device_type or 'N/A'}\n站点: {current_device.station or 'N/A'}\n型号: {current_device.model or 'N/A'}\n位置: {current_device.location or 'N/A'}\n额定容量: {current_device.power_rating or 'N/A'}\n生产厂家: {current_device.vendor or 'N/A'}\n投产时间: {current_device.commission_date or 'N/A'}\n生命周期状态: {lifecycle_status}""",
-                    "level": 0,
-                    "device_type": current_device.device_type,
-                    "station": current_device.station
-                }
-                nodes.append(node_data)
+                # 设备级显示：节点详情在遍历结束后批量加载设备再生成
+                node_device_ids.append(current_device.id)
             processed_ids.add(current_device.id)
 
         # 向上游查找连接
-        for conn in current_device.target_connections:
+        for conn in index.incoming(current_device.id):
             # 应用连接筛选条件
             if not _should_include_connection(conn, connection_type):
                 continue
                 
-            source_device = conn.source_device
+            source_device = index.devices.get(conn.source_device_id)
             if source_device and source_device.id not in visited_ids:
                 # 检查源设备是否符合筛选条件
                 if _should_include_device(source_device, station, device_type, show_critical_only):
@@ -2113,12 +1395,12 @@ async def get_graph_data(
                     queue.append(source_device)
 
         # 向下游查找连接
-        for conn in current_device.source_connections:
+        for conn in index.outgoing(current_device.id):
             # 应用连接筛选条件
             if not _should_include_connection(conn, connection_type):
                 continue
                 
-            target_device = conn.target_device
+            target_device = index.devices.get(conn.target_device_id)
             if target_device and target_device.id not in visited_ids:
                 # 检查目标设备是否符合筛选条件
                 if _should_include_device(target_device, station, device_type, show_critical_only):
@@ -2139,87 +1421,34 @@ async def get_graph_data(
                         edges.append(edge_data)
                     visited_ids.add(target_device.id)
                     queue.append(target_device)
+
+    # 设备级显示：一次批量加载遍历到的设备，生成节点数据
+    devices_by_id = _load_devices_by_ids(db, node_device_ids)
+    node_devices = [devices_by_id[node_device_id] for node_device_id in node_device_ids if node_device_id in devices_by_id]
+    # 批量计算设备生命周期状态
+    lifecycle_texts = lifecycle.evaluate_devices(node_devices, lifecycle.get_active_rules(db))["lifecycle_status_text"]
+    for current_device, lifecycle_status in zip(node_devices, lifecycle_texts):
+        node_data = {
+            "id": current_device.id,
+            "label": current_device.name,
+            "title": f"""资产编号: {current_device.asset_id}\n名称: {current_device.name}\n设备类型: {current_device.device_type or 'N/A'}\n站点: {current_device.station or 'N/A'}\n型号: {current_device.model or 'N/A'}\n位置: {current_device.location or 'N/A'}\n额定容量: {current_device.power_rating or 'N/A'}\n生产厂家: {current_device.vendor or 'N/A'}\n投产时间: {current_device.commission_date or 'N/A'}\n生命周期状态: {lifecycle_status}""",
+            "level": 0,
+            "device_type": current_device.device_type,
+            "station": current_device.station
+        }
+        nodes.append(node_data)
                 
     return JSONResponse(content={"nodes": nodes, "edges": edges, "level": level})
 
 
-def _get_device_lifecycle_status(device: Device, db: Session) -> str:
-    """计算设备的生命周期状态 - 复用已有的完整实现逻辑"""
-    try:
-        from datetime import datetime
-        import re
-        
-        # 查找对应的生命周期规则
-        rule = db.query(LifecycleRule).filter(
-            LifecycleRule.device_type == device.device_type,
-            LifecycleRule.is_active == "true"
-        ).first()
-        
-        if not rule:
-            return "未配置规则"
-        
-        # 解析投产日期
-        if not device.commission_date:
-            return "投产日期未填写"
-        
-        commission_date = None
-        date_str = device.commission_date.strip()
-        current_date = datetime.now()
-        
-        # 处理特殊格式：YYYYMM (如 202312)
-        if re.match(r'^\d{6}$', date_str):
-            try:
-                year = int(date_str[:4])
-                month = int(date_str[4:6])
-                commission_date = datetime(year, month, 1)
-            except ValueError:
-                pass
-        
-        # 如果特殊格式解析失败，尝试标准格式
-        if not commission_date:
-            date_formats = [
-                "%Y-%m-%d",
-                "%Y/%m/%d", 
-                "%Y.%m.%d",
-                "%Y-%m",
-                "%Y/%m",
-                "%Y.%m",
-                "%Y"
-            ]
-            
-            for fmt in date_formats:
-                try:
-                    if fmt == "%Y":
-                        # 只有年份的情况，默认为该年的1月1日
-                        commission_date = datetime.strptime(device.commission_date, fmt).replace(month=1, day=1)
-                    elif fmt in ["%Y-%m", "%Y/%m", "%Y.%m"]:
-                        # 只有年月的情况，默认为该月的1日
-                        commission_date = datetime.strptime(device.commission_date, fmt).replace(day=1)
-                    else:
-                        commission_date = datetime.strptime(device.commission_date, fmt)
-                    break
-                except ValueError:
-                    continue
-        
-        if not commission_date:
-            return "投产日期格式无法识别"
-        
-        # 计算服役时间和剩余时间
-        days_in_service = (current_date - commission_date).days
-        lifecycle_days = rule.lifecycle_years * 365
-        remaining_days = lifecycle_days - days_in_service
-        warning_days = rule.warning_months * 30
-        
-        # 确定生命周期状态
-        if remaining_days < 0:
-            return f"已超期 {abs(remaining_days)} 天"
-        elif remaining_days <= warning_days:
-            return f"临近超限，剩余 {remaining_days} 天"
-        else:
-            return f"正常，剩余 {remaining_days} 天"
-            
-    except Exception as e:
-        return "计算错误"
+def _load_devices_by_ids(db: Session, device_ids: list) -> dict:
+    """按ID批量加载设备，分批查询以避免超过SQLite的参数个数上限"""
+    devices_by_id = {}
+    for start in range(0, len(device_ids), 500):
+        chunk = device_ids[start:start + 500]
+        for device in db.query(Device).filter(Device.id.in_(chunk)).all():
+            devices_by_id[device.id] = device
+    return devices_by_id
 
 
 def _should_include_device(device: Device, station: Optional[str], device_type: Optional[str], show_critical_only: bool) -> bool:
@@ -2255,17 +1484,13 @@ def _should_include_connection(connection: Connection, connection_type: Optional
     return True
 
 
-def _create_port_nodes(device: Device, db: Session) -> list:
-    """为设备创建端口级节点"""
+def _create_port_nodes(device, index: TopologyIndex) -> list:
+    """为设备创建端口级节点（端口信息取自内存拓扑索引）"""
     port_nodes = []
     
     # 获取设备的所有连接，提取端口信息
-    connections = db.query(Connection).filter(
-        or_(Connection.source_device_id == device.id, Connection.target_device_id == device.id)
-    ).all()
-    
     ports = set()
-    for conn in connections:
+    for conn in index.device_connections(device.id):
         if conn.source_device_id == device.id:
             if conn.source_fuse_number:
                 ports.add(f"fuse_{conn.source_fuse_number}")
@@ -2345,7 +1570,7 @@ def _create_port_edges(connection: Connection, direction: str) -> list:
 
 # 新增API路径：/api/power-chain/{device_id} - 与/graph_data/{device_id}功能相同，保持向后兼容
 @app.get("/api/power-chain/{device_id}")
-async def get_power_chain_data(device_id: int, db: Session = Depends(get_db)):
+def get_power_chain_data(device_id: int, db: Session = Depends(get_db)):
     """获取设备电力链路拓扑图数据 - 新的API路径
     
     Args:
@@ -2357,69 +1582,77 @@ async def get_power_chain_data(device_id: int, db: Session = Depends(get_db)):
     """
     nodes = []
     edges = []
-    processed_ids = set()
+    processed_ids = []
 
-    device = db.query(Device).filter(Device.id == device_id).first()
-    if not device:
+    index = get_topology_index(db)
+    if device_id not in index.devices:
         raise HTTPException(status_code=404, detail="Device not found")
 
-    queue = [device]
-    visited_ids = {device.id}
+    queue = deque([device_id])
+    visited_ids = {device_id}
 
     while queue:
-        current_device = queue.pop(0)
+        current_id = queue.popleft()
+        processed_ids.append(current_id)
 
-        if current_device.id not in processed_ids:
-            # 在悬浮提示中也加入资产编号
-            nodes.append({
-                "id": current_device.id,
-                "label": current_device.name,
-                "title": f"""<b>资产编号:</b> {current_device.asset_id}<br>
+        # 向上游查找
+        for conn in index.incoming(current_id):
+            source_id = conn.source_device_id
+            if source_id in index.devices and source_id not in visited_ids:
+                edges.append({"from": source_id, "to": current_id, "arrows": "to", "label": conn.cable_type or ""})
+                visited_ids.add(source_id)
+                queue.append(source_id)
+
+        # 向下游查找
+        for conn in index.outgoing(current_id):
+            target_id = conn.target_device_id
+            if target_id in index.devices and target_id not in visited_ids:
+                edges.append({"from": current_id, "to": target_id, "arrows": "to", "label": conn.cable_type or ""})
+                visited_ids.add(target_id)
+                queue.append(target_id)
+
+    # 一次批量加载遍历到的设备，生成节点数据
+    devices_by_id = _load_devices_by_ids(db, processed_ids)
+    for current_id in processed_ids:
+        current_device = devices_by_id.get(current_id)
+        if not current_device:
+            continue
+        # 在悬浮提示中也加入资产编号
+        nodes.append({
+            "id": current_device.id,
+            "label": current_device.name,
+            "title": f"""<b>资产编号:</b> {current_device.asset_id}<br>
                              <b>名称:</b> {current_device.name}<br>
                              <b>型号:</b> {current_device.model or 'N/A'}<br>
                              <b>位置:</b> {current_device.location or 'N/A'}<br>
                              <b>功率:</b> {current_device.power_rating or 'N/A'}""",
-                "level": 0 
-            })
-            processed_ids.add(current_device.id)
-
-        # 向上游查找
-        for conn in current_device.target_connections:
-            source_device = conn.source_device
-            if source_device and source_device.id not in visited_ids:
-                edges.append({"from": source_device.id, "to": current_device.id, "arrows": "to", "label": conn.cable_type or ""})
-                visited_ids.add(source_device.id)
-                queue.append(source_device)
-
-        # 向下游查找
-        for conn in current_device.source_connections:
-            target_device = conn.target_device
-            if target_device and target_device.id not in visited_ids:
-                edges.append({"from": current_device.id, "to": target_device.id, "arrows": "to", "label": conn.cable_type or ""})
-                visited_ids.add(target_device.id)
-                queue.append(target_device)
+            "level": 0 
+        })
                 
     return JSONResponse(content={"nodes": nodes, "edges": edges})
 
 
 @app.get("/graph", response_class=HTMLResponse)
-async def get_topology_graph_page(request: Request, db: Session = Depends(get_db)):
-    """拓扑图页面 - 显示所有设备供用户选择"""
-    devices = db.query(Device).all()
-    return templates.TemplateResponse("graph.html", {"request": request, "devices": devices})
+def get_topology_graph_page(request: Request):
+    """拓扑图页面 - 设备通过输入框联想选择（/api/devices/suggest），不再渲染全部设备"""
+    return templates.TemplateResponse("graph.html", {"request": request})
 
 
 @app.get("/graph/{device_id}", response_class=HTMLResponse)
-async def get_power_chain_graph(request: Request, device_id: int, db: Session = Depends(get_db)):
+def get_power_chain_graph(request: Request, device_id: int, db: Session = Depends(get_db)):
     """特定设备的拓扑图页面 - 兼容旧版本URL"""
-    devices = db.query(Device).all()
-    return templates.TemplateResponse("graph.html", {"request": request, "devices": devices, "selected_device_id": device_id})
+    selected_device = db.query(Device.id, Device.name).filter(Device.id == device_id).first()
+    return templates.TemplateResponse("graph.html", {
+        "request": request,
+        "selected_device_id": device_id,
+        "selected_device_name": selected_device.name if selected_device else ""
+    })
 
 
 # --- 设备生命周期规则管理 API ---
 
 @app.get("/api/lifecycle-rules")
-async def get_lifecycle_rules(db: Session = Depends(get_db)):
+def get_lifecycle_rules(db: Session = Depends(get_db)):
     """
     获取所有生命周期规则
     """
@@ -2444,7 +1677,7 @@ async def get_lifecycle_rules(db: Session = Depends(get_db)):
 
 
 @app.post("/api/lifecycle-rules")
-async def create_lifecycle_rule(
+def create_lifecycle_rule(
     device_type: str = Form(...),
     lifecycle_years: int = Form(...),
     warning_months: int = Form(6),
@@ -2484,6 +1717,7 @@ async def create_lifecycle_rule(
         
         db.add(new_rule)
         db.commit()
+        _on_lifecycle_rules_changed()
         db.refresh(new_rule)
         
         return JSONResponse(content={
@@ -2504,7 +1738,7 @@ async def create_lifecycle_rule(
 
 
 @app.put("/api/lifecycle-rules/{rule_id}")
-async def update_lifecycle_rule(
+def update_lifecycle_rule(
     rule_id: int,
     device_type: str = Form(...),
     lifecycle_years: int = Form(...),
@@ -2548,6 +1782,7 @@ async def update_lifecycle_rule(
         rule.updated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         db.commit()
+        _on_lifecycle_rules_changed()
         
         return JSONResponse(content={
             "success": True,
@@ -2561,7 +1796,7 @@ async def update_lifecycle_rule(
 
 
 @app.delete("/api/lifecycle-rules/{rule_id}")
-async def delete_lifecycle_rule(rule_id: int, password: str = Form(...), db: Session = Depends(get_db)):
+def delete_lifecycle_rule(rule_id: int, password: str = Form(...), db: Session = Depends(get_db)):
     """
     删除生命周期规则
     """
@@ -2576,6 +1811,7 @@ async def delete_lifecycle_rule(rule_id: int, password: str = Form(...), db: Ses
         
         db.delete(rule)
         db.commit()
+        _on_lifecycle_rules_changed()
         
         return JSONResponse(content={
             "success": True,
@@ -2588,29 +1824,68 @@ async def delete_lifecycle_rule(rule_id: int, password: str = Form(...), db: Ses
         return JSONResponse(content={"success": False, "message": str(e)}, status_code=500)
 
 
+# /api/devices 支持的排序方式 -> 排序列（最后一列为 id，保证排序唯一）
+DEVICE_SORT_COLUMNS = {
+    "id": [Device.id],
+    "asset_id": [Device.asset_id, Device.id],
+    "name": [Device.name, Device.id],
+    "station": [Device.station, Device.id],
+}
+
+
 @app.get("/api/devices")
-async def get_devices_api(
-    page: int = Query(1, ge=1, description="页码"),
+def get_devices_api(
+    page: int = Query(1, ge=1, description="页码（按页码翻页，深页较慢，建议使用 cursor）"),
     page_size: int = Query(50, ge=1, le=200, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，传入时忽略 page"),
+    sort: str = Query("id", pattern="^(id|asset_id|name|station)$", description="排序字段"),
+    include_total: bool = Query(True, description="是否返回总数（总数有缓存）"),
+    station: str = Query("", description="局站（精确匹配）"),
+    name: str = Query("", description="设备名称（模糊匹配）"),
+    device_type: str = Query("", description="设备类型（精确匹配）"),
+    vendor: str = Query("", description="生产厂家（模糊匹配）"),
+    lifecycle_status: str = Query("", pattern="^(|normal|warning|expired|unknown)$", description="生命周期状态"),
     db: Session = Depends(get_db)
 ):
     """
-    获取设备列表API接口
+    获取设备列表API接口（首页设备列表的数据来源）
+    使用游标分页：第一页不传 cursor，之后传入上一页返回的 pagination.next_cursor，
+    next_cursor 为 null 表示没有下一页；仍兼容按 page 翻页
+    筛选条件与首页、导出一致（filter_devices_query），每行附带生命周期状态
     """
     try:
         # 构建查询
-        query = db.query(Device)
+        query = filter_devices_query(
+            db.query(Device), db,
+            station=station, name=name, device_type=device_type, vendor=vendor, lifecycle_status=lifecycle_status
+        )
+        sort_columns = DEVICE_SORT_COLUMNS[sort]
         
-        # 计算总数
-        total = query.count()
+        # 计算总数（按筛选条件缓存）
+        filters = (station, name, device_type, vendor, lifecycle_status)
+        total = pagination.cached_total(pagination.SCOPE_DEVICES, filters, query.count) if include_total else None
         
         # 应用分页
-        offset = (page - 1) * page_size
-        devices = query.offset(offset).limit(page_size).all()
-        
-        # 构建响应数据
+        if cursor or page == 1:
+            try:
+                devices, next_cursor = pagination.keyset_page(query, sort, sort_columns, cursor, page_size)
+            except pagination.InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        else:
+            offset = (page - 1) * page_size
+            devices = query.order_by(*sort_columns).offset(offset).limit(page_size + 1).all()
+            next_cursor = None
+            if len(devices) > page_size:
+                devices = devices[:page_size]
+                last = devices[-1]
+                next_cursor = pagination.encode_cursor(sort, [getattr(last, column.key) for column in sort_columns])
+        
+        # 构建响应数据（本页设备的生命周期状态按缓存的规则批量计算）
+        statuses = lifecycle.evaluate_devices(devices, lifecycle.get_active_rules(db))
         result = []
-        for device in devices:
+        for device, status, status_text in zip(
+            devices, statuses["lifecycle_status"], statuses["lifecycle_status_text"]
+        ):
             result.append({
                 "id": device.id,
                 "asset_id": device.asset_id,
@@ -2622,20 +1897,26 @@ async def get_devices_api(
                 "power_rating": device.power_rating,
                 "vendor": device.vendor,
                 "commission_date": device.commission_date.isoformat() if device.commission_date and hasattr(device.commission_date, 'isoformat') else device.commission_date,
-                "remark": device.remark
+                "remark": device.remark,
+                "lifecycle_status": status,
+                "lifecycle_status_text": status_text
             })
         
         return JSONResponse(content={
             "success": True,
             "data": result,
             "pagination": {
-                "page": page,
+                "page": None if cursor else page,
                 "page_size": page_size,
                 "total": total,
-                "total_pages": (total + page_size - 1) // page_size
+                "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
             }
         })
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"获取设备列表失败: {e}")
         traceback.print_exc()
@@ -2643,7 +1924,7 @@ async def get_devices_api(
 
 
 @app.get("/api/topology/filter-options")
-async def get_filter_options(db: Session = Depends(get_db)):
+def get_filter_options(db: Session = Depends(get_db)):
     """
     获取拓扑图筛选选项
     返回设备类型、连接类型、局站等筛选选项
@@ -2674,8 +1955,82 @@ async def get_filter_options(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"获取筛选选项失败: {str(e)}")
 
 
+@app.get("/api/devices/lookup")
+def get_device_lookup(request: Request, db: Session = Depends(get_db)):
+    """
+    设备查找表：一次返回全部设备的 id / name / asset_id / station（按列组织，gzip压缩）
+    带 ETag，客户端用 If-None-Match 重新验证，设备未变化时返回 304
+    """
+    try:
+        lookup = device_lookup.get_device_lookup(db)
+        headers = {
+            "ETag": lookup.etag,
+            # 每次使用前都向服务器重新验证，设备变化后立即生效
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        
+        if_none_match = request.headers.get("if-none-match", "")
+        client_etags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        if lookup.etag in client_etags or "*" in client_etags:
+            return Response(status_code=304, headers=headers)
+        
+        if "gzip" in request.headers.get("accept-encoding", "").lower():
+            headers["Content-Encoding"] = "gzip"
+            return Response(content=lookup.gzip_body, media_type="application/json", headers=headers)
+        return Response(content=lookup.body, media_type="application/json", headers=headers)
+        
+    except Exception as e:
+        print(f"获取设备查找表失败: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"获取设备查找表失败: {str(e)}")
+
+
+@app.get("/api/devices/suggest")
+def suggest_devices(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(device_suggest.DEFAULT_LIMIT, ge=1, le=device_suggest.MAX_LIMIT),
+    db: Session = Depends(get_db)
+):
+    """
+    设备联想：按设备名称、资产编号、名称分段或拼音首字母的前缀返回最匹配的设备（不区分大小写）
+    供设备输入框的输入提示使用
+    """
+    try:
+        suggestions = device_suggest.suggest_devices(db, q, limit)
+        return JSONResponse(content={"success": True, "query": q, "count": len(suggestions), "data": suggestions})
+        
+    except Exception as e:
+        print(f"设备联想失败: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"设备联想失败: {str(e)}")
+
+
+@app.get("/api/search")
+def search_assets(
+    q: str = Query(..., min_length=1, max_length=100),
+    type: str = Query("all", pattern="^(all|device|connection)$"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    全文检索设备和连接，按相关度排序
+    设备检索名称、资产编号、局站、厂家、型号、位置、备注；连接检索备注、电缆型号和各端规格
+    多个词用空格分隔，需要同时匹配；少于3个字符的词按 LIKE 匹配
+    """
+    try:
+        kinds = (search_index.HIT_DEVICE, search_index.HIT_CONNECTION) if type == "all" else (type,)
+        hits = search_index.search(db, q, limit=limit, kinds=kinds)
+        return JSONResponse(content={"success": True, "query": q, "count": len(hits), "data": hits})
+        
+    except Exception as e:
+        print(f"全文检索失败: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"全文检索失败: {str(e)}")
+
+
 @app.get("/api/devices/lifecycle-status")
-async def get_devices_lifecycle_status(
+def get_devices_lifecycle_status(
     status_filter: Optional[str] = None,  # normal, warning, expired, all
     db: Session = Depends(get_db)
 ):
@@ -2684,135 +2039,24 @@ async def get_devices_lifecycle_status(
     status_filter: normal(正常), warning(临近超限), expired(已超期), all(全部)
     """
     try:
-        from datetime import datetime, timedelta
-        import re
+        rules = lifecycle.get_active_rules(db)
+        query = db.query(
+            Device.id, Device.asset_id, Device.name, Device.station, Device.model,
+            Device.vendor, Device.commission_date, Device.device_type,
+            Device.commission_date_parsed, Device.commission_date_quality
+        )
+        # 按状态筛选时在数据库中按投产日期范围过滤
+        if status_filter and status_filter != "all":
+            query = query.filter(lifecycle.status_clause(status_filter, rules))
+        # 按投产日期范围过滤时 SQLite 会按 (设备类型, 投产日期) 索引返回，显式按ID排序保持输出顺序稳定
+        devices = query.order_by(Device.id).all()
         
-        # 获取所有设备和规则
-        devices = db.query(Device).all()
-        rules = {rule.device_type: rule for rule in db.query(LifecycleRule).filter(LifecycleRule.is_active == "true").all()}
+        # 按缓存的规则批量计算生命周期状态
+        statuses = lifecycle.evaluate_devices(devices, rules)
         
         result_devices = []
-        current_date = datetime.now()
-        
-        for device in devices:
-            # 查找对应的生命周期规则
-            rule = rules.get(device.device_type)
-            if not rule:
-                # 没有规则的设备标记为未知状态
-                device_info = {
-                    "id": device.id,
-                    "asset_id": device.asset_id,
-                    "name": device.name,
-                    "station": device.station,
-                    "model": device.model,
-                    "vendor": device.vendor,
-                    "commission_date": device.commission_date,
-                    "lifecycle_status": "unknown",
-                    "lifecycle_status_text": "未配置规则",
-                    "days_in_service": None,
-                    "remaining_days": None,
-                    "rule_years": None
-                }
-                if not status_filter or status_filter == "all":
-                    result_devices.append(device_info)
-                continue
-            
-            # 解析投产日期
-            if not device.commission_date:
-                device_info = {
-                    "id": device.id,
-                    "asset_id": device.asset_id,
-                    "name": device.name,
-                    "station": device.station,
-                    "model": device.model,
-                    "vendor": device.vendor,
-                    "commission_date": device.commission_date,
-                    "lifecycle_status": "unknown",
-                    "lifecycle_status_text": "投产日期未填写",
-                    "days_in_service": None,
-                    "remaining_days": None,
-                    "rule_years": rule.lifecycle_years
-                }
-                if not status_filter or status_filter == "all":
-                    result_devices.append(device_info)
-                continue
-            
-            # 尝试解析多种日期格式
-            commission_date = None
-            date_str = device.commission_date.strip()
-            
-            # 处理特殊格式：YYYYMM (如 202312)
-            if re.match(r'^\d{6}$', date_str):
-                try:
-                    year = int(date_str[:4])
-                    month = int(date_str[4:6])
-                    commission_date = datetime(year, month, 1)
-                except ValueError:
-                    pass
-            
-            # 如果特殊格式解析失败，尝试标准格式
-            if not commission_date:
-                date_formats = [
-                    "%Y-%m-%d",
-                    "%Y/%m/%d", 
-                    "%Y.%m.%d",
-                    "%Y-%m",
-                    "%Y/%m",
-                    "%Y.%m",
-                    "%Y"
-                ]
-                
-                for fmt in date_formats:
-                    try:
-                        if fmt == "%Y":
-                            # 只有年份的情况，默认为该年的1月1日
-                            commission_date = datetime.strptime(device.commission_date, fmt).replace(month=1, day=1)
-                        elif fmt in ["%Y-%m", "%Y/%m", "%Y.%m"]:
-                            # 只有年月的情况，默认为该月的1日
-                            commission_date = datetime.strptime(device.commission_date, fmt).replace(day=1)
-                        else:
-                            commission_date = datetime.strptime(device.commission_date, fmt)
-                        break
-                    except ValueError:
-                        continue
-            
-            if not commission_date:
-                device_info = {
-                    "id": device.id,
-                    "asset_id": device.asset_id,
-                    "name": device.name,
-                    "station": device.station,
-                    "model": device.model,
-                    "vendor": device.vendor,
-                    "commission_date": device.commission_date,
-                    "lifecycle_status": "unknown",
-                    "lifecycle_status_text": "投产日期格式无法识别",
-                    "days_in_service": None,
-                    "remaining_days": None,
-                    "rule_years": rule.lifecycle_years
-                }
-                if not status_filter or status_filter == "all":
-                    result_devices.append(device_info)
-                continue
-            
-            # 计算服役时间和剩余时间
-            days_in_service = (current_date - commission_date).days
-            lifecycle_days = rule.lifecycle_years * 365
-            remaining_days = lifecycle_days - days_in_service
-            warning_days = rule.warning_months * 30
-            
-            # 确定生命周期状态
-            if remaining_days < 0:
-                lifecycle_status = "expired"
-                lifecycle_status_text = f"已超期 {abs(remaining_days)} 天"
-            elif remaining_days <= warning_days:
-                lifecycle_status = "warning"
-                lifecycle_status_text = f"临近超限，剩余 {remaining_days} 天"
-            else:
-                lifecycle_status = "normal"
-                lifecycle_status_text = f"正常，剩余 {remaining_days} 天"
-            
-            device_info = {
+        for device, status in zip(devices, statuses.itertuples(index=False)):
+            result_devices.append({
                 "id": device.id,
                 "asset_id": device.asset_id,
                 "name": device.name,
@@ -2820,16 +2064,12 @@ async def get_devices_lifecycle_status(
                 "model": device.model,
                 "vendor": device.vendor,
                 "commission_date": device.commission_date,
-                "lifecycle_status": lifecycle_status,
-                "lifecycle_status_text": lifecycle_status_text,
-                "days_in_service": days_in_service,
-                "remaining_days": remaining_days,
-                "rule_years": rule.lifecycle_years
-            }
-            
-            # 根据筛选条件添加设备
-            if not status_filter or status_filter == "all" or status_filter == lifecycle_status:
-                result_devices.append(device_info)
+                "lifecycle_status": status.lifecycle_status,
+                "lifecycle_status_text": status.lifecycle_status_text,
+                "days_in_service": status.days_in_service,
+                "remaining_days": status.remaining_days,
+                "rule_years": status.rule_years
+            })
         
         # 统计信息
         total_count = len(result_devices)
@@ -2958,8 +2198,31 @@ async def analytics_page(request: Request):
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+def filter_devices_query(query, db: Session, station: str = "", name: str = "", device_type: str = "",
+                         vendor: str = "", lifecycle_status: str = ""):
+    """
+    设备列表筛选条件，与首页的筛选口径一致：
+    - 局站、设备类型来自下拉列表，按精确值匹配，可以使用 station / device_type 索引；
+    - 设备名称、生产厂家是输入框，按包含关系模糊匹配（不区分大小写），3个字符以上时使用全文检索索引；
+    - 生命周期状态（normal / warning / expired / unknown）由 lifecycle.status_clause 转换为
+      按设备类型 + 投产日期范围的条件，使用 ix_devices_type_commission_date 索引，
+      结果与 evaluate_lifecycle() 计算的状态一致
+    """
+    if station:
+        query = query.filter(Device.station == station)
+    if device_type:
+        query = query.filter(Device.device_type == device_type)
+    if name:
+        query = query.filter(search_index.text_match_clause(Device, "name", name))
+    if vendor:
+        query = query.filter(search_index.text_match_clause(Device, "vendor", vendor))
+    if lifecycle_status:
+        query = query.filter(lifecycle.status_clause(lifecycle_status, lifecycle.get_active_rules(db)))
+    return query
+
+
 @app.post("/api/export")
-async def export_devices(
+def export_devices(
     password: str = Form(...),
     export_range: str = Form("all"),
     station_filter: str = Form(""),
@@ -2967,112 +2230,49 @@ async def export_devices(
     device_type_filter: str = Form(""),
     vendor_filter: str = Form(""),
     lifecycle_filter: str = Form(""),
+    export_format: str = Form(device_export.FORMAT_XLSX, alias="format"),
     db: Session = Depends(get_db)
 ):
     """
     导出设备数据为Excel文件
     支持全量导出和筛选导出，需要管理员密码验证
+    format=csv|ndjson|parquet 时导出设备表全部字段的原始数据（供下游工具使用）
     """
     try:
         # 验证管理员密码
         if not verify_admin_password(password):
             raise HTTPException(status_code=401, detail="密码错误，无权限导出数据")
         
+        try:
+            device_export.check_export_format(export_format)
+        except device_export.ExportFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
         # 根据导出范围查询设备数据
         query = db.query(Device)
         
-        # 如果是筛选导出，应用筛选条件
+        # 如果是筛选导出，应用筛选条件（与首页筛选口径一致，整个筛选在一次查询中完成）
         if export_range == "filtered":
-            if station_filter:
-                query = query.filter(Device.station.ilike(f"%{station_filter}%"))
-            if name_filter:
-                query = query.filter(Device.name.ilike(f"%{name_filter}%"))
-            if device_type_filter:
-                query = query.filter(Device.device_type.ilike(f"%{device_type_filter}%"))
-            if vendor_filter:
-                query = query.filter(Device.vendor.ilike(f"%{vendor_filter}%"))
-            if lifecycle_filter:
-                # 这里需要根据生命周期状态筛选，暂时跳过复杂的生命周期逻辑
-                pass
-        
-        devices = query.all()
-        
-        if not devices:
-            raise HTTPException(status_code=404, detail="没有找到设备数据")
-        
-        # 创建Excel工作簿
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "设备列表"
+            query = filter_devices_query(
+                query, db,
+                station=station_filter,
+                name=name_filter,
+                device_type=device_type_filter,
+                vendor=vendor_filter,
+                lifecycle_status=lifecycle_filter,
+            )
         
-        # 定义表头
-        headers = [
-            "ID", "资产编号", "设备名称", "局站", "设备类型", "设备型号", 
-            "所在位置", "额定容量", "设备生产厂家", "投产日期", "备注"
-        ]
+        if export_format != device_export.FORMAT_XLSX:
+            if query.with_entities(Device.id).first() is None:
+                raise HTTPException(status_code=404, detail="没有找到设备数据")
+            range_name = "筛选导出" if export_range == "filtered" else "全量导出"
+            return _raw_export_response(Device, query, export_format, f"设备列表_{range_name}")
         
-        # 设置表头样式
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-        border = Border(
-            left=Side(style="thin"),
-            right=Side(style="thin"),
-            top=Side(style="thin"),
-            bottom=Side(style="thin")
-        )
+        # 流式生成行数据（按批读取设备，同一遍计算列宽），响应时边压缩边输出
+        export = device_export.export_devices_xlsx(db, query)
         
-        # 写入表头
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-            cell.border = border
-        
-        # 写入设备数据
-        for row, device in enumerate(devices, 2):
-            data = [
-                device.id,
-                device.asset_id,
-                device.name,
-                device.station,
-                device.device_type,
-                device.model,
-                device.location,
-                device.power_rating,
-                device.vendor,
-                device.commission_date.strftime("%Y-%m-%d") if device.commission_date else "",
-                device.remark
-            ]
-            
-            for col, value in enumerate(data, 1):
-                cell = ws.cell(row=row, column=col, value=value)
-                cell.border = border
-                cell.alignment = Alignment(horizontal="left", vertical="center")
-                
-                # 设置斑马纹效果
-                if row % 2 == 0:
-                    cell.fill = PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid")
-        
-        # 自动调整列宽
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)  # 限制最大宽度
-            ws.column_dimensions[column_letter].width = adjusted_width
-        
-        # 冻结首行
-        ws.freeze_panes = "A2"
-        
-        # 添加筛选器
-        ws.auto_filter.ref = f"A1:{chr(64 + len(headers))}1"
+        if export.row_count == 0:
+            raise HTTPException(status_code=404, detail="没有找到设备数据")
         
         # 生成文件名（包含时间戳）
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -3081,21 +2281,16 @@ async def export_devices(
         else:
             filename = f"设备列表_全量导出_{timestamp}.xlsx"
         
-        # 将Excel文件保存到内存
-        excel_buffer = io.BytesIO()
-        wb.save(excel_buffer)
-        excel_buffer.seek(0)
-        
         # 设置响应头
         headers = {
             "Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}",
-            "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            "Content-Type": device_export.XLSX_MEDIA_TYPE
         }
         
         # 返回文件流
         return StreamingResponse(
-            io.BytesIO(excel_buffer.read()),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            export.iter_bytes(),
+            media_type=device_export.XLSX_MEDIA_TYPE,
             headers=headers
         )
         
@@ -3107,6 +2302,42 @@ async def export_devices(
         raise HTTPException(status_code=500, detail=f"导出失败: {str(e)}")
 
 
+def _raw_export_response(model, query, export_format: str, filename_prefix: str) -> StreamingResponse:
+    """原始数据导出（csv / ndjson / parquet）的流式响应，文件名带时间戳"""
+    media_type, extension = device_export.RAW_FORMATS[export_format]
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"{filename_prefix}_{timestamp}{extension}"
+    return StreamingResponse(
+        device_export.iter_raw_export(model, query, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+    )
+
+
+@app.post("/api/export/connections")
+def export_connections(
+    password: str = Form(...),
+    export_format: str = Form(device_export.FORMAT_CSV, alias="format"),
+    db: Session = Depends(get_db)
+):
+    """
+    导出连接表全部字段的原始数据，format=csv|ndjson|parquet，需要管理员密码验证
+    """
+    if not verify_admin_password(password):
+        raise HTTPException(status_code=401, detail="密码错误，无权限导出数据")
+    
+    try:
+        device_export.check_export_format(export_format, allow_xlsx=False)
+    except device_export.ExportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    query = db.query(Connection)
+    if query.with_entities(Connection.id).first() is None:
+        raise HTTPException(status_code=404, detail="没有找到连接数据")
+    
+    return _raw_export_response(Connection, query, export_format, "连接列表_全量导出")
+
+
 # --- 连接管理 Pydantic 模型 ---
 
 class ConnectionCreate(BaseModel):
@@ -3260,7 +2491,7 @@ def get_connected_ports_count(db: Session) -> int:
 
 
 @app.get("/api/connections/statistics")
-async def get_connections_statistics(db: Session = Depends(get_db)):
+def get_connections_statistics(db: Session = Depends(get_db)):
     """
     获取连接统计信息
     """
@@ -3347,7 +2578,7 @@ async def get_connections_statistics(db: Session = Depends(get_db)):
 
 
 @app.get("/api/ports/statistics")
-async def get_port_statistics(db: Session = Depends(get_db)):
+def get_port_statistics(db: Session = Depends(get_db)):
     """
     获取端口统计信息
     """
@@ -3370,7 +2601,7 @@ async def get_port_statistics(db: Session = Depends(get_db)):
 
 
 @app.get("/api/devices/{device_id}/ports")
-async def get_device_port_details(device_id: int, db: Session = Depends(get_db)):
+def get_device_port_details(device_id: int, db: Session = Depends(get_db)):
     """
     获取指定设备的端口详情
     """
@@ -3395,7 +2626,7 @@ async def get_device_port_details(device_id: int, db: Session = Depends(get_db))
 # ==================== 统计分析API端点 ====================
 
 @app.get("/api/analytics/utilization-rates")
-async def get_utilization_rates(db: Session = Depends(get_db)):
+def get_utilization_rates(db: Session = Depends(get_db)):
     """
     获取使用率分析数据
     包括端口总体使用率、按设备类型统计、按站点统计等
@@ -3419,7 +2650,7 @@ async def get_utilization_rates(db: Session = Depends(get_db)):
 
 
 @app.get("/api/analytics/idle-rates")
-async def get_idle_rates(db: Session = Depends(get_db)):
+def get_idle_rates(db: Session = Depends(get_db)):
     """
     获取空闲率分析数据
     包括端口总体空闲率、按设备类型统计、按站点统计、空闲率预警等
@@ -3446,7 +2677,7 @@ async def get_idle_rates(db: Session = Depends(get_db)):
 
 
 @app.get("/api/analytics/summary-dashboard")
-async def get_summary_dashboard(db: Session = Depends(get_db)):
+def get_summary_dashboard(db: Session = Depends(get_db)):
     """
     获取仪表板汇总数据
     包括所有关键指标的汇总信息，用于统计分析仪表板显示
@@ -3485,19 +2716,38 @@ def build_port_name_with_prefix(fuse_number, breaker_number, original_port=None)
         return original_port if original_port else ''
 
 
+# 连接类型的中英文写法（数据库中混用），按显示名称筛选时匹配全部写法
+CONNECTION_TYPE_ALIASES = {
+    "交流": ["AC", "ac", "交流"],
+    "直流": ["DC", "dc", "直流"],
+}
+
+# 表示空闲（未连接）的连接类型取值，NULL 之外历史数据中还有这些写法
+IDLE_CONNECTION_TYPES = ["", "null", "None"]
+
+
 @app.get("/api/connections")
-async def get_connections(
-    page: int = Query(1, ge=1, description="页码"),
+def get_connections(
+    page: int = Query(1, ge=1, description="页码（按页码翻页，深页较慢，建议使用 cursor）"),
     page_size: int = Query(100, ge=1, le=5000, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，传入时忽略 page"),
+    include_total: bool = Query(True, description="是否返回总数（总数有缓存）"),
     source_device_id: Optional[int] = Query(None, description="源设备ID"),
     target_device_id: Optional[int] = Query(None, description="目标设备ID"),
-    connection_type: Optional[str] = Query(None, description="连接类型"),
+    connection_type: Optional[str] = Query(None, description="连接类型（交流 / 直流 包含英文写法 AC / DC）"),
     device_name: Optional[str] = Query(None, description="设备名称（模糊查询，匹配源设备或目标设备）"),
+    port_status: Optional[str] = Query(None, pattern="^(idle|used)$", description="端口状态：idle=空闲，used=已使用"),
+    port_kind: Optional[str] = Query(None, pattern="^(fuse|breaker)$", description="A端端口类型：fuse=熔丝，breaker=空开"),
+    station: Optional[str] = Query(None, description="局站（A端或B端设备所属局站，精确匹配）"),
+    rated_current_min: Optional[float] = Query(None, description="额定电流下限(A)"),
+    rated_current_max: Optional[float] = Query(None, description="额定电流上限(A)"),
+    hierarchy_relation: Optional[str] = Query(None, description="上下级关系（精确匹配）"),
     db: Session = Depends(get_db)
 ):
     """
     获取连接列表
-    支持分页和筛选功能
+    支持分页和筛选功能；按连接ID游标分页，用法同 /api/devices
+    所有筛选都在数据库中完成（使用 connections 表的组合索引），只返回当前页的行
     """
     try:
         # 构建查询
@@ -3512,47 +2762,89 @@ async def get_connections(
             query = query.filter(Connection.source_device_id == source_device_id)
         if target_device_id:
             query = query.filter(Connection.target_device_id == target_device_id)
+        has_port = or_(
+            Connection.source_fuse_number.isnot(None),
+            Connection.source_breaker_number.isnot(None)
+        )
+        if connection_type == "空闲":
+            # “空闲”等同于 port_status=idle
+            port_status = "idle"
+            connection_type = None
         if connection_type:
-            if connection_type == "空闲":
-                # 筛选空闲端口：连接类型为空且A端设备有熔丝或空开数据
-                query = query.filter(
-                    and_(
-                        Connection.connection_type.is_(None),
-                        or_(
-                            Connection.source_fuse_number.isnot(None),
-                            Connection.source_breaker_number.isnot(None)
-                        )
-                    )
-                )
-            elif connection_type == "已使用总量":
+            if connection_type == "已使用总量":
                 # 筛选已使用总量：显示所有有连接类型的记录（非空闲）
                 query = query.filter(Connection.connection_type.isnot(None))
+            elif connection_type in CONNECTION_TYPE_ALIASES:
+                # 交流 / 直流：数据库中中英文写法混用，按全部写法精确匹配（可以使用索引），
+                # 与默认列表一致，只显示A端有端口数据的记录
+                query = query.filter(Connection.connection_type.in_(CONNECTION_TYPE_ALIASES[connection_type]), has_port)
             else:
                 query = query.filter(Connection.connection_type.ilike(f"%{connection_type}%"))
-        else:
+        elif port_status is None:
             # 如果没有指定连接类型筛选，默认显示所有记录（包括空闲端口）
             # 但要确保A端设备有端口数据（熔丝或空开）
+            query = query.filter(has_port)
+        
+        # 端口状态：只统计A端有端口数据（熔丝或空开）的记录
+        if port_status == "idle":
             query = query.filter(
-                or_(
-                    Connection.source_fuse_number.isnot(None),
-                    Connection.source_breaker_number.isnot(None)
-                )
+                has_port,
+                or_(Connection.connection_type.is_(None), Connection.connection_type.in_(IDLE_CONNECTION_TYPES))
             )
-        # 按设备名称模糊查询（匹配源设备或目标设备）
-        if device_name:
+        elif port_status == "used":
             query = query.filter(
-                or_(
-                    Device.name.ilike(f"%{device_name}%"),  # 匹配源设备名称
-                    target_device.name.ilike(f"%{device_name}%")  # 匹配目标设备名称
-                )
+                has_port,
+                Connection.connection_type.isnot(None),
+                Connection.connection_type.notin_(IDLE_CONNECTION_TYPES)
             )
-        
-        # 计算总数
-        total = query.count()
+        if port_kind == "fuse":
+            query = query.filter(Connection.source_fuse_number.isnot(None))
+        elif port_kind == "breaker":
+            query = query.filter(Connection.source_breaker_number.isnot(None))
+        if station:
+            # 先按 station 索引找到该局站的设备，再按A端/B端设备索引找连接
+            station_device_ids = select(Device.id).where(Device.station == station)
+            query = query.filter(or_(
+                Connection.source_device_id.in_(station_device_ids),
+                Connection.target_device_id.in_(station_device_ids)
+            ))
+        if rated_current_min is not None:
+            query = query.filter(Connection.rated_current >= rated_current_min)
+        if rated_current_max is not None:
+            query = query.filter(Connection.rated_current <= rated_current_max)
+        if hierarchy_relation:
+            query = query.filter(Connection.hierarchy_relation == hierarchy_relation)
+        # 按设备名称模糊查询（匹配源设备或目标设备）：先按全文检索索引找到名称匹配的设备
+        if device_name:
+            name_device_ids = select(Device.id).where(search_index.text_match_clause(Device, "name", device_name))
+            query = query.filter(or_(
+                Connection.source_device_id.in_(name_device_ids),  # 匹配源设备名称
+                Connection.target_device_id.in_(name_device_ids)  # 匹配目标设备名称
+            ))
+        
+        # 计算总数（按筛选条件缓存）
+        if include_total:
+            filters = (
+                source_device_id, target_device_id, connection_type, device_name, port_status, port_kind,
+                station, rated_current_min, rated_current_max, hierarchy_relation
+            )
+            total = pagination.cached_total(pagination.SCOPE_CONNECTIONS, filters, query.count)
+        else:
+            total = None
         
         # 应用分页
-        offset = (page - 1) * page_size
-        results = query.offset(offset).limit(page_size).all()
+        if cursor or page == 1:
+            try:
+                results, next_cursor = pagination.keyset_page(query, "id", [Connection.id], cursor, page_size)
+            except pagination.InvalidCursorError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        else:
+            offset = (page - 1) * page_size
+            results = query.order_by(Connection.id).offset(offset).limit(page_size + 1).all()
+            next_cursor = None
+            if len(results) > page_size:
+                results = results[:page_size]
+                next_cursor = pagination.encode_cursor("id", [results[-1][0].id])
         
         # 构建响应数据 - 手动序列化日期字段以避免JSON序列化错误
         result = []
@@ -3611,13 +2903,17 @@ async def get_connections(
             "success": True,
             "data": result,
             "pagination": {
-                "page": page,
+                "page": None if cursor else page,
                 "page_size": page_size,
                 "total": total,
-                "total_pages": (total + page_size - 1) // page_size
+                "total_pages": (total + page_size - 1) // page_size if total is not None else None,
+                "next_cursor": next_cursor,
+                "has_more": next_cursor is not None
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"获取连接列表失败: {e}")
         traceback.print_exc()
@@ -3625,7 +2921,7 @@ async def get_connections(
 
 
 @app.post("/api/connections")
-async def create_connection(
+def create_connection(
     source_device_id: int = Form(...),
     target_device_id: int = Form(...),
     connection_type: Optional[str] = Form(None),
@@ -3723,6 +3019,7 @@ async def create_connection(
         
         db.add(new_connection)
         db.commit()
+        _on_connections_changed()
         db.refresh(new_connection)
         
         # 构建响应
@@ -3801,7 +3098,7 @@ async def create_connection(
 
 
 @app.put("/api/connections/{connection_id}")
-async def update_connection(
+def update_connection(
     connection_id: int,
     source_device_id: Optional[int] = Form(None),
     target_device_id: Optional[int] = Form(None),
@@ -3908,6 +3205,7 @@ async def update_connection(
         existing_connection.updated_at = datetime.now()
         
         db.commit()
+        _on_connections_changed()
         db.refresh(existing_connection)
         
         # 构建响应数据
@@ -3958,7 +3256,7 @@ async def update_connection(
 
 
 @app.delete("/api/connections/{connection_id}")
-async def delete_connection(
+def delete_connection(
     connection_id: int,
     password: str = Form(...),
     db: Session = Depends(get_db)
@@ -3980,6 +3278,7 @@ async def delete_connection(
         # 删除连接
         db.delete(connection)
         db.commit()
+        _on_connections_changed()
         
         return JSONResponse(content={
             "success": True,
@@ -3996,7 +3295,7 @@ async def delete_connection(
 
 
 @app.get("/api/connections/{connection_id}", response_model=ConnectionResponse)
-async def get_connection(
+def get_connection(
     connection_id: int,
     db: Session = Depends(get_db)
 ):
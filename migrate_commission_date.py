@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库迁移脚本：设备投产日期预解析（永久脚本，作用于本地数据库）
+
+本脚本为devices表添加投产日期解析结果字段，并回填已有设备：
+- commission_date_parsed: 投产日期解析结果（DATE）
+- commission_date_quality: 解析质量（day/month/year/missing/invalid）
+- ix_devices_type_commission_date: 设备类型 + 投产日期 的组合索引，供生命周期状态筛选使用
+
+解析规则与 lifecycle.normalize_commission_date 完全一致。
+回填只处理解析质量为空的设备，可以重复执行；应用启动时由 schema_migrations 迁移 2 调用 upgrade_commission_date()。
+手动执行时会先自动备份数据库。
+
+使用方法：
+    python migrate_commission_date.py
+"""
+
+import os
+import sqlite3
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+from config import DATABASE_URL
+from lifecycle import normalize_commission_date
+
+# 数据库配置
+DATABASE_PATH = DATABASE_URL.replace("sqlite:///", "")
+BACKUP_DIR = "database_backups"
+
+# 每批回填的设备数量
+BACKFILL_BATCH_SIZE = 1000
+
+def create_backup():
+    """创建数据库备份"""
+    if not os.path.exists(DATABASE_PATH):
+        print(f"❌ 数据库文件不存在: {DATABASE_PATH}")
+        return False
+
+    # 创建备份目录
+    Path(BACKUP_DIR).mkdir(exist_ok=True)
+
+    # 生成备份文件名
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_filename = f"devices_backup_{timestamp}.db"
+    backup_path = os.path.join(BACKUP_DIR, backup_filename)
+
+    try:
+        shutil.copy2(DATABASE_PATH, backup_path)
+        print(f"✅ 数据库备份成功: {backup_path}")
+        return backup_path
+    except Exception as e:
+        print(f"❌ 数据库备份失败: {e}")
+        return False
+
+def get_table_columns(cursor, table_name):
+    """获取表的列信息"""
+    cursor.execute(f"PRAGMA table_info({table_name})")
+    columns = cursor.fetchall()
+    return {col[1]: col[2] for col in columns}  # {column_name: data_type}
+
+def add_column_if_not_exists(cursor, table_name, column_name, column_type):
+    """如果列不存在则添加列"""
+    columns = get_table_columns(cursor, table_name)
+
+    if column_name not in columns:
+        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+        print(f"  ✅ 添加列: {column_name} ({column_type})")
+    else:
+        print(f"  ⏭️  列已存在: {column_name}")
+
+def backfill_commission_dates(cursor):
+    """回填尚未解析的设备投产日期，返回回填的设备数"""
+    cursor.execute("SELECT id, commission_date FROM devices WHERE commission_date_quality IS NULL")
+    rows = cursor.fetchall()
+
+    updates = []
+    for device_id, commission_date in rows:
+        parsed, quality = normalize_commission_date(commission_date)
+        updates.append((parsed.date().isoformat() if parsed else None, quality, device_id))
+
+    for start in range(0, len(updates), BACKFILL_BATCH_SIZE):
+        cursor.executemany(
+            "UPDATE devices SET commission_date_parsed = ?, commission_date_quality = ? WHERE id = ?",
+            updates[start:start + BACKFILL_BATCH_SIZE]
+        )
+    return len(updates)
+
+def upgrade_commission_date(database_path=None):
+    """
+    添加字段、创建索引并回填投产日期（可重复执行）
+    返回 True 表示成功
+    """
+    conn = sqlite3.connect(database_path or DATABASE_PATH)
+    try:
+        cursor = conn.cursor()
+
+        # devices表尚未创建时无需迁移，建表时会直接包含新字段
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='devices'")
+        if cursor.fetchone() is None:
+            print("  ⏭️  devices表不存在，跳过")
+            return True
+
+        add_column_if_not_exists(cursor, 'devices', 'commission_date_parsed', 'DATE')
+        add_column_if_not_exists(cursor, 'devices', 'commission_date_quality', 'VARCHAR(20)')
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS ix_devices_type_commission_date "
+            "ON devices (device_type, commission_date_parsed)"
+        )
+
+        backfilled = backfill_commission_dates(cursor)
+        conn.commit()
+        print(f"  📅 回填投产日期: {backfilled} 个设备")
+        return True
+    except Exception as e:
+        print(f"❌ 投产日期迁移失败: {e}")
+        conn.rollback()
+        return False
+    finally:
+        conn.close()
+
+def verify_migration():
+    """验证迁移结果"""
+    print("\n🔍 验证迁移结果...")
+
+    try:
+        conn = sqlite3.connect(DATABASE_PATH)
+        cursor = conn.cursor()
+
+        columns = get_table_columns(cursor, 'devices')
+        missing_fields = [field for field in ('commission_date_parsed', 'commission_date_quality') if field not in columns]
+        if missing_fields:
+            print(f"❌ 缺少字段: {missing_fields}")
+            return False
+        print("✅ 所有必需字段都已存在")
+
+        # 检查是否还有未回填的设备
+        cursor.execute("SELECT COUNT(*) FROM devices WHERE commission_date_quality IS NULL")
+        pending_count = cursor.fetchone()[0]
+        if pending_count:
+            print(f"❌ 仍有 {pending_count} 个设备未回填")
+            return False
+
+        # 按解析质量统计
+        cursor.execute("SELECT commission_date_quality, COUNT(*) FROM devices GROUP BY commission_date_quality")
+        print("📊 投产日期解析质量统计:")
+        for quality, count in cursor.fetchall():
+            print(f"  - {quality}: {count}")
+
+        return True
+
+    except Exception as e:
+        print(f"❌ 验证过程中发生错误: {e}")
+        return False
+    finally:
+        if 'conn' in locals():
+            conn.close()
+
+def main():
+    """主函数"""
+    print("=" * 60)
+    print("🔧 设备投产日期预解析 - 数据库迁移脚本")
+    print("=" * 60)
+
+    # 检查数据库文件是否存在
+    if not os.path.exists(DATABASE_PATH):
+        print(f"❌ 数据库文件不存在: {DATABASE_PATH}")
+        print("请先运行主程序创建数据库")
+        return
+
+    # 创建备份
+    print("\n📦 第1步: 创建数据库备份")
+    backup_path = create_backup()
+    if not backup_path:
+        print("❌ 备份失败，迁移终止")
+        return
+
+    # 执行迁移
+    print("\n🔄 第2步: 添加字段并回填投产日期")
+    if not upgrade_commission_date():
+        print("❌ 迁移失败")
+        print(f"💡 可以从备份恢复: {backup_path}")
+        return
+
+    # 验证迁移
+    print("\n✅ 第3步: 验证迁移结果")
+    if not verify_migration():
+        print("❌ 验证失败")
+        return
+
+    print("\n" + "=" * 60)
+    print("🎉 数据库迁移成功完成！")
+    print("=" * 60)
+    print(f"📦 备份文件: {backup_path}")
+
+if __name__ == "__main__":
+    main()
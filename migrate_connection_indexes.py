@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库迁移脚本：连接表筛选索引（永久脚本，作用于本地数据库）
+
+create_db_and_tables() 只在新建表时创建索引，已有数据库的 connections 表需要补建
+models.Connection 中声明的索引（A端/B端设备 + 连接类型、连接类型 + 端口、上下级关系 + 额定电流等），
+供 /api/connections 的服务端筛选使用。
+
+只创建不存在的索引，可以重复执行；应用启动时由 schema_migrations 迁移 3 调用 upgrade_connection_indexes()。
+
+使用方法：
+    python migrate_connection_indexes.py
+"""
+
+from sqlalchemy import inspect
+
+from models import engine, Connection
+
+
+def upgrade_connection_indexes(bind=None):
+    """
+    补建 connections 表缺少的索引（可重复执行）
+    返回 True 表示成功
+    """
+    bind = bind or engine
+    try:
+        if not inspect(bind).has_table(Connection.__tablename__):
+            print("  ⏭️  connections表不存在，跳过")
+            return True
+
+        existing = {index["name"] for index in inspect(bind).get_indexes(Connection.__tablename__)}
+        for index in sorted(Connection.__table__.indexes, key=lambda index: index.name):
+            if index.name in existing:
+                continue
+            index.create(bind=bind, checkfirst=True)
+            print(f"  ✅ 创建索引: {index.name}")
+        return True
+    except Exception as e:
+        print(f"❌ 连接表索引迁移失败: {e}")
+        return False
+
+
+def main():
+    """主函数"""
+    print("=" * 60)
+    print("🔧 连接表筛选索引 - 数据库迁移脚本")
+    print("=" * 60)
+
+    if upgrade_connection_indexes():
+        print("🎉 连接表索引已是最新")
+    else:
+        print("❌ 迁移失败")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@
 
 本脚本用于安全地扩展现有Connection表，添加Excel中的18个字段支持。
 执行前会自动备份数据库，确保数据安全。
+应用启动时 schema_migrations 迁移 1 会自动补齐缺少的字段，一般不需要再手动执行本脚本。
 
 使用方法：
     python migrate_connection_table.py
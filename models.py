@@ -1,23 +1,49 @@
 # 导入 SQLAlchemy 所需的模块
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, DateTime, Date, Float, Text
+from sqlalchemy import create_engine, event, Column, Integer, String, ForeignKey, DateTime, Date, Float, Text, Index
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
 from datetime import datetime
 import os
 
 # 导入配置
-from config import DATABASE_URL
+from config import DATABASE_URL, SQLITE_PRAGMAS, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
 
 # --- 数据库设置 ---
 
 # 确保数据库目录存在
 os.makedirs(os.path.dirname(DATABASE_URL.replace('sqlite:///', '')), exist_ok=True)
 
+
+def make_engine(database_url: str = DATABASE_URL, pragmas: dict = None):
+    """
+    创建数据库引擎
+    connect_args={"check_same_thread": False} 是 SQLite 特有的配置，
+    因为 FastAPI 是多线程的，需要这个选项来允许在不同线程中共享连接。
+    每个连接建立时执行存储配置中的 PRAGMA（默认为 config.SQLITE_PRAGMAS，WAL 等），
+    连接池大小见 config.DB_POOL_SIZE / DB_MAX_OVERFLOW
+    """
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+    new_engine = create_engine(
+        database_url,
+        connect_args={"check_same_thread": False},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+
+    @event.listens_for(new_engine, "connect")
+    def apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return new_engine
+
+
 # 创建数据库引擎
-# connect_args={"check_same_thread": False} 是 SQLite 特有的配置，
-# 因为 FastAPI 是多线程的，需要这个选项来允许在不同线程中共享连接。
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = make_engine()
 
 # 创建一个数据库会话的工厂
 # autocommit=False 和 autoflush=False 确保事务控制是手动的，这在Web应用中是最佳实践。
@@ -54,6 +80,10 @@ class Device(Base):
     # 保留 vendor, commission_date, remark 作为额外信息
     vendor = Column(String)
     commission_date = Column(String)
+    # 投产日期的解析结果（写入时由 commission_date 计算，只有年月/年份的取当月/当年第一天）
+    commission_date_parsed = Column(Date)
+    # 投产日期解析质量：day(精确到日) / month(年月) / year(年份) / missing(未填写) / invalid(无法识别)
+    commission_date_quality = Column(String(20))
     remark = Column(String)
 
     # 定义与 Connection 模型的关系
@@ -71,6 +101,11 @@ class Device(Base):
         back_populates="target_device"
     )
 
+    __table_args__ = (
+        # 生命周期状态筛选按 设备类型 + 投产日期范围 查询
+        Index("ix_devices_type_commission_date", "device_type", "commission_date_parsed"),
+    )
+
 class LifecycleRule(Base):
     """
     设备生命周期规则模型 (Lifecycle Rule Model)
@@ -162,6 +197,61 @@ class Connection(Base):
         back_populates="target_connections"
     )
 
+    __table_args__ = (
+        # 按A端/B端设备查找连接（设备端口、删除设备、查重、按局站/设备名称筛选时从设备表关联到连接表），
+        # 连接类型放在索引中，按设备 + 连接类型查询和判断端口是否空闲时无需回表
+        Index("ix_connections_source_type", "source_device_id", "connection_type"),
+        Index("ix_connections_target_type", "target_device_id", "connection_type"),
+        # 连接列表按连接类型 / 端口状态（空闲、已使用）筛选，A端端口字段包含在索引中，无需回表判断
+        Index("ix_connections_type_ports", "connection_type", "source_fuse_number", "source_breaker_number"),
+        # 连接列表按上下级关系 + 额定电流范围筛选
+        Index("ix_connections_hierarchy_current", "hierarchy_relation", "rated_current"),
+        Index("ix_connections_rated_current", "rated_current"),
+    )
+
+class ImportJob(Base):
+    """
+    Excel导入任务模型 (Import Job Model)
+    对应数据库中的 'import_jobs' 表。
+    /upload 只登记任务并立即返回，导入在后台线程中执行，这里持久化任务状态和最终结果。
+    """
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # 上传的原始文件名
+    filename = Column(String)
+    # 上传文件在服务器上的临时保存路径，导入完成后删除
+    file_path = Column(String)
+    # 任务状态：pending(排队中) / running(导入中) / succeeded(成功) / failed(失败)
+    status = Column(String(20), index=True, nullable=False, default="pending")
+    # 当前导入阶段：devices(设备表) / connections(设备表连接) / sheet2(连接工作表)
+    stage = Column(String(20))
+    # 已处理行数（设备表 + 连接工作表）
+    rows_processed = Column(Integer, default=0)
+    # 跳过的行数（设备表 + 连接工作表）
+    skipped_count = Column(Integer, default=0)
+    # 导入结果（JSON），包含 skipped_rows / sheet2_skipped_rows 等统计
+    result = Column(Text)
+    # 失败原因
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.now)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+class SchemaMigration(Base):
+    """
+    数据库迁移记录模型 (Schema Migration Model)
+    对应数据库中的 'schema_migrations' 表。
+    每个已执行的迁移版本一行，应用启动时由 schema_migrations.run_migrations() 只执行尚未记录的版本。
+    """
+    __tablename__ = "schema_migrations"
+
+    # 迁移版本号（schema_migrations.MIGRATIONS 中的序号）
+    version = Column(Integer, primary_key=True)
+    # 迁移说明
+    name = Column(String(200), nullable=False)
+    applied_at = Column(DateTime, default=datetime.now)
+
 # --- 数据库初始化函数 ---
 
 def create_db_and_tables():
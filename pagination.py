@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+列表接口的游标分页模块（永久模块，总数缓存为进程内全局缓存）
+
+用途：/api/devices 和 /api/connections 按排序键 + id 做键集（keyset）分页，
+下一页从上一页最后一行之后开始查询（WHERE (排序键, id) > (上一页最后一行)），
+可以直接使用索引定位，第N页和第1页的查询代价相同，不再随 offset 增大而变慢。
+
+- 游标是不透明的字符串（排序方式和上一页最后一行排序键的 base64 编码），客户端原样传回即可；
+- 总数（total）的 COUNT 查询按 (列表, 筛选条件) 缓存，设备或连接写入后由 invalidate() 使其失效，
+  另有 TOTAL_CACHE_SECONDS 的过期时间，兜底命令行导入等不经过服务的写入；
+  筛选条件包含自由输入的名称、厂家等，缓存按最近使用保留最多 TOTAL_CACHE_MAX_ENTRIES 个，写入时清除已过期的条目。
+注意：缓存是进程级的，多进程部署时每个进程各自维护一份。
+"""
+
+import base64
+import binascii
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import and_, or_
+
+
+# 总数缓存的有效期（秒）
+TOTAL_CACHE_SECONDS = 60
+
+# 总数缓存最多保留的 (列表, 筛选条件) 数量，超出时淘汰最久未使用的
+TOTAL_CACHE_MAX_ENTRIES = 256
+
+# 列表名称（总数缓存按列表失效）
+SCOPE_DEVICES = "devices"
+SCOPE_CONNECTIONS = "connections"
+
+
+class InvalidCursorError(ValueError):
+    """游标无法解析，或与本次请求的排序方式不一致"""
+
+
+def encode_cursor(sort: str, values: list) -> str:
+    """把排序方式和最后一行的排序键编码为游标"""
+    payload = json.dumps({"s": sort, "k": values}, ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, key_count: int) -> list:
+    """解析游标，返回上一页最后一行的排序键"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        values = payload["k"]
+        cursor_sort = payload["s"]
+    except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError):
+        raise InvalidCursorError("分页游标无效")
+    if cursor_sort != sort:
+        raise InvalidCursorError("分页游标与排序方式不一致")
+    if not isinstance(values, list) or len(values) != key_count:
+        raise InvalidCursorError("分页游标无效")
+    return values
+
+
+def _after_clause(columns, values):
+    """(c1, c2, ...) > (v1, v2, ...) 的展开形式：c1 > v1 OR (c1 = v1 AND c2 > v2) ..."""
+    column, value = columns[0], values[0]
+    if len(columns) == 1:
+        return column > value
+    return or_(column > value, and_(column == value, _after_clause(columns[1:], values[1:])))
+
+
+def keyset_page(query, sort: str, sort_columns: list, cursor: str, page_size: int):
+    """
+    取一页数据：sort_columns 为排序列（最后一列必须唯一，通常是 id），cursor 为上一页返回的游标（第一页为空）
+    返回 (本页的行, 下一页游标)，没有下一页时游标为 None
+    排序列的值取自查询结果中同名的列（label 为列名），因此查询需要包含这些列
+    """
+    if cursor:
+        values = decode_cursor(cursor, sort, len(sort_columns))
+        query = query.filter(_after_clause(sort_columns, values))
+
+    rows = query.order_by(*sort_columns).limit(page_size + 1).all()
+    if len(rows) <= page_size:
+        return rows, None
+
+    rows = rows[:page_size]
+    last = rows[-1]
+    return rows, encode_cursor(sort, [_row_value(last, column.key) for column in sort_columns])
+
+
+def _row_value(row, key: str):
+    """从查询结果行（ORM对象或带实体的元组行）中取排序列的值"""
+    if hasattr(row, "_mapping"):
+        mapping = row._mapping
+        if key in mapping:
+            return mapping[key]
+        # 结果行中第一个实体（如 Connection）上的属性
+        return getattr(row[0], key)
+    return getattr(row, key)
+
+
+# --- 总数缓存 ---
+
+_totals_lock = threading.Lock()
+_totals = OrderedDict()     # {(列表, 筛选条件): (总数, 写入时间)}，按最近使用排序
+_generations = {}           # {列表: 失效次数}
+
+
+def cached_total(scope: str, filters: tuple, count_query) -> int:
+    """
+    返回 (列表, 筛选条件) 对应的总数，缓存未命中时执行 count_query() 并缓存
+    filters 为本次请求的筛选条件元组（必须可哈希）
+    """
+    key = (scope, filters)
+    now = time.monotonic()
+    with _totals_lock:
+        cached = _totals.get(key)
+        generation = _generations.get(scope, 0)
+        if cached is not None and now - cached[1] < TOTAL_CACHE_SECONDS:
+            _totals.move_to_end(key)
+            return cached[0]
+
+    total = count_query()
+    with _totals_lock:
+        # 统计期间数据被修改时，本次结果只用于当前请求，不写入缓存
+        if generation == _generations.get(scope, 0):
+            _store_total(key, total, now)
+    return total
+
+
+def _store_total(key: tuple, total: int, now: float):
+    """写入一条总数缓存：先清除已过期的条目，仍超出上限时淘汰最久未使用的（调用方持有 _totals_lock）"""
+    for expired_key in [k for k, (_, written) in _totals.items() if now - written >= TOTAL_CACHE_SECONDS]:
+        del _totals[expired_key]
+    _totals[key] = (total, now)
+    _totals.move_to_end(key)
+    while len(_totals) > TOTAL_CACHE_MAX_ENTRIES:
+        _totals.popitem(last=False)
+
+
+def invalidate(scope: str):
+    """使某个列表的全部总数缓存失效（设备或连接写入后调用）"""
+    with _totals_lock:
+        _generations[scope] = _generations.get(scope, 0) + 1
+        for key in [key for key in _totals if key[0] == scope]:
+            del _totals[key]
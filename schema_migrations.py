@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库版本化迁移（永久模块，作用于本地数据库）
+
+所有表结构变更按版本号登记在 MIGRATIONS 中，应用启动时（以及 bulk_import 命令行）调用 run_migrations()，
+按版本号顺序执行 schema_migrations 表中尚未记录的迁移，执行成功后写入记录，之后启动不再重复执行。
+每个迁移都可以重复执行（只补建缺少的字段和索引），没有迁移记录的旧数据库会从第1个版本开始补齐。
+
+新增表结构变更时在 MIGRATIONS 末尾追加新版本，不要修改或删除已发布的版本。
+全文检索索引（search_index.upgrade_search_index）需要在每次启动时检测 SQLite 是否支持 FTS5，不在此登记。
+
+使用方法：
+    python schema_migrations.py                # 执行尚未执行的迁移并显示迁移记录
+    python schema_migrations.py --check-plans  # 检查连接表热点查询的执行计划是否使用了预期的索引
+"""
+
+import argparse
+import sys
+from datetime import datetime
+
+from sqlalchemy import inspect, or_, select, func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import engine, Connection, Device, SchemaMigration
+from migrate_commission_date import upgrade_commission_date
+from migrate_connection_indexes import upgrade_connection_indexes
+
+
+# --- 迁移版本 ---
+
+def add_missing_connection_columns(bind) -> bool:
+    """补齐 connections 表中模型已定义、数据库中缺少的字段（原 migrate_connection_table.py 的手动迁移）"""
+    if not inspect(bind).has_table(Connection.__tablename__):
+        print("  ⏭️  connections表不存在，跳过")
+        return True
+
+    existing = {column["name"] for column in inspect(bind).get_columns(Connection.__tablename__)}
+    with bind.begin() as conn:
+        for column in Connection.__table__.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            sql = f"ALTER TABLE {Connection.__tablename__} ADD COLUMN {column.name} {column_type}"
+            # 整数默认值（如并联数量）同时作为数据库默认值，已有连接也取该值
+            if column.default is not None and column.default.is_scalar and isinstance(column.default.arg, int):
+                sql += f" DEFAULT {column.default.arg}"
+            conn.exec_driver_sql(sql)
+            print(f"  ✅ 添加列: {column.name} ({column_type})")
+    return True
+
+
+def migrate_commission_date(bind) -> bool:
+    """设备投产日期解析字段、组合索引和回填"""
+    return upgrade_commission_date(database_path=bind.url.database)
+
+
+# 被 设备 + 连接类型 组合索引取代的单列索引
+SUPERSEDED_CONNECTION_INDEXES = ["ix_connections_source_device_id", "ix_connections_target_device_id"]
+
+
+def replace_connection_device_indexes(bind) -> bool:
+    """创建 A端/B端设备 + 连接类型 组合索引，删除被其取代的单列设备索引"""
+    if not inspect(bind).has_table(Connection.__tablename__):
+        print("  ⏭️  connections表不存在，跳过")
+        return True
+
+    for index in Connection.__table__.indexes:
+        if index.name in ("ix_connections_source_type", "ix_connections_target_type"):
+            index.create(bind=bind, checkfirst=True)
+    with bind.begin() as conn:
+        for index_name in SUPERSEDED_CONNECTION_INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index_name}")
+    print("  ✅ 连接表设备索引已更新为 设备 + 连接类型 组合索引")
+    return True
+
+
+# 迁移版本：(版本号, 说明, 迁移函数)，迁移函数接收数据库引擎，返回 True 表示成功
+MIGRATIONS = [
+    (1, "连接表扩展字段", add_missing_connection_columns),
+    (2, "设备投产日期解析字段", migrate_commission_date),
+    (3, "连接表筛选索引", lambda bind: upgrade_connection_indexes(bind)),
+    (4, "连接表 设备+连接类型 组合索引", replace_connection_device_indexes),
+]
+
+
+def applied_versions(bind=None) -> dict:
+    """已执行的迁移：{版本号: 执行时间}"""
+    bind = bind or engine
+    if not inspect(bind).has_table(SchemaMigration.__tablename__):
+        return {}
+    with bind.connect() as conn:
+        return dict(conn.execute(select(SchemaMigration.version, SchemaMigration.applied_at)).all())
+
+
+def run_migrations(bind=None) -> bool:
+    """
+    按版本号顺序执行尚未执行的迁移（可重复调用）
+    返回 True 表示数据库已是最新版本
+    """
+    bind = bind or engine
+    try:
+        SchemaMigration.__table__.create(bind=bind, checkfirst=True)
+        applied = applied_versions(bind)
+
+        for version, name, upgrade in MIGRATIONS:
+            if version in applied:
+                continue
+            print(f"  🔧 执行迁移 {version}: {name}")
+            if not upgrade(bind):
+                print(f"❌ 迁移 {version} 执行失败: {name}")
+                return False
+            with bind.begin() as conn:
+                # 多个进程同时启动时可能重复执行同一迁移（迁移本身可以重复执行），记录只保留一条
+                conn.execute(
+                    sqlite_insert(SchemaMigration)
+                    .values(version=version, name=name, applied_at=datetime.now())
+                    .on_conflict_do_nothing()
+                )
+        print(f"  ✅ 数据库结构版本: {MIGRATIONS[-1][0]}")
+        return True
+    except Exception as e:
+        print(f"❌ 数据库迁移失败: {e}")
+        return False
+
+
+# --- 执行计划检查 ---
+
+def _hot_connection_queries():
+    """
+    连接表的热点查询（与接口中的查询条件一致）及预期使用的索引：[(说明, 查询, [索引])]
+    索引为元组时表示其中任意一个即可（由查询优化器选择）
+    """
+    station_device_ids = select(Device.id).where(Device.station == "局站")
+    return [
+        ("设备端口详情：A端为该设备的连接",
+         select(Connection).where(Connection.source_device_id == 1),
+         ["ix_connections_source_type"]),
+        ("删除设备：A端或B端为该设备的连接",
+         select(Connection.id).where(or_(Connection.source_device_id == 1, Connection.target_device_id == 1)),
+         ["ix_connections_source_type", "ix_connections_target_type"]),
+        ("新建连接查重：A端 + B端设备",
+         select(Connection.id).where(Connection.source_device_id == 1, Connection.target_device_id == 2),
+         [("ix_connections_source_type", "ix_connections_target_type")]),
+        ("连接列表按A端设备 + 连接类型筛选",
+         select(Connection.id).where(
+             Connection.source_device_id == 1, Connection.connection_type.in_(["AC", "ac", "交流"])
+         ),
+         ["ix_connections_source_type"]),
+        ("连接列表按B端设备 + 已使用筛选",
+         select(Connection.id).where(
+             Connection.target_device_id == 1,
+             Connection.connection_type.isnot(None),
+             Connection.connection_type.notin_(["", "null", "None"])
+         ),
+         ["ix_connections_target_type"]),
+        ("连接列表按局站筛选",
+         select(Connection.id).where(or_(
+             Connection.source_device_id.in_(station_device_ids),
+             Connection.target_device_id.in_(station_device_ids)
+         )),
+         ["ix_connections_source_type", "ix_connections_target_type"]),
+        ("Excel导入：按设备批量查找已有连接",
+         select(Connection.id).where(or_(
+             Connection.source_device_id.in_([1, 2, 3]), Connection.target_device_id.in_([1, 2, 3])
+         )),
+         ["ix_connections_source_type", "ix_connections_target_type"]),
+        ("连接类型统计",
+         select(Connection.connection_type, func.count()).group_by(Connection.connection_type),
+         ["ix_connections_type_ports"]),
+        ("连接列表按额定电流范围筛选",
+         select(Connection.id).where(Connection.rated_current >= 10, Connection.rated_current <= 100),
+         ["ix_connections_rated_current"]),
+    ]
+
+
+def _index_names(expected_indexes: list) -> set:
+    """预期索引中出现的全部索引名"""
+    names = set()
+    for expected in expected_indexes:
+        names.update(expected if isinstance(expected, tuple) else (expected,))
+    return names
+
+
+def check_query_plans(bind=None) -> list:
+    """
+    用 EXPLAIN QUERY PLAN 检查热点查询是否使用了预期的索引
+    返回不符合预期的查询：[(说明, 缺少的索引, 执行计划)]，全部符合时为空列表
+    """
+    bind = bind or engine
+    failures = []
+    with bind.connect() as conn:
+        for description, query, expected_indexes in _hot_connection_queries():
+            sql = str(query.compile(dialect=bind.dialect, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+            used = {
+                name for name in _index_names(expected_indexes)
+                if any(f"INDEX {name} " in f"{step} " for step in plan)
+            }
+            missing = [
+                " / ".join(expected) if isinstance(expected, tuple) else expected
+                for expected in expected_indexes
+                if not used.intersection(expected if isinstance(expected, tuple) else (expected,))
+            ]
+            if missing:
+                failures.append((description, missing, plan))
+            else:
+                print(f"  ✅ {description}: {', '.join(sorted(used))}")
+    return failures
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="数据库版本化迁移")
+    parser.add_argument("--check-plans", action="store_true", help="检查连接表热点查询的执行计划")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔧 数据库版本化迁移")
+    print("=" * 60)
+
+    if not run_migrations():
+        print("❌ 迁移失败")
+        sys.exit(1)
+
+    applied = applied_versions()
+    for version, name, _ in MIGRATIONS:
+        print(f"  {version}. {name}: {applied.get(version, '未执行')}")
+
+    if args.check_plans:
+        print("\n🔍 检查热点查询的执行计划...")
+        failures = check_query_plans()
+        for description, missing, plan in failures:
+            print(f"  ❌ {description}: 未使用 {', '.join(missing)}")
+            for step in plan:
+                print(f"       {step}")
+        if failures:
+            sys.exit(1)
+        print("🎉 热点查询均使用了预期的索引")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+全文检索模块（永久模块，索引保存在数据库中的 SQLite FTS5 虚拟表）
+
+用途：
+1. devices_fts / connections_fts 是设备表、连接表的外部内容（external content）FTS5 索引，
+   覆盖设备的名称、资产编号、局站、厂家、型号、位置、备注，以及连接的备注、电缆型号和各端规格；
+   由数据库触发器在每次插入、更新、删除时同步，任何写入途径（接口、Excel导入、命令行）都不需要额外处理。
+2. 使用 trigram 分词器：中文没有空格分词，trigram 按连续3个字符建索引，支持任意位置的子串匹配（不区分大小写），
+   与原先 ilike('%x%') 的匹配结果一致。少于3个字符的词无法使用 trigram 索引，对这些词退回到 LIKE 条件。
+3. search() 供 /api/search 使用，按 bm25 相关度排序返回设备和连接的命中结果；
+   text_match_clause() 供列表筛选（设备名称、厂家）使用，替代 ilike 全表扫描。
+
+应用启动时调用 upgrade_search_index() 创建索引表和触发器（已存在时不做修改），新建时从现有数据重建索引。
+当前 SQLite 不支持 FTS5 或 trigram 分词器时检索功能退回到 LIKE 查询，结果相同，只是速度较慢。
+"""
+
+from sqlalchemy import column, select, table, text
+from sqlalchemy.orm import Session
+
+from models import engine
+
+
+# trigram 分词器能够使用索引的最短词长（字符数）
+MIN_TERM_LENGTH = 3
+
+# 索引定义：FTS表 -> (内容表, 索引字段, bm25 各字段权重)
+FTS_TABLES = {
+    "devices_fts": (
+        "devices",
+        ["name", "asset_id", "station", "vendor", "model", "location", "remark"],
+        [10.0, 10.0, 3.0, 2.0, 2.0, 1.0, 1.0],
+    ),
+    "connections_fts": (
+        "connections",
+        ["remark", "cable_model", "cable_specification", "source_fuse_spec", "source_breaker_spec",
+         "target_fuse_spec", "target_breaker_spec"],
+        [1.0, 3.0, 3.0, 2.0, 2.0, 2.0, 2.0],
+    ),
+}
+
+# 检索结果类型
+HIT_DEVICE = "device"
+HIT_CONNECTION = "connection"
+
+# 当前数据库是否可以使用FTS索引（upgrade_search_index() 成功后为 True）
+_fts_available = False
+
+
+def _trigger_sql(fts_name: str, content_table: str, fields: list) -> list:
+    """保持FTS索引与内容表同步的触发器；更新触发器只在索引字段变化时执行"""
+    field_list = ", ".join(fields)
+    new_values = ", ".join(f"new.{field}" for field in fields)
+    old_values = ", ".join(f"old.{field}" for field in fields)
+    insert_new = f"INSERT INTO {fts_name}(rowid, {field_list}) VALUES (new.id, {new_values});"
+    delete_old = f"INSERT INTO {fts_name}({fts_name}, rowid, {field_list}) VALUES ('delete', old.id, {old_values});"
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ai AFTER INSERT ON {content_table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_ad AFTER DELETE ON {content_table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_name}_au AFTER UPDATE OF {field_list} ON {content_table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+
+def upgrade_search_index(bind=None) -> bool:
+    """
+    创建FTS索引表和同步触发器（可重复执行），新建的索引从现有数据重建
+    返回 True 表示检索索引可用；SQLite 不支持 FTS5 trigram 时返回 False，检索退回到 LIKE 查询
+    """
+    global _fts_available
+
+    bind = bind or engine
+    try:
+        with bind.begin() as conn:
+            existing = {
+                row[0] for row in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            }
+            for fts_name, (content_table, fields, _) in FTS_TABLES.items():
+                if content_table not in existing:
+                    print(f"  ⏭️  {content_table}表不存在，跳过")
+                    continue
+                if fts_name not in existing:
+                    conn.exec_driver_sql(
+                        f"CREATE VIRTUAL TABLE {fts_name} USING fts5({', '.join(fields)}, "
+                        f"content='{content_table}', content_rowid='id', tokenize='trigram')"
+                    )
+                    conn.exec_driver_sql(f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')")
+                    print(f"  ✅ 创建全文索引: {fts_name}")
+                for statement in _trigger_sql(fts_name, content_table, fields):
+                    conn.exec_driver_sql(statement)
+        _fts_available = True
+    except Exception as e:
+        print(f"⚠️ 全文检索索引不可用（需要支持 FTS5 trigram 分词器的 SQLite 3.34+），检索将使用 LIKE 查询: {e}")
+        _fts_available = False
+    return _fts_available
+
+
+def rebuild_search_index(bind=None):
+    """从内容表完整重建FTS索引（索引与数据不一致时手动调用）"""
+    bind = bind or engine
+    with bind.begin() as conn:
+        for fts_name in FTS_TABLES:
+            conn.exec_driver_sql(f"INSERT INTO {fts_name}({fts_name}) VALUES ('rebuild')")
+
+
+# --- 查询 ---
+
+def _split_terms(query: str) -> tuple:
+    """按空白拆分检索词，返回 (可以使用索引的词, 过短的词)"""
+    terms = query.split()
+    return (
+        [term for term in terms if len(term) >= MIN_TERM_LENGTH],
+        [term for term in terms if len(term) < MIN_TERM_LENGTH],
+    )
+
+
+def _match_expression(terms: list, field: str = None) -> str:
+    """FTS5 MATCH 表达式：每个词作为短语（子串）匹配，多个词之间为 AND"""
+    prefix = f"{field} : " if field else ""
+    return " AND ".join(prefix + '"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _like_pattern(term: str) -> str:
+    """LIKE 子串匹配模式，转义通配符"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def text_match_clause(model, field: str, value: str):
+    """
+    列表筛选中某个字段的子串匹配条件（不区分大小写），与 getattr(model, field).ilike('%value%') 结果相同
+    值不少于3个字符且FTS索引可用时按FTS索引查找，否则退回到 ilike
+    """
+    column_attr = getattr(model, field)
+    fts_name = f"{model.__tablename__}_fts"
+    if (
+        _fts_available
+        and fts_name in FTS_TABLES
+        and field in FTS_TABLES[fts_name][1]
+        and len(value) >= MIN_TERM_LENGTH
+    ):
+        fts = table(fts_name, column("rowid"))
+        matched_ids = select(fts.c.rowid).where(text(f"{fts_name} MATCH :fts_{field}").bindparams(
+            **{f"fts_{field}": _match_expression([value], field)}
+        ))
+        return model.id.in_(matched_ids)
+    return column_attr.ilike(f"%{value}%")
+
+
+def _search_table(db: Session, fts_name: str, select_columns: str, joins: str, query: str, limit: int) -> list:
+    """
+    在一张表中检索：可以使用索引的词走 FTS MATCH 并按 bm25 排序（score 为 bm25 取反，越大越相关），
+    过短的词对内容表各字段做 LIKE 过滤；只有过短的词时按ID排序
+    """
+    content_table, fields, weights = FTS_TABLES[fts_name]
+    long_terms, short_terms = _split_terms(query)
+    if not _fts_available:
+        long_terms, short_terms = [], long_terms + short_terms
+
+    params = {"limit": limit}
+    conditions = []
+    for position, term in enumerate(short_terms):
+        params[f"like_{position}"] = _like_pattern(term)
+        conditions.append("(" + " OR ".join(
+            f"t.{field} LIKE :like_{position} ESCAPE '\\'" for field in fields
+        ) + ")")
+    where_short = " AND ".join(conditions)
+
+    if long_terms:
+        params["match"] = _match_expression(long_terms)
+        score = f"-bm25({fts_name}, {', '.join(str(weight) for weight in weights)})"
+        if conditions:
+            # 过短的词需要按内容表字段过滤：关联内容表后再排序
+            sql = (
+                f"SELECT {select_columns}, {score} AS score "
+                f"FROM {fts_name} JOIN {content_table} t ON t.id = {fts_name}.rowid {joins} "
+                f"WHERE {fts_name} MATCH :match AND {where_short} ORDER BY score DESC LIMIT :limit"
+            )
+        else:
+            # 先在FTS索引内排序取前 limit 条，再关联内容表取字段，避免对全部命中行做关联
+            sql = (
+                f"SELECT {select_columns}, m.score FROM ("
+                f"SELECT rowid, {score} AS score FROM {fts_name} "
+                f"WHERE {fts_name} MATCH :match ORDER BY score DESC LIMIT :limit"
+                f") m JOIN {content_table} t ON t.id = m.rowid {joins} ORDER BY m.score DESC"
+            )
+    else:
+        sql = (
+            f"SELECT {select_columns}, 0.0 AS score FROM {content_table} t {joins} "
+            f"WHERE {where_short} ORDER BY t.id LIMIT :limit"
+        )
+    return db.execute(text(sql), params).mappings().all()
+
+
+def search(db: Session, query: str, limit: int = 20, kinds=(HIT_DEVICE, HIT_CONNECTION)) -> list:
+    """
+    检索设备和连接，返回按相关度排序的命中列表（每种类型最多 limit 条，合并后再取前 limit 条）
+    score 越大越相关；只有过短的词（无法使用索引）时 score 为 0
+    """
+    query = query.strip()
+    if not query:
+        return []
+
+    hits = []
+    if HIT_DEVICE in kinds:
+        for row in _search_table(
+            db, "devices_fts",
+            "t.id, t.asset_id, t.name, t.station, t.device_type, t.vendor, t.model, t.location",
+            "", query, limit
+        ):
+            hit = dict(row)
+            hit["type"] = HIT_DEVICE
+            hit["score"] = round(hit["score"], 6)
+            hits.append(hit)
+
+    if HIT_CONNECTION in kinds:
+        for row in _search_table(
+            db, "connections_fts",
+            "t.id, t.source_device_id, t.target_device_id, source.name AS source_device_name, "
+            "target.name AS target_device_name, t.connection_type, t.cable_model, t.remark",
+            "LEFT JOIN devices source ON source.id = t.source_device_id "
+            "LEFT JOIN devices target ON target.id = t.target_device_id",
+            query, limit
+        ):
+            hit = dict(row)
+            hit["type"] = HIT_CONNECTION
+            hit["score"] = round(hit["score"], 6)
+            hits.append(hit)
+
+    hits.sort(key=lambda hit: hit["score"], reverse=True)
+    return hits[:limit]
@@ -253,16 +253,16 @@ function handleFileUpload() {
     
     fetch('/upload', {
         method: 'POST',
+        headers: {'Accept': 'application/json'},
         body: formData
     })
     .then(response => response.json())
     .then(data => {
         if (data.success) {
-            alert(data.message || 'Excel文件上传成功！');
             // 清空文件输入
             fileInput.value = '';
-            // 刷新整个页面以显示最新数据
-            window.location.reload();
+            // 导入在后台执行，跳转到首页显示导入进度
+            window.location.href = `/?import_job=${data.job_id}`;
         } else {
             alert('上传失败：' + (data.message || '未知错误'));
         }
@@ -564,30 +564,24 @@ function confirmExport() {
         return;
     }
     
-    // 准备导出数据
-    const exportData = {
-        password: password,
-        export_range: exportRange
-    };
+    // 准备导出数据（/api/export 接收表单字段）
+    const exportData = new FormData();
+    exportData.append('password', password);
+    exportData.append('export_range', exportRange);
     
     // 如果选择导出筛选结果，需要获取当前筛选条件
     if (exportRange === 'filtered') {
-        exportData.filters = {
-            station: document.getElementById('stationFilter').value,
-            name: document.getElementById('nameFilter').value,
-            device_type: document.getElementById('deviceTypeFilter').value,
-            vendor: document.getElementById('vendorFilter').value,
-            lifecycle: document.getElementById('lifecycleFilter').value
-        };
+        exportData.append('station_filter', document.getElementById('stationFilter').value);
+        exportData.append('name_filter', document.getElementById('nameFilter').value);
+        exportData.append('device_type_filter', document.getElementById('deviceTypeFilter').value);
+        exportData.append('vendor_filter', document.getElementById('vendorFilter').value);
+        exportData.append('lifecycle_filter', document.getElementById('lifecycleFilter').value);
     }
     
     // 发送导出请求
     fetch('/api/export', {
         method: 'POST',
-        headers: {
-            'Content-Type': 'application/json'
-        },
-        body: JSON.stringify(exportData)
+        body: exportData
     })
     .then(response => {
         if (response.ok) {
@@ -595,9 +589,9 @@ function confirmExport() {
             const contentDisposition = response.headers.get('Content-Disposition');
             let filename = 'devices_export.xlsx';
             if (contentDisposition) {
-                const filenameMatch = contentDisposition.match(/filename="(.+)"/); 
+                const filenameMatch = contentDisposition.match(/filename\*=UTF-8''(.+)/);
                 if (filenameMatch) {
-                    filename = filenameMatch[1];
+                    filename = decodeURIComponent(filenameMatch[1]);
                 }
             }
             
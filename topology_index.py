@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+拓扑邻接索引模块（永久模块，进程内全局缓存）
+
+用途：把整个动力网络的连接关系缓存为紧凑的整数邻接数组，
+供 /graph_data 和 /api/power-chain 在内存中完成广度优先遍历，
+遍历过程中不再逐个设备访问数据库。
+
+索引由一次连接表查询（外加一次设备列查询，用于拓扑筛选）构建，
+任何设备或连接的写操作之后调用 invalidate() 使其失效，下次访问时自动重建。
+注意：缓存是进程级的，多进程部署时每个进程各自维护一份。
+"""
+
+from array import array
+from collections import namedtuple
+from heapq import merge
+
+from sqlalchemy.orm import Session
+
+from generation_cache import GenerationCache
+from models import Device, Connection
+
+
+# 拓扑遍历所需的设备字段（用于设备筛选判断）
+TopologyDevice = namedtuple("TopologyDevice", ["id", "name", "station", "device_type"])
+
+# 拓扑遍历所需的连接字段（用于连接筛选、设备级边和端口级节点/边）
+TopologyConnection = namedtuple("TopologyConnection", [
+    "id", "source_device_id", "target_device_id", "connection_type", "cable_type",
+    "source_fuse_number", "source_breaker_number", "target_fuse_number", "target_breaker_number"
+])
+
+_EMPTY = array("i")
+
+
+class TopologyIndex:
+    """
+    动力网络邻接索引
+    connections 按连接ID排序保存；邻接表为 设备ID -> 连接序号数组（array('i')），
+    遍历顺序与原先按关系懒加载时的连接顺序一致。
+    """
+
+    def __init__(self, devices: list, connections: list):
+        self.devices = {device.id: device for device in devices}
+        self.connections = connections
+        self._outgoing = {}  # 设备ID -> 以该设备为A端（源端）的连接序号
+        self._incoming = {}  # 设备ID -> 以该设备为B端（目标端）的连接序号
+
+        for position, conn in enumerate(connections):
+            self._outgoing.setdefault(conn.source_device_id, array("i")).append(position)
+            self._incoming.setdefault(conn.target_device_id, array("i")).append(position)
+
+    def outgoing(self, device_id: int):
+        """以该设备为源端的连接（向下游）"""
+        connections = self.connections
+        return (connections[position] for position in self._outgoing.get(device_id, _EMPTY))
+
+    def incoming(self, device_id: int):
+        """以该设备为目标端的连接（向上游）"""
+        connections = self.connections
+        return (connections[position] for position in self._incoming.get(device_id, _EMPTY))
+
+    def device_connections(self, device_id: int):
+        """该设备作为任意一端的全部连接，按连接ID顺序且不重复（自环连接只出现一次）"""
+        connections = self.connections
+        last_position = None
+        for position in merge(self._outgoing.get(device_id, _EMPTY), self._incoming.get(device_id, _EMPTY)):
+            if position != last_position:
+                yield connections[position]
+                last_position = position
+
+
+# --- 进程内缓存 ---
+
+def _build_index(db: Session) -> TopologyIndex:
+    """从数据库构建拓扑索引：只查询需要的列，不构造ORM对象"""
+    devices = [
+        TopologyDevice(*row)
+        for row in db.query(Device.id, Device.name, Device.station, Device.device_type)
+    ]
+    connections = [
+        TopologyConnection(*row)
+        for row in db.query(
+            Connection.id, Connection.source_device_id, Connection.target_device_id,
+            Connection.connection_type, Connection.cable_type,
+            Connection.source_fuse_number, Connection.source_breaker_number,
+            Connection.target_fuse_number, Connection.target_breaker_number
+        ).order_by(Connection.id)
+    ]
+    return TopologyIndex(devices, connections)
+
+
+_cache = GenerationCache(_build_index)
+
+
+def get_topology_index(db: Session) -> TopologyIndex:
+    """获取拓扑索引，缓存失效时自动重建"""
+    return _cache.get(db)
+
+
+def invalidate():
+    """使拓扑索引失效（设备或连接写入后调用）"""
+    _cache.invalidate()